@@ -0,0 +1,145 @@
+"""Concurrency benchmark for /admin/api/allocate-house.
+
+N threads race to allocate the same small pool of houses to random eligible
+applicants, then the database is checked for double allocations. Writes to
+the app's configured database, so run it against generated data:
+
+    python generate_data.py --applications 100000 --houses 10000
+    python allocation_benchmark.py --threads 16 --houses 200 --attempts 50
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func
+
+from app import AllocationLog, Application, House, StatusCounter, db
+from benchmark import ServerDriver, TestClientDriver, app, peak_rss_mb
+
+
+def candidate_pools(n_houses, n_applications):
+    with app.app_context():
+        houses = [row.id for row in db.session.query(House.id).filter_by(status='available').limit(n_houses)]
+        apps = [row.id for row in db.session.query(Application.id).filter_by(
+            status='approved', allocated_house_id=None).limit(n_applications)]
+        last_log_id = db.session.query(func.max(AllocationLog.id)).scalar() or 0
+    return houses, apps, last_log_id
+
+
+def check_consistency(houses, last_log_id):
+    """Double allocations and counter drift after the run"""
+    with app.app_context():
+        shared_houses = (
+            db.session.query(Application.allocated_house_id)
+            .filter(Application.allocated_house_id.in_(houses))
+            .group_by(Application.allocated_house_id)
+            .having(func.count(Application.id) > 1)
+            .count()
+        )
+        double_logged = (
+            db.session.query(AllocationLog.house_id)
+            .filter(AllocationLog.id > last_log_id)
+            .group_by(AllocationLog.house_id)
+            .having(func.count(AllocationLog.id) > 1)
+            .count()
+        )
+        new_logs = db.session.query(AllocationLog.id).filter(AllocationLog.id > last_log_id).count()
+
+        counter_drift = {}
+        for kind, model in (('application', Application), ('house', House)):
+            actual = dict(db.session.query(model.status, func.count(model.id)).group_by(model.status).all())
+            counted = {c.status: c.count for c in StatusCounter.query.filter_by(kind=kind)}
+            for status in set(actual) | set(counted):
+                if actual.get(status, 0) != counted.get(status, 0):
+                    counter_drift[f'{kind}.{status}'] = counted.get(status, 0) - actual.get(status, 0)
+
+    return {
+        'houses_with_two_applicants': shared_houses,
+        'houses_logged_twice': double_logged,
+        'new_allocation_logs': new_logs,
+        'counter_drift': counter_drift,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Race N threads on the allocate-house endpoint')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--houses', type=int, default=200, help='size of the contended house pool')
+    parser.add_argument('--attempts', type=int, default=50, help='allocation attempts per thread')
+    parser.add_argument('--server', action='store_true', help='go through a local WSGI server')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=f'allocation-benchmark-{datetime.now():%Y%m%d-%H%M%S}.json')
+    args = parser.parse_args()
+
+    houses, apps, last_log_id = candidate_pools(args.houses, args.threads * args.attempts)
+    if not houses or not apps:
+        parser.error('need available houses and approved applications; run generate_data.py first')
+
+    driver = ServerDriver() if args.server else TestClientDriver()
+    outcomes = {'allocated': 0, 'conflict': 0, 'error': 0}
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local = {'allocated': 0, 'conflict': 0, 'error': 0}
+        local_latencies = []
+        for _ in range(args.attempts):
+            body = {'application_id': rng.choice(apps), 'house_id': rng.choice(houses)}
+            started = time.perf_counter()
+            status = driver.request('POST', '/admin/api/allocate-house', json_body=body)
+            local_latencies.append(time.perf_counter() - started)
+            local['allocated' if status == 200 else 'conflict' if status == 409 else 'error'] += 1
+        with lock:
+            for key, value in local.items():
+                outcomes[key] += value
+            latencies.extend(local_latencies)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.threads)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        driver.close()
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    consistency = check_consistency(houses, last_log_id)
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'mode': 'server' if args.server else 'test_client',
+        'threads': args.threads,
+        'house_pool': len(houses),
+        'application_pool': len(apps),
+        'attempts': len(latencies),
+        'outcomes': outcomes,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'allocations_per_second': round(outcomes['allocated'] / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'consistency': consistency,
+    }
+
+    double_allocations = consistency['houses_with_two_applicants'] + consistency['houses_logged_twice']
+    print(f"{results['attempts']} attempts from {args.threads} threads in {elapsed:.2f}s "
+          f"({results['throughput_rps']} req/s, p50 {results['p50_ms']} ms, p99 {results['p99_ms']} ms)")
+    print(f"  allocated {outcomes['allocated']}, lost races {outcomes['conflict']}, errors {outcomes['error']}")
+    print(f"  double allocations: {double_allocations}, "
+          f"logs match successes: {consistency['new_allocation_logs'] == outcomes['allocated']}, "
+          f"counter drift: {consistency['counter_drift'] or 'none'}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f'✅ Results saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
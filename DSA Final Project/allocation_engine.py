@@ -0,0 +1,89 @@
+from collections import defaultdict
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from location import SpatialIndex
+from matching import match_score_matrix, MIN_MATCH_SCORE
+
+
+def _coordinates(rows):
+    """(latitude, longitude) float arrays from columns 3 and 4, NaN where unknown"""
+    return tuple(np.array([np.nan if row[col] is None else row[col] for row in rows], dtype=np.float64)
+                 for col in (3, 4))
+
+
+def within_distance(applications, houses, max_distance_km):
+    """Boolean (applications x houses) mask of pairs at most max_distance_km apart.
+
+    Uses a KD-tree over the houses. A row or house without coordinates is not
+    restricted, since its location is unknown.
+    """
+    app_lats, app_lons = _coordinates(applications)
+    house_lats, house_lons = _coordinates(houses)
+    located_houses = np.flatnonzero(~np.isnan(house_lats))
+    located_apps = np.flatnonzero(~np.isnan(app_lats))
+
+    mask = np.ones((len(applications), len(houses)), dtype=bool)
+    mask[located_apps[:, None], located_houses] = False
+    index = SpatialIndex(located_houses, house_lats[located_houses], house_lons[located_houses])
+    found = index.within_many(app_lats[located_apps], app_lons[located_apps], max_distance_km)
+    rows = np.repeat(located_apps, [len(positions) for positions in found])
+    if rows.size:
+        mask[rows, index.ids[np.concatenate(found)]] = True
+    return mask
+
+
+def plan_allocations(applications, houses, min_match_score=MIN_MATCH_SCORE, max_distance_km=None):
+    """Optimal batch assignment of applications to houses.
+
+    applications: rows of (id, priority_score, family_size), already ordered by
+    priority_score desc, applied_date asc so earlier rows win ties.
+    houses: rows of (id, bedrooms, size).
+    With max_distance_km, rows also carry (latitude, longitude) and pairs
+    further apart than that are never matched.
+    Returns a list of (application_id, house_id, match_score) maximising the total
+    priority_score * match_score over pairs scoring at least min_match_score.
+    """
+    if not applications or not houses:
+        return []
+
+    app_ids, priorities, family_sizes = (np.asarray(col, dtype=np.int64) for col in list(zip(*applications))[:3])
+    house_ids, bedrooms, sizes = (np.asarray(col) for col in list(zip(*houses))[:3])
+
+    scores = match_score_matrix(family_sizes, bedrooms, sizes)
+    acceptable = scores >= min_match_score
+    if max_distance_km is not None:
+        reachable = within_distance(applications, houses, max_distance_km)
+        acceptable &= reachable
+    weights = np.where(acceptable, priorities[:, None] * scores, 0)
+
+    # Applicants with no acceptable house can never be matched
+    candidates = np.flatnonzero(weights.any(axis=1))
+    if candidates.size == 0:
+        return []
+
+    rows, cols = linear_sum_assignment(weights[candidates], maximize=True)
+    rows = candidates[rows]
+    matched = weights[rows, cols] > 0
+    rows, cols = rows[matched], cols[matched]
+
+    # Applicants with the same priority and family size (and, with a distance
+    # limit, the same reachable houses) have identical rows, so the solver may
+    # pick any of them. Give each group's houses to its earliest applicants instead.
+    def group_key(row):
+        if max_distance_km is None:
+            return priorities[row], family_sizes[row]
+        return priorities[row], family_sizes[row], np.packbits(reachable[row]).tobytes()
+
+    group_cols = defaultdict(list)
+    for row, col in zip(rows, cols):
+        group_cols[group_key(row)].append(col)
+
+    allocations = []
+    for row in range(len(app_ids)):
+        key = group_key(row)
+        if group_cols.get(key):
+            col = group_cols[key].pop()
+            allocations.append((int(app_ids[row]), int(house_ids[col]), int(scores[row, col])))
+    return allocations
@@ -0,0 +1,191 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import text
+
+# Waits are kept as a histogram over geometric buckets of hours, so a median
+# over any range of rollup rows is a merge of counts. Each bucket spans 20%,
+# which bounds the error of a reported median.
+WAIT_BUCKET_RATIO = 1.2
+BACKFILL_CHUNK_SIZE = 50000
+
+PERIODS = {
+    'day': 'day',
+    # Monday starting the week
+    'week': "date(day, '-6 days', 'weekday 1')",
+}
+
+UPSERT_TOTALS = text(
+    'INSERT INTO allocation_rollup (day, allocated_by, allocations, match_score_sum, match_score_count) '
+    'VALUES (:day, :allocated_by, :allocations, :match_score_sum, :match_score_count) '
+    'ON CONFLICT (day, allocated_by) DO UPDATE SET '
+    'allocations = allocations + excluded.allocations, '
+    'match_score_sum = match_score_sum + excluded.match_score_sum, '
+    'match_score_count = match_score_count + excluded.match_score_count'
+)
+UPSERT_WAITS = text(
+    'INSERT INTO allocation_wait_rollup (day, allocated_by, bucket, allocations) '
+    'VALUES (:day, :allocated_by, :bucket, :allocations) '
+    'ON CONFLICT (day, allocated_by, bucket) DO UPDATE SET allocations = allocations + excluded.allocations'
+)
+
+
+def wait_bucket(hours):
+    return int(math.log1p(max(0.0, hours)) / math.log(WAIT_BUCKET_RATIO))
+
+
+def bucket_hours(bucket):
+    """Midpoint of a wait bucket, in hours"""
+    return (WAIT_BUCKET_RATIO ** bucket + WAIT_BUCKET_RATIO ** (bucket + 1)) / 2 - 1
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def aggregate(allocations):
+    """Rollup rows for (allocated_date, allocated_by, match_score, applied_date) tuples"""
+    totals = defaultdict(lambda: [0, 0, 0])
+    waits = defaultdict(int)
+    for allocated_date, allocated_by, match_score, applied_date in allocations:
+        allocated_date, applied_date = _as_datetime(allocated_date), _as_datetime(applied_date)
+        key = (allocated_date.date().isoformat(), allocated_by or '')
+        total = totals[key]
+        total[0] += 1
+        if match_score is not None:
+            total[1] += match_score
+            total[2] += 1
+        if applied_date is not None:
+            hours = (allocated_date - applied_date).total_seconds() / 3600
+            waits[key + (wait_bucket(hours),)] += 1
+    return totals, waits
+
+
+def _write(conn, totals, waits):
+    if totals:
+        conn.execute(UPSERT_TOTALS, [
+            {'day': day, 'allocated_by': admin, 'allocations': n, 'match_score_sum': score_sum,
+             'match_score_count': scored}
+            for (day, admin), (n, score_sum, scored) in totals.items()
+        ])
+    if waits:
+        conn.execute(UPSERT_WAITS, [
+            {'day': day, 'allocated_by': admin, 'bucket': bucket, 'allocations': n}
+            for (day, admin, bucket), n in waits.items()
+        ])
+
+
+def record_allocations(conn, allocations):
+    """Add allocations to the rollups inside the caller's transaction.
+
+    allocations: (allocated_date, allocated_by, match_score, applied_date) tuples,
+    with the same values written to allocation_log.
+    """
+    _write(conn, *aggregate(allocations))
+
+
+def backfill_rollups(engine, chunk_size=BACKFILL_CHUNK_SIZE, progress=None):
+    """Rebuild the rollups from allocation_log in one transaction.
+
+    Reads the log by id in chunks of plain rows; the aggregates are bounded by
+    days x admins x buckets, so they are held in memory and written once.
+    progress(stats) is called after every chunk.
+    """
+    stats = {'scanned': 0, 'days': 0}
+    select_chunk = text(
+        'SELECT l.id, l.allocated_date, l.allocated_by, l.match_score, a.applied_date '
+        'FROM allocation_log l LEFT JOIN application a ON a.id = l.application_id '
+        'WHERE l.id > :last_id ORDER BY l.id LIMIT :limit'
+    )
+    totals = defaultdict(lambda: [0, 0, 0])
+    waits = defaultdict(int)
+    last_id = 0
+
+    with engine.begin() as conn:
+        while True:
+            rows = conn.execute(select_chunk, {'last_id': last_id, 'limit': chunk_size}).fetchall()
+            if not rows:
+                break
+            chunk_totals, chunk_waits = aggregate(row[1:] for row in rows if row.allocated_date is not None)
+            for key, (n, score_sum, scored) in chunk_totals.items():
+                total = totals[key]
+                total[0] += n
+                total[1] += score_sum
+                total[2] += scored
+            for key, n in chunk_waits.items():
+                waits[key] += n
+
+            last_id = rows[-1].id
+            stats['scanned'] += len(rows)
+            if progress:
+                progress(stats)
+
+        conn.execute(text('DELETE FROM allocation_rollup'))
+        conn.execute(text('DELETE FROM allocation_wait_rollup'))
+        _write(conn, totals, waits)
+
+    stats['days'] = len({day for day, _ in totals})
+    return stats
+
+
+def _median_days(histogram):
+    """Median wait in days from {bucket: count}, or None"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen * 2 >= total:
+            return round(bucket_hours(bucket) / 24, 1)
+
+
+def _filters(start_day, end_day, allocated_by):
+    clauses, params = ['day >= :start_day', 'day <= :end_day'], {'start_day': start_day, 'end_day': end_day}
+    if allocated_by is not None:
+        clauses.append('allocated_by = :allocated_by')
+        params['allocated_by'] = allocated_by
+    return ' AND '.join(clauses), params
+
+
+def _summaries(conn, group_by, start_day, end_day, allocated_by=None):
+    """{group: {allocations, average_match_score, median_wait_days}} from the rollups"""
+    where, params = _filters(start_day, end_day, allocated_by)
+    summaries = {}
+    for group, n, score_sum, scored in conn.execute(text(
+            f'SELECT {group_by} AS grp, sum(allocations), sum(match_score_sum), sum(match_score_count) '
+            f'FROM allocation_rollup WHERE {where} GROUP BY grp ORDER BY grp'), params):
+        summaries[group] = {
+            'allocations': n,
+            'average_match_score': round(score_sum / scored, 1) if scored else None,
+        }
+
+    histograms = defaultdict(dict)
+    for group, bucket, n in conn.execute(text(
+            f'SELECT {group_by} AS grp, bucket, sum(allocations) '
+            f'FROM allocation_wait_rollup WHERE {where} GROUP BY grp, bucket'), params):
+        histograms[group][bucket] = n
+    for group, summary in summaries.items():
+        summary['median_wait_days'] = _median_days(histograms[group])
+    return summaries
+
+
+def allocation_series(conn, start_day, end_day, period='day', allocated_by=None):
+    """Allocations, average match score and median wait per day or week"""
+    summaries = _summaries(conn, PERIODS[period], start_day, end_day, allocated_by)
+    return [{'period': group, **summary} for group, summary in summaries.items()]
+
+
+def allocations_by_admin(conn, start_day, end_day):
+    """The same measures per admin, most allocations first"""
+    summaries = _summaries(conn, 'allocated_by', start_day, end_day)
+    rows = [{'allocated_by': group, **summary} for group, summary in summaries.items()]
+    return sorted(rows, key=lambda row: -row['allocations'])
+
+
+def allocation_totals(conn, start_day, end_day):
+    summary = _summaries(conn, "''", start_day, end_day).get('')
+    return summary or {'allocations': 0, 'average_match_score': None, 'median_wait_days': None}
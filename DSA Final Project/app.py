@@ -1,20 +1,136 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Blueprint, Flask, current_app, render_template, request, jsonify, session, redirect, url_for, abort, g, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+import click
+from sqlalchemy import and_, bindparam, event, func, insert, or_, update
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, timedelta
+import base64
 import hashlib
+import io
 import json
 import heapq
 from collections import defaultdict, deque
 import os
+import random
+import threading
+import time
+
+import numpy as np
+
+from allocation_engine import plan_allocations
+from analytics import (allocation_series, allocation_totals, allocations_by_admin, backfill_rollups,
+                       record_allocations)
+from assets import asset_response, build_assets
+from database import READER_BIND, RoutingSession, configure_engine, engine_options, load_config, sqlite_settings
+from eligible_queue import EligibleQueue
+from events import EventBroker, format_sse
+from importer import import_applications
+from jobs import DEFAULT_MAX_PENDING, DEFAULT_WORKERS, JobFailed, JobRunner, JobStore, QueueFull
+from location import Geocoder, RoadGraph, SpatialIndex, load_locations
+from matching import MIN_MATCH_SCORE, match_score_matrix
+from metrics import Metrics, RequestProfiler, instrument_engine, instrumentation_settings
+from rank_index import RankIndex
+from response_cache import ResponseCache
+from scoring import DEFAULT_POLICY, priority_score, rescore_applications
+from search import search_applications, search_houses
+from setup import migrate_database
+from simulation import DEFAULT_HORIZON_DAYS, DEFAULT_SCENARIOS, Snapshot, build_policies, reporting_bands, simulate
+from suggestions import SuggestionIndex
 
 # SAME DIRECTORY - ALL FILES IN ONE FOLDER
-app = Flask(__name__, template_folder='.', static_folder='.', static_url_path='')
+ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(ROOT_PATH, 'config.json')
+# Only built assets are served (see /static below), never the project directory itself
+ASSET_DIR = os.path.join(ROOT_PATH, 'static')
+
+# Routes, hooks and CLI commands, registered on the app by create_app()
+bp = Blueprint('homealloc', __name__, cli_group=None)
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# What happens when a house becomes available: 'auto' allocates it to the first
+# eligible applicant, 'propose' records a proposal for an admin, 'off' does nothing
+INCREMENTAL_MODES = ('auto', 'propose', 'off')
+
+# Settings and services below are set up from config.json by create_app()
+app_config = {}
+scoring_policy = dict(DEFAULT_POLICY)
+incremental_mode = 'propose'
+instrumentation = {}
+geocoder = None
+road_graph = None
+job_runner = None
+
+# Route latency and per-request SQL, served at /admin/metrics
+request_metrics = Metrics()
+request_profiler = RequestProfiler()
 
-app.config['SECRET_KEY'] = 'homealloc-secret-key-2025'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///homes.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Change feed for /api/stream
+event_broker = EventBroker()
 
-db = SQLAlchemy(app)
+# Serialized bodies of the public JSON APIs, invalidated on commit and expired
+# after response_cache.MAX_TTL_SECONDS
+response_cache = ResponseCache()
+
+def create_app(config=None):
+    """Build the Flask app from settings: a dict, or the path of a JSON file
+    (config.json next to this file by default).
+
+    Nothing here touches the database; run `flask init-db` to create and
+    seed it. Indexes and caches are built on first use. Settings are held in
+    module globals, so there is one app per process.
+    """
+    global app_config, scoring_policy, incremental_mode, instrumentation, geocoder, road_graph
+    global job_runner, request_metrics
+    
+    app_config = load_config(config or CONFIG_PATH) if not isinstance(config, dict) else config
+    mode = app_config.get('incremental_allocation', 'propose')
+    if mode not in INCREMENTAL_MODES:
+        raise ValueError(f'incremental_allocation must be one of {INCREMENTAL_MODES}')
+    incremental_mode = mode
+    scoring_policy = {**DEFAULT_POLICY, **app_config.get('priority_scoring', {})}
+    
+    app = Flask(__name__, template_folder='.', static_folder=None)
+    sqlite_config = sqlite_settings(app_config)
+    database_uri = f"sqlite:///{app_config.get('database', 'homes.db')}"
+    
+    app.config['SECRET_KEY'] = app_config.get('secret_key', 'homealloc-secret-key-2025')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # One serialized writer connection plus a pool of read-only connections
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(sqlite_config, 'writer')
+    app.config['SQLALCHEMY_BINDS'] = {READER_BIND: {'url': database_uri, **engine_options(sqlite_config, 'reader')}}
+    db.init_app(app)
+    
+    instrumentation = instrumentation_settings(app_config)
+    request_metrics = Metrics(instrumentation['slow_query_ms'], instrumentation['slow_query_log_size'])
+    
+    # Engines connect lazily, so this only registers their listeners
+    with app.app_context():
+        configure_engine(db.engines[None], sqlite_config, 'writer')
+        configure_engine(db.engines[READER_BIND], sqlite_config, 'reader')
+        instrument_engine(db.engines[None], request_metrics, 'writer')
+        instrument_engine(db.engines[READER_BIND], request_metrics, 'reader')
+    
+    # Geocoding and road distances for proximity matching
+    places, roads = load_locations(app_config)
+    geocoder = Geocoder(places)
+    road_graph = RoadGraph(places, roads)
+    
+    # Bounded pool for allocation rounds, imports and rescoring, tracked in the job table
+    job_settings = app_config.get('jobs', {})
+    job_runner = JobRunner(app, JobStore(lambda: db.engine),
+                           max_workers=job_settings.get('workers', DEFAULT_WORKERS),
+                           max_pending=job_settings.get('max_pending', DEFAULT_MAX_PENDING),
+                           cleanup=lambda: db.session.remove())
+    for kind, handler in JOB_HANDLERS.items():
+        job_runner.register(kind, handler)
+    
+    reset_caches()
+    app.register_blueprint(bp)
+    return app
 
 # DATABASE MODELS
 class Application(db.Model):
@@ -30,6 +146,19 @@ class Application(db.Model):
     priority_score = db.Column(db.Integer, default=0)
     applied_date = db.Column(db.DateTime, default=datetime.utcnow)
     allocated_house_id = db.Column(db.Integer, db.ForeignKey('house.id'), nullable=True)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    version = db.Column(db.Integer, nullable=False, server_default='0')
+    
+    # ORM updates check and bump version; bulk statements bump it themselves
+    __mapper_args__ = {'version_id_col': version}
+    
+    # Keep in sync with MIGRATIONS in setup.py
+    __table_args__ = (
+        db.Index('ix_application_eligible', status, allocated_house_id, priority_score.desc(), applied_date),
+        db.Index('ix_application_rank', priority_score.desc(), applied_date),
+        db.Index('ix_application_applied_date', applied_date),
+    )
 
 class House(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -43,6 +172,15 @@ class House(db.Model):
     current_occupant_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=True)
     facilities = db.Column(db.Text)
     added_date = db.Column(db.DateTime, default=datetime.utcnow)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    version = db.Column(db.Integer, nullable=False, server_default='0')
+    
+    __mapper_args__ = {'version_id_col': version}
+    
+    __table_args__ = (
+        db.Index('ix_house_status', status),
+    )
 
 class Admin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -66,14 +204,168 @@ class AllocationLog(db.Model):
     allocated_date = db.Column(db.DateTime, default=datetime.utcnow)
     allocated_by = db.Column(db.String(50))
     match_score = db.Column(db.Integer)
+    
+    __table_args__ = (
+        db.Index('ix_allocation_log_allocated_date', allocated_date),
+    )
+
+class AllocationProposal(db.Model):
+    """Allocation found by the incremental matcher, waiting for an admin"""
+    id = db.Column(db.Integer, primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False)
+    house_id = db.Column(db.Integer, db.ForeignKey('house.id'), nullable=False)
+    match_score = db.Column(db.Integer)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, approved, rejected, expired
+    proposed_date = db.Column(db.DateTime, default=datetime.utcnow)
+    proposed_by = db.Column(db.String(50))
+    decided_date = db.Column(db.DateTime)
+    decided_by = db.Column(db.String(50))
+    
+    __table_args__ = (
+        db.Index('ix_allocation_proposal_status', status, house_id),
+    )
+
+class Job(db.Model):
+    """Background job run by job_runner; params, progress and result hold JSON"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # allocation, import, rescore, reconcile, simulation
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    params = db.Column(db.Text)
+    progress = db.Column(db.Text)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.String(50))
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    started_date = db.Column(db.DateTime)
+    finished_date = db.Column(db.DateTime)
+
+# Per-day allocation rollups maintained by analytics.record_allocations
+class AllocationRollup(db.Model):
+    day = db.Column(db.String(10), primary_key=True)  # YYYY-MM-DD, UTC
+    allocated_by = db.Column(db.String(50), primary_key=True)
+    allocations = db.Column(db.Integer, nullable=False, default=0)
+    match_score_sum = db.Column(db.Integer, nullable=False, default=0)
+    match_score_count = db.Column(db.Integer, nullable=False, default=0)
+
+class AllocationWaitRollup(db.Model):
+    day = db.Column(db.String(10), primary_key=True)
+    allocated_by = db.Column(db.String(50), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)  # analytics.wait_bucket of the wait in hours
+    allocations = db.Column(db.Integer, nullable=False, default=0)
+
+class StatusCounter(db.Model):
+    kind = db.Column(db.String(20), primary_key=True)  # 'application' or 'house'
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+# Waiting list order, also the keyset pagination key. SQLite sorts NULL
+# applied_date first, as waiting_key does
+APPLICATION_ORDER = (Application.priority_score.desc(), Application.applied_date.asc(), Application.id.asc())
+
+# ==================== INSTRUMENTATION ====================
+
+@bp.before_app_request
+def start_request_metrics():
+    # Unmatched URLs share one label so scanners cannot grow the series without bound
+    request_metrics.request_started(request.endpoint or 'unmatched')
+    if instrumentation['profiling'] and session.get('profiling') and session.get('admin_logged_in'):
+        g.profiler = request_profiler.start()
+
+@bp.after_app_request
+def finish_request_metrics(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        report_id = request_profiler.stop(profiler, f'{request.method} {request.full_path}')
+        response.headers['X-Profile-Id'] = str(report_id)
+    stats = request_metrics.request_finished(request.method, response.status_code)
+    if stats is not None:
+        response.headers['X-Query-Count'] = str(stats.queries)
+    return response
+
+@bp.teardown_app_request
+def stop_request_profiler(exc):
+    # Runs even when the view raised, so the profiler never keeps its busy slot
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        request_profiler.stop(profiler, f'{request.method} {request.full_path} (failed)')
+
+@bp.route('/admin/metrics')
+def metrics():
+    """Prometheus text metrics; for an admin session or the configured bearer token"""
+    token = instrumentation['metrics_token']
+    if not session.get('admin_logged_in') and not (token and request.headers.get('Authorization') == f'Bearer {token}'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/admin/api/slow-queries')
+def slow_queries():
+    """Statements slower than slow_query_ms, newest first"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify({'threshold_ms': instrumentation['slow_query_ms'],
+                    'queries': request_metrics.recent_slow_queries()})
+
+@bp.route('/admin/api/profiling', methods=['POST'])
+def set_profiling():
+    """Turn cProfile on or off for this admin's requests ({"enabled": true});
+    profiled responses carry X-Profile-Id, readable at /admin/api/profiles/<id>"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    if not instrumentation['profiling']:
+        return jsonify({'success': False, 'error': 'Profiling is disabled in config.json'}), 403
+    
+    session['profiling'] = bool((request.get_json(silent=True) or {}).get('enabled'))
+    return jsonify({'success': True, 'profiling': session['profiling']})
+
+@bp.route('/admin/api/profiles/<int:report_id>')
+def get_profile(report_id):
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    report = request_profiler.report(report_id)
+    if report is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return Response(report, mimetype='text/plain')
 
 # ==================== FLASK ROUTES ====================
 
-@app.route('/')
+# Public CSS/JS under content-hashed names, built on first use
+asset_manifest = None
+hashed_assets = set()
+asset_lock = threading.Lock()
+
+def get_asset_manifest():
+    global asset_manifest, hashed_assets
+    if asset_manifest is None:
+        with asset_lock:
+            if asset_manifest is None:
+                manifest = build_assets(ROOT_PATH, ASSET_DIR)
+                hashed_assets = set(manifest.values())
+                asset_manifest = manifest
+    return asset_manifest
+
+@bp.app_template_global()
+def asset_url(name):
+    """URL of a public asset by its source name"""
+    return f'/static/{get_asset_manifest().get(name, name)}'
+
+@bp.before_app_request
+def refresh_assets():
+    # Pick up edited CSS/JS without a restart while developing
+    global asset_manifest
+    if current_app.debug and not request.path.startswith('/static/'):
+        asset_manifest = None
+
+@bp.route('/static/<path:filename>')
+def static_asset(filename):
+    """Built assets; hashed names never change, so browsers may cache them for good"""
+    get_asset_manifest()
+    return asset_response(ASSET_DIR, filename, request.accept_encodings, immutable=filename in hashed_assets)
+
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/apply', methods=['GET', 'POST'])
+@bp.route('/apply', methods=['GET', 'POST'])
 def apply():
     if request.method == 'POST':
         try:
@@ -87,22 +379,8 @@ def apply():
             address = request.form.get('address', '')
             
             # Calculate priority score
-            score = 0
-            if age >= 60: score += 30
-            elif age >= 50: score += 20
-            elif age >= 40: score += 10
-            
-            if family_size >= 6: score += 30
-            elif family_size >= 4: score += 20
-            elif family_size >= 2: score += 10
-            
-            income_ratio = income / 20000
-            if income_ratio <= 0.5: score += 40
-            elif income_ratio <= 0.75: score += 30
-            elif income_ratio <= 1.0: score += 20
-            else: score += 10
-            
-            score = min(100, score)
+            score = priority_score(age, family_size, income, scoring_policy)
+            latitude, longitude = geocoder.geocode(address) or (None, None)
             
             # Create and save application
             new_app = Application(
@@ -114,76 +392,83 @@ def apply():
                 email=email,
                 address=address,
                 status='pending',
-                priority_score=score
+                priority_score=score,
+                latitude=latitude,
+                longitude=longitude
             )
             
             db.session.add(new_app)
+            deltas = {}
+            count_transition('application', None, 'pending', deltas=deltas)
             db.session.commit()
+            index_application(new_app)
+            event_broker.publish('application', {
+                'id': new_app.id,
+                'status': new_app.status,
+                'priority_score': new_app.priority_score,
+                'counts': deltas
+            })
             
             # Show success message with application details
-            return f'''
-            <html>
-            <head>
-                <title>Application Submitted - HomeAlloc</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; padding: 40px; text-align: center; background: #f5f7fa; }}
-                    .success-box {{ background: white; padding: 30px; border-radius: 10px; box-shadow: 0 0 20px rgba(0,0,0,0.1); max-width: 600px; margin: 0 auto; }}
-                    h2 {{ color: #28a745; }}
-                    .app-details {{ text-align: left; background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-                    .buttons {{ margin-top: 30px; }}
-                    .btn {{ display: inline-block; padding: 12px 24px; margin: 10px; text-decoration: none; border-radius: 5px; font-weight: bold; }}
-                    .btn-home {{ background: #0066ff; color: white; }}
-                    .btn-waiting {{ background: #333; color: white; }}
-                    .btn-new {{ background: #28a745; color: white; }}
-                </style>
-            </head>
-            <body>
-                <div class="success-box">
-                    <h2>✅ Application Submitted Successfully!</h2>
-                    <div class="app-details">
-                        <p><strong>Application ID:</strong> APP-{new_app.id:04d}</p>
-                        <p><strong>Name:</strong> {name}</p>
-                        <p><strong>Age:</strong> {age} years</p>
-                        <p><strong>Family Size:</strong> {family_size} members</p>
-                        <p><strong>Monthly Income:</strong> Rs {income:,.0f}</p>
-                        <p><strong>Priority Score:</strong> {score}/100</p>
-                        <p><strong>Status:</strong> Pending Review</p>
-                        <p><strong>Submitted:</strong> {datetime.now().strftime("%d-%m-%Y %H:%M")}</p>
-                    </div>
-                    <div class="buttons">
-                        <a href="/" class="btn btn-home">🏠 Go to Home</a>
-                        <a href="/waiting-list" class="btn btn-waiting">📋 View Waiting List</a>
-                        <a href="/apply" class="btn btn-new">📝 Submit Another</a>
-                    </div>
-                </div>
-            </body>
-            </html>
-            '''
+            return render_template('application-submitted.html', application=new_app, submitted=datetime.now())
             
         except Exception as e:
-            return f'''
-            <html>
-            <body style="font-family: Arial; padding: 40px; text-align: center;">
-                <h2 style="color: red;">❌ Error Submitting Application</h2>
-                <p style="color: #666;">{str(e)}</p>
-                <a href="/apply" style="padding: 10px 20px; background: #ff3333; color: white; text-decoration: none; border-radius: 5px;">
-                    ↩️ Try Again
-                </a>
-            </body>
-            </html>
-            '''
+            db.session.rollback()
+            return render_template('form-error.html', heading='Error Submitting Application',
+                                   error=str(e), retry_url='/apply')
     
     return render_template('application.html')
 
-@app.route('/waiting-list')
+PAGE_SIZE = 50
+
+@bp.route('/waiting-list')
 def waiting_list():
-    # Get all applications sorted by priority
-    apps = Application.query.order_by(Application.priority_score.desc(), Application.applied_date.asc()).all()
+    index = get_waiting_index()
+    context = {
+        'total_applications': len(index),
+        'pending_count': get_status_counts()['application']['pending'],
+        'page_size': PAGE_SIZE
+    }
+    
+    # ?all=1 streams the whole list, rendering rows as the query yields them
+    if request.args.get('all'):
+        query = Application.query.order_by(*APPLICATION_ORDER).yield_per(500)
+        return stream_page('waitinglist.html',
+                           applications=waiting_rows(query, 1),
+                           prev_cursor=None,
+                           next_cursor=None,
+                           **context)
+    
+    # ?from=k jumps to rank k through the rank index
+    after, before = page_cursors()
+    start = request.args.get('from', type=int)
+    if start and start > 1 and not (after or before):
+        keys = index.slice(start - 2, start - 1)
+        if keys:
+            applied_date = keys[0][1] if keys[0][1] != datetime.min else None
+            after = (-keys[0][0], applied_date, keys[0][2])
+    
+    apps, prev_cursor, next_cursor = keyset_page(Application.query, after, before)
+    first_position = 1
+    if apps:
+        key = waiting_key(apps[0].id, apps[0].priority_score, apps[0].applied_date)
+        rank = index.rank(key)
+        if rank is None:
+            # Row is newer than the index (another worker added it)
+            index_application(apps[0])
+            rank = index.rank(key)
+        first_position = rank + 1
     
-    # Calculate waiting position for each
-    apps_with_position = []
-    for i, app in enumerate(apps, 1):
-        apps_with_position.append({
+    return render_template('waitinglist.html',
+                         applications=list(waiting_rows(apps, first_position)),
+                         prev_cursor=prev_cursor,
+                         next_cursor=next_cursor,
+                         **context)
+
+def waiting_rows(apps, start):
+    """Waiting list rows with their position"""
+    for position, app in enumerate(apps, start):
+        yield {
             'id': app.id,
             'name': app.name,
             'age': app.age,
@@ -192,16 +477,14 @@ def waiting_list():
             'priority_score': app.priority_score,
             'status': app.status,
             'applied_date': app.applied_date,
-            'position': i
-        })
-    
-    return render_template('waitinglist.html', applications=apps_with_position)
+            'position': position
+        }
 
-@app.route('/about')
+@bp.route('/about')
 def about():
     return render_template('about.html')
 
-@app.route('/contact', methods=['GET', 'POST'])
+@bp.route('/contact', methods=['GET', 'POST'])
 def contact():
     if request.method == 'POST':
         try:
@@ -214,58 +497,19 @@ def contact():
             db.session.add(contact_msg)
             db.session.commit()
             
-            return f'''
-            <html>
-            <head>
-                <title>Message Sent - HomeAlloc</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; padding: 40px; text-align: center; background: #f5f7fa; }}
-                    .success-box {{ background: white; padding: 30px; border-radius: 10px; box-shadow: 0 0 20px rgba(0,0,0,0.1); max-width: 600px; margin: 0 auto; }}
-                    h2 {{ color: #28a745; }}
-                    .message-box {{ text-align: left; background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-                </style>
-            </head>
-            <body>
-                <div class="success-box">
-                    <h2>✅ Message Sent Successfully!</h2>
-                    <div class="message-box">
-                        <p><strong>Name:</strong> {name}</p>
-                        <p><strong>Email:</strong> {email}</p>
-                        <p><strong>Message:</strong> {message}</p>
-                        <p><strong>Submitted:</strong> {datetime.now().strftime("%d-%m-%Y %H:%M")}</p>
-                    </div>
-                    <p>We will contact you within 24 hours.</p>
-                    <div style="margin-top: 30px;">
-                        <a href="/" style="padding: 12px 24px; background: #0066ff; color: white; text-decoration: none; border-radius: 5px; margin: 10px;">
-                            🏠 Go to Home
-                        </a>
-                        <a href="/contact" style="padding: 12px 24px; background: #333; color: white; text-decoration: none; border-radius: 5px; margin: 10px;">
-                            📧 Send Another
-                        </a>
-                    </div>
-                </div>
-            </body>
-            </html>
-            '''
+            return render_template('contact-sent.html', name=name, email=email, message=message,
+                                   submitted=datetime.now())
             
         except Exception as e:
-            return f'''
-            <html>
-            <body style="font-family: Arial; padding: 40px; text-align: center;">
-                <h2 style="color: red;">❌ Error Sending Message</h2>
-                <p>{str(e)}</p>
-                <a href="/contact" style="padding: 10px 20px; background: #ff3333; color: white; text-decoration: none;">
-                    ↩️ Try Again
-                </a>
-            </body>
-            </html>
-            '''
+            db.session.rollback()
+            return render_template('form-error.html', heading='Error Sending Message',
+                                   error=str(e), retry_url='/contact')
     
     return render_template('contact.html')
 
 # ==================== ADMIN ROUTES ====================
 
-@app.route('/admin/login', methods=['GET', 'POST'])
+@bp.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -281,26 +525,27 @@ def admin_login():
     
     return render_template('admin-login.html')
 
-@app.route('/admin/logout')
+@bp.route('/admin/logout')
 def admin_logout():
     session.clear()
     return redirect('/admin/login')
 
-@app.route('/admin/dashboard')
+@bp.route('/admin/dashboard')
 def admin_dashboard():
     if not session.get('admin_logged_in'):
         return redirect('/admin/login')
     
     # Get statistics
+    counts = get_status_counts()
     stats = {
-        'total_applications': Application.query.count(),
-        'pending_applications': Application.query.filter_by(status='pending').count(),
-        'approved_applications': Application.query.filter_by(status='approved').count(),
-        'rejected_applications': Application.query.filter_by(status='rejected').count(),
-        'allocated_applications': Application.query.filter_by(status='allocated').count(),
-        'available_houses': House.query.filter_by(status='available').count(),
-        'occupied_houses': House.query.filter_by(status='occupied').count(),
-        'total_houses': House.query.count()
+        'total_applications': sum(counts['application'].values()),
+        'pending_applications': counts['application']['pending'],
+        'approved_applications': counts['application']['approved'],
+        'rejected_applications': counts['application']['rejected'],
+        'allocated_applications': counts['application']['allocated'],
+        'available_houses': counts['house']['available'],
+        'occupied_houses': counts['house']['occupied'],
+        'total_houses': sum(counts['house'].values())
     }
     
     # Get recent applications
@@ -314,15 +559,43 @@ def admin_dashboard():
                          recent_apps=recent_apps,
                          recent_allocations=recent_allocations)
 
-@app.route('/admin/applications')
+@bp.route('/admin/applications')
 def admin_applications():
     if not session.get('admin_logged_in'):
         return redirect('/admin/login')
     
-    apps = Application.query.order_by(Application.priority_score.desc()).all()
-    return render_template('admin-applications.html', applications=apps)
+    # Status counts and average priority in one pass
+    status_counts = defaultdict(int)
+    total_score = 0
+    for status, count, score in db.session.query(
+            Application.status, func.count(Application.id), func.sum(Application.priority_score)
+    ).group_by(Application.status):
+        status_counts[status] = count
+        total_score += score or 0
+    total = sum(status_counts.values())
+    context = {
+        'total_applications': total,
+        'status_counts': status_counts,
+        'average_priority': round(total_score / total, 1) if total else 0
+    }
+    
+    if request.args.get('all'):
+        query = Application.query.order_by(*APPLICATION_ORDER).yield_per(500)
+        return stream_page('admin-applications.html',
+                           applications=query,
+                           prev_cursor=None,
+                           next_cursor=None,
+                           **context)
+    
+    after, before = page_cursors()
+    apps, prev_cursor, next_cursor = keyset_page(Application.query, after, before)
+    return render_template('admin-applications.html',
+                         applications=apps,
+                         prev_cursor=prev_cursor,
+                         next_cursor=next_cursor,
+                         **context)
 
-@app.route('/admin/api/update-application', methods=['POST'])
+@bp.route('/admin/api/update-application', methods=['POST'])
 def update_application():
     if not session.get('admin_logged_in'):
         return jsonify({'error': 'Unauthorized'}), 401
@@ -331,8 +604,11 @@ def update_application():
     app_id = data.get('id')
     action = data.get('action')  # 'approve', 'reject', 'pending'
     
+    # Read under the write lock, so old_status is the status being replaced
+    db.session().pin_writer()
     app = Application.query.get(app_id)
     if app:
+        old_status = app.status
         if action == 'approve':
             app.status = 'approved'
         elif action == 'reject':
@@ -340,7 +616,21 @@ def update_application():
         elif action == 'pending':
             app.status = 'pending'
         
-        db.session.commit()
+        deltas = {}
+        count_transition('application', old_status, app.status, deltas=deltas)
+        invalidate_on_commit(f'application:{app.id}')
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Application was changed by someone else, please reload'}), 409
+        track_application(app)
+        event_broker.publish('status', {
+            'id': app.id,
+            'old_status': old_status,
+            'status': app.status,
+            'counts': deltas
+        })
         
         return jsonify({
             'success': True,
@@ -355,7 +645,136 @@ def update_application():
     
     return jsonify({'success': False, 'error': 'Application not found'})
 
-@app.route('/admin/houses')
+BULK_ACTIONS = {'approve': 'approved', 'reject': 'rejected', 'pending': 'pending'}
+MAX_BULK_IDS = 10000
+
+@bp.route('/admin/api/bulk-update-applications', methods=['POST'])
+def bulk_update_applications():
+    """Change the status of many applications in a single UPDATE.
+
+    Body is {"action": ..., "ids": [...]} or {"action": ..., "filter": {"status":
+    "pending", "min_priority": 80, "max_priority": 100}}. Allocated applications
+    are never touched.
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.json or {}
+    new_status = BULK_ACTIONS.get(data.get('action'))
+    if new_status is None:
+        return jsonify({'success': False, 'error': 'Unknown action'}), 400
+
+    conditions = [Application.status != new_status, Application.status != 'allocated']
+    try:
+        if data.get('ids') is not None:
+            ids = [int(app_id) for app_id in data['ids']]
+            if len(ids) > MAX_BULK_IDS:
+                return jsonify({'success': False, 'error': f'At most {MAX_BULK_IDS} ids per request'}), 400
+            conditions.append(Application.id.in_(ids))
+        elif data.get('filter'):
+            filters = data['filter']
+            if filters.get('status'):
+                conditions.append(Application.status == filters['status'])
+            if filters.get('min_priority') is not None:
+                conditions.append(Application.priority_score >= int(filters['min_priority']))
+            if filters.get('max_priority') is not None:
+                conditions.append(Application.priority_score <= int(filters['max_priority']))
+        else:
+            return jsonify({'success': False, 'error': 'Provide ids or a filter'}), 400
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Invalid ids or filter'}), 400
+
+    # Count the rows about to change under the write lock, so the counters
+    # move by exactly what the UPDATE changes
+    db.session().pin_writer()
+    previous = dict(
+        db.session.query(Application.status, func.count(Application.id))
+        .filter(*conditions)
+        .group_by(Application.status)
+        .all()
+    )
+    result = db.session.execute(
+        update(Application).where(*conditions).values(status=new_status, version=Application.version + 1),
+        execution_options={'synchronize_session': False}
+    )
+    deltas = {}
+    for old_status, n in previous.items():
+        count_transition('application', old_status, new_status, n, deltas=deltas)
+    if data.get('ids') is not None:
+        invalidate_on_commit(*(f'application:{app_id}' for app_id in ids))
+    else:
+        invalidate_on_commit()
+    db.session.commit()
+    if result.rowcount:
+        reset_eligible_queue()
+        event_broker.publish('bulk_status', {'status': new_status, 'updated': result.rowcount, 'counts': deltas})
+
+    # The rank index orders by priority and date only, so status changes leave it valid
+    return jsonify({
+        'success': True,
+        'action': data['action'],
+        'updated': result.rowcount,
+        'previous_status_counts': previous,
+        'status_counts': dict(get_status_counts()['application'])
+    })
+
+@bp.route('/admin/api/import-applications', methods=['POST'])
+def import_applications_upload():
+    """Bulk import applications from an uploaded CSV or JSONL file.
+
+    Runs as a background job unless the form has wait=1.
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+    
+    fmt = request.form.get('format') or ('jsonl' if upload.filename.endswith(('.jsonl', '.json')) else 'csv')
+    if request.form.get('wait') != '1':
+        # Keep the upload on disk for the job; the job deletes it
+        os.makedirs(upload_dir(), exist_ok=True)
+        path = os.path.join(upload_dir(), f'{os.urandom(8).hex()}.{fmt}')
+        upload.save(path)
+        return enqueue('import', {'path': path, 'format': fmt, 'filename': upload.filename})
+    
+    try:
+        stats = run_import(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''), fmt)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'message': f"Imported {stats['imported']} applications ({stats['rejected']} rejected)",
+        **stats
+    })
+
+@bp.route('/admin/api/rescore', methods=['POST'])
+def rescore():
+    """Recompute priority scores with the current scoring policy, as a background
+    job unless the body has "wait": true"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if not (request.get_json(silent=True) or {}).get('wait'):
+        return enqueue('rescore', {})
+    stats = run_rescore()
+    return jsonify({
+        'success': True,
+        'message': f"Rescored {stats['scanned']} applications ({stats['updated']} changed)",
+        **stats
+    })
+
+@bp.route('/admin/api/reconcile-counters', methods=['POST'])
+def reconcile_counters_job():
+    """Rebuild the status counters from the tables as a background job; schedule
+    this (or `flask reconcile-counters`) to repair any drift"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return enqueue('reconcile', {})
+
+@bp.route('/admin/houses')
 def admin_houses():
     if not session.get('admin_logged_in'):
         return redirect('/admin/login')
@@ -363,7 +782,7 @@ def admin_houses():
     houses = House.query.all()
     return render_template('admin-houses.html', houses=houses)
 
-@app.route('/admin/api/add-house', methods=['POST'])
+@bp.route('/admin/api/add-house', methods=['POST'])
 def add_house():
     if not session.get('admin_logged_in'):
         return jsonify({'error': 'Unauthorized'}), 401
@@ -377,36 +796,53 @@ def add_house():
             last_house = House.query.order_by(House.id.desc()).first()
             house_id = f"H-{last_house.id + 1:03d}" if last_house else "H-101"
         
+        latitude, longitude = geocoder.geocode(data['address']) or (None, None)
         new_house = House(
             house_id=house_id,
             address=data['address'],
+            latitude=latitude,
+            longitude=longitude,
             house_type=data['type'],
             bedrooms=int(data['bedrooms']),
             size=int(data['size']),
+            rent=float(data.get('rent') or 0),
             facilities=data.get('facilities', 'Parking, Water, Electricity'),
             status='available'
         )
         
         db.session.add(new_house)
+        deltas = {}
+        count_transition('house', None, 'available', deltas=deltas)
         db.session.commit()
+        reset_house_locations()
+        event_broker.publish('house_added', {
+            'id': new_house.id,
+            'house_id': new_house.house_id,
+            'bedrooms': new_house.bedrooms,
+            'counts': deltas
+        })
         
+        house = {
+            'id': new_house.id,
+            'house_id': new_house.house_id,
+            'address': new_house.address,
+            'type': new_house.house_type,
+            'bedrooms': new_house.bedrooms,
+            'rent': new_house.rent
+        }
+        placed = place_house(new_house.id, session['admin_username'])
         return jsonify({
             'success': True,
-            'message': f'House {house_id} added successfully!',
-            'house': {
-                'id': new_house.id,
-                'house_id': new_house.house_id,
-                'address': new_house.address,
-                'type': new_house.house_type,
-                'bedrooms': new_house.bedrooms,
-                'rent': new_house.rent
-            }
+            'message': f'House {house_id} added successfully!' + placement_message(placed),
+            'house': house,
+            **(placed or {})
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/admin/api/delete-house/<int:house_id>', methods=['POST'])
+@bp.route('/admin/api/delete-house/<int:house_id>', methods=['POST'])
 def delete_house(house_id):
     if not session.get('admin_logged_in'):
         return jsonify({'error': 'Unauthorized'}), 401
@@ -414,12 +850,88 @@ def delete_house(house_id):
     house = House.query.get(house_id)
     if house:
         db.session.delete(house)
+        deltas = {}
+        count_transition('house', house.status, None, deltas=deltas)
+        invalidate_on_commit(f'house:{house.id}')
         db.session.commit()
+        reset_house_locations()
+        expire_proposals(house_id)
+        event_broker.publish('house_deleted', {'id': house.id, 'house_id': house.house_id, 'counts': deltas})
         return jsonify({'success': True, 'message': f'House {house.house_id} deleted'})
     
     return jsonify({'success': False, 'error': 'House not found'})
 
-@app.route('/admin/allocate')
+@bp.route('/admin/api/vacate-house/<int:house_id>', methods=['POST'])
+def vacate_house(house_id):
+    """Move the occupant out and offer the house to the next eligible applicant"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        payload, status = with_write_retries(lambda: vacate(house_id))
+        if status == 200:
+            placed = place_house(house_id, session['admin_username'])
+            payload['message'] += placement_message(placed)
+            payload.update(placed or {})
+        return jsonify(payload), status
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/admin/api/proposals')
+def list_proposals():
+    """Pending proposals from the incremental matcher, oldest first"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    proposals = AllocationProposal.query.filter_by(status='pending').order_by(AllocationProposal.id).all()
+    return jsonify({'success': True, 'proposals': [proposal_json(p) for p in proposals]})
+
+@bp.route('/admin/api/proposals/<int:proposal_id>/<action>', methods=['POST'])
+def decide_proposal(proposal_id, action):
+    """Approve (allocate) or reject a proposal; a rejected house is offered to the next applicant"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    if action not in ('approve', 'reject'):
+        return jsonify({'success': False, 'error': 'Unknown action'}), 404
+    
+    try:
+        proposal = db.session.get(AllocationProposal, proposal_id)
+        if not proposal:
+            return jsonify({'success': False, 'error': 'Proposal not found'}), 404
+        if proposal.status != 'pending':
+            return jsonify({'success': False, 'error': f'Proposal was already {proposal.status}'}), 409
+        app_id, house_id = proposal.application_id, proposal.house_id
+        
+        payload, status = {'success': True, 'message': 'Proposal rejected'}, 200
+        if action == 'approve':
+            payload, status = with_write_retries(lambda: allocate_pair(
+                app_id, house_id, session['admin_username'], require_approved=True))
+        
+        proposal = db.session.get(AllocationProposal, proposal_id)
+        proposal.status = 'rejected' if action == 'reject' else 'approved' if status == 200 else 'expired'
+        proposal.decided_by = session['admin_username']
+        proposal.decided_date = datetime.utcnow()
+        db.session.commit()
+        payload['proposal'] = proposal_json(proposal)
+        
+        if proposal.status != 'approved':
+            application = db.session.get(Application, app_id)
+            if application:
+                track_application(application)
+            rejected = [row.application_id for row in db.session.query(AllocationProposal.application_id)
+                        .filter_by(house_id=house_id, status='rejected')]
+            placed = place_house(house_id, session['admin_username'], exclude=rejected)
+            if placed:
+                payload['next'] = placed
+        return jsonify(payload), status
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/admin/allocate')
 def admin_allocate():
     if not session.get('admin_logged_in'):
         return redirect('/admin/login')
@@ -435,57 +947,24 @@ def admin_allocate():
     
     return render_template('admin-allocate.html',
                          applications=eligible_apps,
-                         houses=available_houses)
+                         houses=available_houses,
+                         proposals=pending_proposals())
 
-@app.route('/admin/api/allocate-house', methods=['POST'])
+@bp.route('/admin/api/allocate-house', methods=['POST'])
 def allocate_house():
     if not session.get('admin_logged_in'):
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
         data = request.json
-        app_id = data.get('application_id')
-        house_id = data.get('house_id')
-        
-        app = Application.query.get(app_id)
-        house = House.query.get(house_id)
-        
-        if not app or not house:
-            return jsonify({'success': False, 'error': 'Invalid application or house'})
-        
-        if house.status != 'available':
-            return jsonify({'success': False, 'error': 'House is not available'})
-        
-        # Calculate match score
-        match_score = calculate_match_score(app, house)
-        
-        # Perform allocation
-        app.allocated_house_id = house.id
-        app.status = 'allocated'
-        house.status = 'occupied'
-        house.current_occupant_id = app.id
-        
-        # Create allocation log
-        allocation = AllocationLog(
-            application_id=app.id,
-            house_id=house.id,
-            allocated_by=session['admin_username'],
-            match_score=match_score
-        )
-        db.session.add(allocation)
-        
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': f'✅ House {house.house_id} allocated to {app.name}',
-            'allocation': {
-                'application': app.name,
-                'house': house.house_id,
-                'address': house.address,
-                'match_score': match_score
-            }
-        })
+        payload, status = with_write_retries(lambda: allocate_pair(
+            data.get('application_id'),
+            data.get('house_id'),
+            session['admin_username'],
+            application_version=data.get('application_version'),
+            house_version=data.get('house_version')
+        ))
+        return jsonify(payload), status
         
     except Exception as e:
         db.session.rollback()
@@ -500,18 +979,789 @@ def check_password_hash(stored_hash, password):
     return stored_hash == hash_password(password)
 
 def calculate_match_score(application, house):
-    score = 50  # Base score
+    return int(match_score_matrix([application.family_size], [house.bedrooms], [house.size])[0, 0])
+
+waiting_index = None
+waiting_index_lock = threading.Lock()
+
+def waiting_key(app_id, priority_score, applied_date):
+    """Waiting list order: priority_score desc, applied_date asc, id asc"""
+    return (-(priority_score or 0), applied_date or datetime.min, app_id)
+
+def get_waiting_index():
+    """Rank index over all applications, built on first use"""
+    global waiting_index
+    if waiting_index is None:
+        with waiting_index_lock:
+            if waiting_index is None:
+                rows = db.session.query(Application.id, Application.priority_score, Application.applied_date)
+                waiting_index = RankIndex(waiting_key(*row) for row in rows)
+    return waiting_index
+
+def rebuild_waiting_index():
+    """Reload the rank index after bulk changes, swapping it in one step"""
+    rows = db.session.query(Application.id, Application.priority_score, Application.applied_date)
+    get_waiting_index().replace_all([waiting_key(*row) for row in rows])
+
+def index_application(application):
+    """Add or refresh one application in the rank index"""
+    key = waiting_key(application.id, application.priority_score, application.applied_date)
+    index = get_waiting_index()
+    index.discard(key)
+    index.add(key)
+
+house_locations = None
+house_locations_lock = threading.Lock()
+
+def get_house_locations():
+    """Spatial index over every geocoded house, built on first use"""
+    global house_locations
+    index = house_locations
+    if index is None:
+        with house_locations_lock:
+            if house_locations is None:
+                rows = db.session.query(House.id, House.latitude, House.longitude).filter(
+                    House.latitude.isnot(None), House.longitude.isnot(None)).all()
+                house_locations = SpatialIndex(*zip(*rows)) if rows else SpatialIndex([], [], [])
+            index = house_locations
+    return index
+
+def reset_house_locations():
+    """Drop the spatial index after houses are added, deleted or geocoded"""
+    global house_locations
+    house_locations = None
+
+suggestion_index = (None, None)  # (event id it was built at, index)
+suggestion_index_lock = threading.Lock()
+
+def get_suggestion_index():
+    """Top-k index over available houses and eligible applicants.
+
+    Every committed change publishes an event, so the index is rebuilt on
+    first use after the feed moves on.
+    """
+    global suggestion_index
+    built_at, index = suggestion_index
+    if index is None or built_at != event_broker.last_id:
+        with suggestion_index_lock:
+            built_at, index = suggestion_index
+            if index is None or built_at != event_broker.last_id:
+                last_id = event_broker.last_id
+                houses = db.session.query(House.id, House.bedrooms, House.size).filter_by(status='available').all()
+                apps = db.session.query(Application.id, Application.priority_score, Application.family_size).filter_by(
+                    status='approved', allocated_house_id=None).order_by(*APPLICATION_ORDER).all()
+                index = SuggestionIndex(houses, apps)
+                suggestion_index = (last_id, index)
+    return index
+
+eligible_queue = None
+eligible_queue_lock = threading.Lock()
+
+def get_eligible_queue():
+    """Approved applicants without a house, built on first use.
+
+    Applicants with a pending proposal are held out until it is decided.
+    """
+    global eligible_queue
+    queue = eligible_queue
+    if queue is None:
+        with eligible_queue_lock:
+            if eligible_queue is None:
+                proposed = db.session.query(AllocationProposal.application_id).filter_by(status='pending')
+                rows = db.session.query(Application.id, Application.priority_score, Application.applied_date,
+                                        Application.family_size).filter(
+                    Application.status == 'approved', Application.allocated_house_id.is_(None),
+                    Application.id.notin_(proposed))
+                eligible_queue = EligibleQueue(
+                    (row.id, waiting_key(row.id, row.priority_score, row.applied_date), row.family_size)
+                    for row in rows)
+            queue = eligible_queue
+    return queue
+
+def reset_eligible_queue():
+    """Drop the queue after bulk changes; it is rebuilt on next use"""
+    global eligible_queue
+    eligible_queue = None
+
+def reset_caches():
+    """Forget every index and cached response, so a new app starts cold"""
+    global waiting_index, house_locations, suggestion_index, eligible_queue, counters_seeded
+    waiting_index = None
+    house_locations = None
+    suggestion_index = (None, None)
+    eligible_queue = None
+    counters_seeded = False
+    response_cache.clear()
+
+def track_application(application):
+    """Queue or unqueue one application after its status or priority changed"""
+    queue = eligible_queue
+    if queue is None:
+        return
+    if application.status == 'approved' and application.allocated_house_id is None:
+        queue.push(application.id, waiting_key(application.id, application.priority_score, application.applied_date),
+                   application.family_size)
+    else:
+        queue.discard(application.id)
+
+MAX_MATCH_ATTEMPTS = 10
+
+def place_house(house_id, decided_by, exclude=()):
+    """Match a house that just became available with the first eligible
+    applicant in waiting list order.
+
+    Allocates it or records a proposal, depending on incremental_mode, and
+    returns {'allocation': ...}, {'proposal': ...} or None. Applicants in
+    exclude are skipped, e.g. ones already rejected for this house.
+    """
+    if incremental_mode == 'off':
+        return None
+    house = db.session.get(House, house_id)
+    if not house or house.status != 'available':
+        return None
+    pending = AllocationProposal.query.filter_by(house_id=house.id, status='pending').first()
+    if pending:
+        return {'proposal': proposal_json(pending)}
+    
+    queue = get_eligible_queue()
+    exclude = set(exclude)
+    for _ in range(MAX_MATCH_ATTEMPTS):
+        candidate = queue.best_for(house.bedrooms, house.size, exclude=exclude)
+        if candidate is None:
+            return None
+        app_id, match_score = candidate
+        
+        if incremental_mode == 'propose':
+            # The queue can be behind other workers, so check the applicant
+            # under the write lock before proposing them
+            db.session().pin_writer()
+            eligible = db.session.query(Application.id).filter_by(
+                id=app_id, status='approved', allocated_house_id=None).scalar()
+            if eligible is None:
+                db.session.rollback()
+                queue.discard(app_id)
+                exclude.add(app_id)
+                continue
+            proposal = AllocationProposal(application_id=app_id, house_id=house.id,
+                                          match_score=match_score, proposed_by=decided_by)
+            db.session.add(proposal)
+            db.session.commit()
+            queue.discard(app_id)
+            event_broker.publish('proposal', proposal_json(proposal))
+            return {'proposal': proposal_json(proposal)}
+        
+        payload, status = with_write_retries(
+            lambda: allocate_pair(app_id, house.id, decided_by, require_approved=True))
+        if status == 200:
+            return {'allocation': payload['allocation']}
+        if db.session.query(House.status).filter_by(id=house.id).scalar() != 'available':
+            return None
+        # The queue was behind (e.g. another worker changed the application)
+        queue.discard(app_id)
+        exclude.add(app_id)
+    return None
+
+def proposal_json(proposal):
+    return {
+        'id': proposal.id,
+        'application_id': proposal.application_id,
+        'house_id': proposal.house_id,
+        'match_score': proposal.match_score,
+        'status': proposal.status,
+        'proposed_date': proposal.proposed_date.isoformat() if proposal.proposed_date else None
+    }
+
+def expire_proposals(house_id):
+    """Expire pending proposals for a house that went away; returns their applicants to the queue"""
+    proposals = AllocationProposal.query.filter_by(house_id=house_id, status='pending').all()
+    for proposal in proposals:
+        proposal.status = 'expired'
+        proposal.decided_date = datetime.utcnow()
+    db.session.commit()
+    for proposal in proposals:
+        application = db.session.get(Application, proposal.application_id)
+        if application:
+            track_application(application)
+
+def houses_within(latitude, longitude, radius_km, by_road=False):
+    """(house ids, km) of every geocoded house within radius_km, nearest first.
+
+    Covers all statuses; callers filter for the houses they can use.
+    """
+    index = get_house_locations()
+    positions, km = index.within(latitude, longitude, radius_km)
+    if by_road and len(positions):
+        # Roads are never shorter than the straight line, so the KD-tree
+        # candidates are a superset of the houses in road range
+        km = road_graph.road_distances_km(latitude, longitude, index.lats[positions], index.lons[positions])
+        order = np.argsort(km, kind='stable')
+        keep = order[km[order] <= radius_km]
+        positions, km = positions[keep], km[keep]
+    return index.ids[positions], km
+
+def geocode_missing(chunk_size=10000, progress=None, models=None, after_id=0):
+    """Fill in coordinates for rows whose address has a known place.
+
+    Only rows of the given models (default: applications and houses) with an
+    id above after_id are looked at.
+    """
+    stats = {'scanned': 0, 'geocoded': 0}
+    for model in models or (Application, House):
+        last_id = after_id
+        while True:
+            rows = db.session.query(model.id, model.address).filter(
+                model.id > last_id, model.latitude.is_(None)
+            ).order_by(model.id).limit(chunk_size).all()
+            if not rows:
+                break
+            updates = []
+            for row_id, address in rows:
+                point = geocoder.geocode(address)
+                if point:
+                    updates.append({'b_id': row_id, 'b_latitude': point[0], 'b_longitude': point[1]})
+            if updates:
+                table = model.__table__
+                db.session.execute(
+                    update(table).where(table.c.id == bindparam('b_id')).values(
+                        latitude=bindparam('b_latitude'), longitude=bindparam('b_longitude'),
+                        version=table.c.version + 1),
+                    updates
+                )
+            db.session.commit()
+            last_id = rows[-1][0]
+            stats['scanned'] += len(rows)
+            stats['geocoded'] += len(updates)
+            if progress:
+                progress(stats)
+    reset_house_locations()
+    return stats
+
+def encode_cursor(application):
+    """Opaque keyset cursor for an application row"""
+    applied_date = application.applied_date.isoformat() if application.applied_date else None
+    payload = json.dumps([application.priority_score, applied_date, application.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """(priority_score, applied_date, id) from encode_cursor; applied_date may be None"""
+    padded = token + '=' * (-len(token) % 4)
+    priority_score, applied_date, app_id = json.loads(base64.urlsafe_b64decode(padded))
+    return (int(priority_score),
+            datetime.fromisoformat(applied_date) if applied_date is not None else None,
+            int(app_id))
+
+def page_cursors():
+    """Decode the ?after= / ?before= cursors of the current request"""
+    try:
+        after = request.args.get('after')
+        before = request.args.get('before')
+        return (decode_cursor(after) if after else None,
+                decode_cursor(before) if before else None)
+    except (ValueError, TypeError):
+        abort(400)
+
+def keyset_page(query, after=None, before=None, limit=PAGE_SIZE):
+    """One page of applications in waiting list order, seeking past a cursor.
+
+    Returns (rows, prev_cursor, next_cursor); cursors are None at either end.
+    """
+    p, d, i = Application.priority_score, Application.applied_date, Application.id
+    # The outer range on priority_score lets SQLite seek ix_application_rank.
+    # NULL dates sort before all others, so they need their own terms
+    if before:
+        bp, bd, bi = before
+        if bd is None:
+            earlier = or_(p > bp, and_(d.is_(None), i < bi))
+        else:
+            earlier = or_(p > bp, d.is_(None), d < bd, and_(d == bd, i < bi))
+        rows = query.filter(p >= bp, earlier).order_by(
+            p.asc(), d.desc(), i.desc()).limit(limit + 1).all()
+        has_prev, has_next = len(rows) > limit, True
+        rows = rows[:limit][::-1]
+    else:
+        if after:
+            ap, ad, ai = after
+            if ad is None:
+                later = or_(p < ap, d.isnot(None), i > ai)
+            else:
+                later = or_(p < ap, d > ad, and_(d == ad, i > ai))
+            query = query.filter(p <= ap, later)
+        rows = query.order_by(*APPLICATION_ORDER).limit(limit + 1).all()
+        has_prev, has_next = after is not None, len(rows) > limit
+        rows = rows[:limit]
+    
+    if not rows:
+        return rows, None, None
+    return (rows,
+            encode_cursor(rows[0]) if has_prev else None,
+            encode_cursor(rows[-1]) if has_next else None)
+
+def stream_page(template_name, **context):
+    """Render a template incrementally so the first rows reach the browser early"""
+    current_app.update_template_context(context)
+    stream = current_app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(20)
+    return Response(stream_with_context(stream))
+
+counters_seeded = False
+
+def count_transition(kind, old_status, new_status, n=1, deltas=None):
+    """Move n rows between status counters inside the current transaction.
+
+    The change is also added to deltas, if given, for the change feed.
+    """
+    if old_status == new_status:
+        return
+    invalidate_on_commit(*COUNTER_RESPONSES)
+    for status, delta in ((old_status, -n), (new_status, n)):
+        if status is None:
+            continue
+        if deltas is not None:
+            kind_deltas = deltas.setdefault(kind, {})
+            kind_deltas[status] = kind_deltas.get(status, 0) + delta
+        db.session.execute(
+            sqlite_insert(StatusCounter)
+            .values(kind=kind, status=status, count=delta)
+            .on_conflict_do_update(index_elements=['kind', 'status'],
+                                   set_={'count': StatusCounter.count + delta})
+        )
+
+def reconcile_counters():
+    """Rebuild the status counters with one GROUP BY per table.
+
+    Counts are read under the write lock, so no transition can commit
+    between the GROUP BY and the rewrite.
+    """
+    global counters_seeded
+    db.session().pin_writer()
+    rows = []
+    for kind, model in (('application', Application), ('house', House)):
+        for status, count in db.session.query(model.status, func.count(model.id)).group_by(model.status):
+            if status is not None:
+                rows.append({'kind': kind, 'status': status, 'count': count})
+    db.session.query(StatusCounter).delete()
+    if rows:
+        db.session.execute(insert(StatusCounter), rows)
+    invalidate_on_commit(*COUNTER_RESPONSES)
+    db.session.commit()
+    counters_seeded = True
+
+def get_status_counts():
+    """Status counts per table from the counter table.
+
+    `flask init-db` fills the table, as does first use if it is still empty;
+    after that it only moves with count_transition. Drift is repaired by `flask reconcile-counters` or a
+    reconcile job, never on the request path.
+    """
+    counters = StatusCounter.query.all()
+    if not counters and not counters_seeded:
+        reconcile_counters()
+        counters = StatusCounter.query.all()
+    counts = {'application': defaultdict(int), 'house': defaultdict(int)}
+    for counter in counters:
+        counts[counter.kind][counter.status] = counter.count
+    return counts
+
+def run_import(lines, fmt, progress=None):
+    """Import applications, then refresh the counters and rank index and
+    geocode the new rows once. Chunks committed before a file turns out to be
+    unreadable are refreshed too, before the error is raised."""
+    last_id = db.session.query(func.max(Application.id)).scalar() or 0
+    db.session.commit()  # end the read, so the count below sees the import
+    try:
+        return import_applications(db.engine, Application.__table__, lines, fmt,
+                                   progress=progress, policy=scoring_policy)
+    finally:
+        imported = db.session.query(func.count(Application.id)).filter(Application.id > last_id).scalar()
+        if imported:
+            reconcile_counters()
+            rebuild_waiting_index()
+            reset_eligible_queue()
+            geocode_missing(models=(Application,), after_id=last_id)
+            counts = get_status_counts()
+            event_broker.publish('import', {
+                'imported': imported,
+                'status_counts': {kind: dict(c) for kind, c in counts.items()}
+            })
+
+def run_rescore(progress=None):
+    """Rescore all active applications, then swap in a rebuilt rank index"""
+    stats = rescore_applications(db.engine, scoring_policy, progress=progress)
+    rebuild_waiting_index()
+    reset_eligible_queue()
+    response_cache.clear()
+    event_broker.publish('rescore', {'updated': stats['updated']})
+    return stats
+
+def run_simulation(scenarios=DEFAULT_SCENARIOS, horizon_days=None, workers=None, seed=0, progress=None):
+    """Replay the current waiting list under the policies in config.json's "simulation" section"""
+    settings = app_config.get('simulation', {})
+    snapshot = Snapshot.from_database(db.engine)
+    # Configured rates replace the ones estimated from recent history
+    if settings.get('arrivals_per_day') is not None:
+        snapshot.arrivals_per_day = settings['arrivals_per_day']
+    if settings.get('vacancies_per_day') is not None:
+        snapshot.vacancies_per_day = settings['vacancies_per_day']
+    policies = build_policies(scoring_policy, settings.get('policies'))
+    return simulate(snapshot, policies, scenarios,
+                    horizon_days=horizon_days or settings.get('horizon_days', DEFAULT_HORIZON_DAYS),
+                    workers=workers or settings.get('workers'), seed=seed,
+                    bands=reporting_bands(scoring_policy), progress=progress)
+
+# Cached responses built from the status counters
+COUNTER_RESPONSES = ('stats', 'waiting-list-count')
+
+def invalidate_on_commit(*keys):
+    """Drop cached responses once the current transaction commits; no keys drops them all"""
+    db.session.info.setdefault('invalidate', set()).update(keys or ['*'])
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_committed(session):
+    keys = session.info.pop('invalidate', None)
+    if not keys:
+        return
+    if '*' in keys:
+        response_cache.clear()
+    else:
+        response_cache.invalidate(*keys)
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('invalidate', None)
+
+def cached_json(key, build, ttl=None, revision=None):
+    """JSON response served from the response cache, with ETag revalidation.
+
+    build() returns (payload, status); only 200 responses are cached. Pass the
+    current revision of the rows behind the response (see row_version) to
+    rebuild it as soon as any worker commits a change to them.
+    """
+    entry = response_cache.get(key, revision)
+    if entry is None:
+        token = response_cache.begin()
+        payload, status = build()
+        if status != 200:
+            return jsonify(payload), status
+        body = current_app.json.dumps(payload)
+        etag = response_cache.put(key, body, token, ttl, revision)
+    else:
+        etag, body = entry
+    
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Browsers revalidate every time and get a 304 while nothing changed
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+def row_version(model, row_id):
+    """Committed version of one row, or None if there is no such row"""
+    return db.session.query(model.version).filter(model.id == row_id).scalar()
+
+# Conditional claims used by allocations: a row only changes if it is still free
+HOUSE_TABLE = House.__table__
+APPLICATION_TABLE = Application.__table__
+CLAIM_HOUSE = (
+    update(HOUSE_TABLE)
+    .where(HOUSE_TABLE.c.id == bindparam('b_house_id'), HOUSE_TABLE.c.status == 'available')
+    .values(status='occupied', current_occupant_id=bindparam('b_app_id'), version=HOUSE_TABLE.c.version + 1)
+)
+CLAIM_APPLICATION = (
+    update(APPLICATION_TABLE)
+    .where(APPLICATION_TABLE.c.id == bindparam('b_app_id'), APPLICATION_TABLE.c.status == 'approved',
+           APPLICATION_TABLE.c.allocated_house_id.is_(None))
+    .values(status='allocated', allocated_house_id=bindparam('b_house_id'), version=APPLICATION_TABLE.c.version + 1)
+)
+
+WRITE_RETRIES = 3
+WRITE_BACKOFF_SECONDS = 0.05
+
+def with_write_retries(operation):
+    """Run operation(), retrying with jittered exponential backoff while the
+    write lock is contended. Lost races are not retried; they are answers."""
+    for attempt in range(WRITE_RETRIES):
+        try:
+            return operation()
+        except (OperationalError, PoolTimeoutError) as e:
+            db.session.rollback()
+            contended = isinstance(e, PoolTimeoutError) or 'locked' in str(e)
+            if not contended or attempt == WRITE_RETRIES - 1:
+                raise
+            time.sleep(WRITE_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+
+def allocate_pair(app_id, house_id, allocated_by, application_version=None, house_version=None,
+                  require_approved=False):
+    """Allocate one house to one application; returns (payload, http status).
+
+    The house is claimed with a conditional UPDATE first, so two admins can
+    never both get it. Passing the versions the admin was looking at turns
+    any change since then into a conflict instead of a silent overwrite.
+    """
+    claim = update(HOUSE_TABLE).where(HOUSE_TABLE.c.id == house_id, HOUSE_TABLE.c.status == 'available')
+    if house_version is not None:
+        claim = claim.where(HOUSE_TABLE.c.version == house_version)
+    claimed = db.session.execute(
+        claim.values(status='occupied', current_occupant_id=app_id, version=HOUSE_TABLE.c.version + 1)
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        house = db.session.get(House, house_id)
+        if not house:
+            return {'success': False, 'error': 'Invalid application or house'}, 404
+        if house.status != 'available':
+            return {'success': False, 'error': 'House is not available'}, 409
+        return {'success': False, 'error': 'House was changed by someone else, please reload'}, 409
+    
+    # The write lock is held from the claim on, so these reads are current
+    app = db.session.get(Application, app_id)
+    house = db.session.get(House, house_id)
+    if not app:
+        db.session.rollback()
+        return {'success': False, 'error': 'Invalid application or house'}, 404
+    if app.status == 'allocated' or app.allocated_house_id:
+        db.session.rollback()
+        return {'success': False, 'error': 'Application already has a house'}, 409
+    if require_approved and app.status != 'approved':
+        db.session.rollback()
+        return {'success': False, 'error': 'Application is not approved'}, 409
+    if application_version is not None and app.version != application_version:
+        db.session.rollback()
+        return {'success': False, 'error': 'Application was changed by someone else, please reload'}, 409
+    
+    match_score = calculate_match_score(app, house)
+    deltas = {}
+    count_transition('application', app.status, 'allocated', deltas=deltas)
+    count_transition('house', 'available', 'occupied', deltas=deltas)
+    invalidate_on_commit(f'application:{app.id}', f'house:{house.id}')
+    app.allocated_house_id = house.id
+    app.status = 'allocated'
+    allocated_date = datetime.utcnow()
+    db.session.add(AllocationLog(
+        application_id=app.id,
+        house_id=house.id,
+        allocated_date=allocated_date,
+        allocated_by=allocated_by,
+        match_score=match_score
+    ))
+    record_allocations(db.session, [(allocated_date, allocated_by, match_score, app.applied_date)])
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return {'success': False, 'error': 'Application was changed by someone else, please reload'}, 409
+    
+    track_application(app)
+    event_broker.publish('allocation', {
+        'application_id': app.id,
+        'house_id': house.id,
+        'match_score': match_score,
+        'counts': deltas
+    })
+    return {
+        'success': True,
+        'message': f'✅ House {house.house_id} allocated to {app.name}',
+        'allocation': {
+            'application': app.name,
+            'house': house.house_id,
+            'address': house.address,
+            'match_score': match_score
+        }
+    }, 200
+
+def vacate(house_id):
+    """Free an occupied house and end its occupant's allocation; returns (payload, http status)"""
+    house = db.session.get(House, house_id)
+    if not house:
+        return {'success': False, 'error': 'House not found'}, 404
+    if house.status != 'occupied':
+        return {'success': False, 'error': 'House is not occupied'}, 409
+    
+    occupant = db.session.get(Application, house.current_occupant_id) if house.current_occupant_id else None
+    deltas = {}
+    count_transition('house', house.status, 'available', deltas=deltas)
+    invalidate_on_commit(f'house:{house.id}')
+    house.status = 'available'
+    house.current_occupant_id = None
+    if occupant and occupant.allocated_house_id == house.id:
+        count_transition('application', occupant.status, 'vacated', deltas=deltas)
+        invalidate_on_commit(f'application:{occupant.id}')
+        occupant.status = 'vacated'
+        occupant.allocated_house_id = None
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return {'success': False, 'error': 'House was changed by someone else, please reload'}, 409
+    
+    event_broker.publish('vacated', {
+        'house_id': house.id,
+        'application_id': occupant.id if occupant else None,
+        'counts': deltas
+    })
+    return {'success': True, 'message': f'House {house.house_id} vacated'}, 200
+
+def placement_message(placed):
+    if not placed:
+        return ''
+    if 'allocation' in placed:
+        return f" and allocated to {placed['allocation']['application']}"
+    return f" and proposed for application #{placed['proposal']['application_id']}"
+
+def pending_proposals():
+    """Pending proposals with their application and house, for the allocation page"""
+    return (db.session.query(AllocationProposal, Application, House)
+            .join(Application, AllocationProposal.application_id == Application.id)
+            .join(House, AllocationProposal.house_id == House.id)
+            .filter(AllocationProposal.status == 'pending')
+            .order_by(AllocationProposal.id).all())
+
+def parse_id_list(value):
+    """Parse a comma separated id list from the query string"""
+    if not value:
+        return None
+    return [int(part) for part in value.split(',') if part.strip()]
+
+# Fields returned by the batch lookup endpoints, as in /api/application/<id> and /api/house/<id>
+APPLICATION_COLUMNS = (Application.id, Application.name, Application.age, Application.family_size,
+                       Application.income, Application.contact, Application.email, Application.address,
+                       Application.status, Application.priority_score, Application.applied_date,
+                       Application.version)
+HOUSE_COLUMNS = (House.id, House.house_id, House.address, House.house_type, House.bedrooms, House.size,
+                 House.status, House.current_occupant_id, House.facilities, House.added_date, House.version)
+MAX_BATCH_IDS = 1000
+
+def batch_lookup(model, columns, date_column):
+    """Rows for ?ids= from one IN query, as {column: [values]} in id order"""
+    try:
+        ids = parse_id_list(request.args.get('ids'))
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma separated list of integers'}), 400
+    if not ids:
+        return jsonify({'error': 'No ids given'}), 400
+    if len(ids) > MAX_BATCH_IDS:
+        return jsonify({'error': f'At most {MAX_BATCH_IDS} ids per request'}), 400
     
-    # Bedroom compatibility
-    ideal_bedrooms = (application.family_size + 1) // 2
-    bedroom_diff = abs(house.bedrooms - ideal_bedrooms)
-    score += max(0, 30 - (bedroom_diff * 10))
+    rows = db.session.query(*columns).filter(model.id.in_(ids)).order_by(model.id).all()
+    data = {column.key: list(values) for column, values in zip(columns, zip(*rows))}
+    if not rows:
+        data = {column.key: [] for column in columns}
+    data[date_column] = [value.strftime('%Y-%m-%d') if value else None for value in data[date_column]]
     
-   
+    found = set(data['id'])
+    return jsonify({
+        'count': len(rows),
+        'columns': data,
+        'missing': [record_id for record_id in dict.fromkeys(ids) if record_id not in found]
+    })
+
+# ==================== BACKGROUND JOBS ====================
+
+def upload_dir():
+    """Where uploaded import files wait until their job has read them"""
+    return os.path.join(current_app.instance_path, 'uploads')
+
+def enqueue(kind, params):
+    """Queue a background job; answers 202 with where to follow it"""
+    try:
+        job_id = job_runner.submit(kind, params, session.get('admin_username'))
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    return jsonify({
+        'success': True,
+        'message': f'{kind.title()} job {job_id} queued',
+        'job_id': job_id,
+        'status_url': f'/admin/api/jobs/{job_id}'
+    }), 202
+
+def job_json(job):
+    finished = job.finished_date or datetime.utcnow()
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'params': json.loads(job.params) if job.params else None,
+        'progress': json.loads(job.progress) if job.progress else None,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'created_by': job.created_by,
+        'created_date': job.created_date.isoformat() if job.created_date else None,
+        'started_date': job.started_date.isoformat() if job.started_date else None,
+        'finished_date': job.finished_date.isoformat() if job.finished_date else None,
+        'elapsed_seconds': round((finished - job.started_date).total_seconds(), 3) if job.started_date else None
+    }
+
+@bp.route('/admin/api/jobs/<int:job_id>')
+def get_job(job_id):
+    """Status, progress so far and final result of a background job"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_json(job))
+
+@bp.route('/admin/api/jobs')
+def list_jobs():
+    """Most recent jobs, newest first, without their results"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    jobs = Job.query.order_by(Job.id.desc()).limit(limit).all()
+    return jsonify({'jobs': [{**job_json(job), 'result': None} for job in jobs]})
+
+def allocation_job(params, progress):
+    payload, status = run_allocation_round(params['dry_run'], params['max_distance_km'],
+                                           params['allocated_by'], plan_id=params.get('plan_id'),
+                                           progress=progress)
+    if status != 200:
+        raise JobFailed(payload['error'])
+    return payload
+
+def import_job(params, progress):
+    try:
+        with open(params['path'], encoding='utf-8-sig', newline='') as f:
+            return run_import(f, params['format'], progress=progress)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise JobFailed(str(e))
+    finally:
+        os.remove(params['path'])
+
+def rescore_job(params, progress):
+    return run_rescore(progress=progress)
+
+def reconcile_job(params, progress):
+    reconcile_counters()
+    status_counts = {kind: dict(c) for kind, c in get_status_counts().items()}
+    event_broker.publish('reconcile', {'status_counts': status_counts})
+    return {'status_counts': status_counts}
+
+def simulation_job(params, progress):
+    return run_simulation(params['scenarios'], params['horizon_days'], seed=params['seed'], progress=progress)
+
+JOB_HANDLERS = {
+    'allocation': allocation_job,
+    'import': import_job,
+    'rescore': rescore_job,
+    'reconcile': reconcile_job,
+    'simulation': simulation_job,
+}
+
 # ==================== DATABASE SETUP ====================
 
-with app.app_context():
+def init_database():
+    """Create and upgrade the schema, add the default admin and sample houses if
+    missing, and rebuild the status counters"""
     db.create_all()
+    with db.engine.connect() as conn:
+        schema_version = conn.exec_driver_sql('PRAGMA user_version').scalar()
+    migrate_database(db.engine.url.database)
+    # Migration 3 added coordinates; fill them in for the rows it left empty
+    if schema_version < 3:
+        geocode_missing()
+    # Jobs run in the web processes' pools; run this before starting them, since
+    # nothing can still be running from before
+    job_runner.store.fail_interrupted()
     
     # Create default admin if not exists
     if not Admin.query.first():
@@ -533,134 +1783,725 @@ with app.app_context():
             House(house_id='H-103', address='789 Garden Ave, Islamabad', house_type='duplex', bedrooms=5, size=2500, rent=35000),
         ]
         for house in houses:
+            house.latitude, house.longitude = geocoder.geocode(house.address) or (None, None)
             db.session.add(house)
         db.session.commit()
+        reset_house_locations()
         print("✅ Sample houses added")
+    
+    # Seed the status counters before the first write moves them
+    reconcile_counters()
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the database and seed it; run before starting the app"""
+    init_database()
+    print(f"✅ Database ready: {db.engine.url.database}")
+
+@bp.cli.command('reconcile-counters')
+def reconcile_counters_command():
+    """Rebuild status counters from the application and house tables"""
+    reconcile_counters()
+    print("✅ Status counters reconciled")
+
+@bp.cli.command('import-applications')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension')
+def import_applications_command(path, fmt):
+    """Bulk import applications from a CSV or JSONL file"""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    
+    def report(stats):
+        print(f"  {stats['read']:,} rows read, {stats['imported']:,} imported, {stats['rejected']:,} rejected")
+    
+    try:
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            stats = run_import(f, fmt, progress=report)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise click.ClickException(str(e))
+    for error in stats['errors']:
+        print(f"  line {error['line']}: {error['error']}")
+    print(f"✅ Imported {stats['imported']:,} applications")
+
+@bp.cli.command('rescore')
+def rescore_command():
+    """Recompute priority scores for all active applications"""
+    def report(stats):
+        print(f"  {stats['scanned']:,} scanned, {stats['updated']:,} updated")
+    
+    stats = run_rescore(progress=report)
+    print(f"✅ Rescored {stats['scanned']:,} applications")
+
+@bp.cli.command('geocode')
+def geocode_command():
+    """Fill in coordinates for applications and houses from their addresses"""
+    def report(stats):
+        print(f"  {stats['scanned']:,} scanned, {stats['geocoded']:,} geocoded")
+    
+    stats = geocode_missing(progress=report)
+    print(f"✅ Geocoded {stats['geocoded']:,} of {stats['scanned']:,} rows without coordinates")
+
+@bp.cli.command('build-assets')
+def build_assets_command():
+    """Copy public CSS/JS to static/ under content-hashed names, precompressed"""
+    manifest = build_assets(ROOT_PATH, ASSET_DIR)
+    print(f"✅ Built {len(manifest)} assets into {ASSET_DIR}")
+
+@bp.cli.command('backfill-analytics')
+def backfill_analytics_command():
+    """Rebuild the allocation analytics rollups from allocation_log"""
+    def report(stats):
+        print(f"  {stats['scanned']:,} log rows scanned")
+    
+    stats = backfill_rollups(db.engine, progress=report)
+    print(f"✅ Rolled up {stats['scanned']:,} allocations over {stats['days']:,} days")
+
+@bp.cli.command('simulate')
+@click.option('--scenarios', default=DEFAULT_SCENARIOS, show_default=True, help='Arrival/vacancy scenarios to replay')
+@click.option('--horizon-days', type=int, help='Days each scenario covers (default from config.json)')
+@click.option('--workers', type=int, help='Worker processes (default: all cores)')
+@click.option('--seed', default=0, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the full report as JSON')
+def simulate_command(scenarios, horizon_days, workers, seed, output):
+    """Compare allocation policies on simulated futures of the current waiting list"""
+    def report(stats):
+        print(f"  {stats['completed']:,} of {stats['scenarios']:,} scenarios")
+    
+    result = run_simulation(scenarios, horizon_days, workers, seed, progress=report)
+    print(f"✅ {result['scenarios']:,} scenarios over {result['waiting_applicants']:,} waiting applicants "
+          f"in {result['elapsed_seconds']}s on {result['workers']} workers")
+    for name, metrics in result['policies'].items():
+        rates = ', '.join(f"{dimension} {fairness['rate_ratio']['mean']:.2f}"
+                          for dimension, fairness in metrics['fairness'].items() if fairness['rate_ratio'])
+        wait = f"{metrics['wait_p50_days']['mean']:.0f}" if metrics['wait_p50_days'] else '-'
+        print(f"  {name}: {metrics['allocation_rate']['mean']:.1%} housed, "
+              f"median wait {wait} days, band rate ratios: {rates or '-'}")
+    if output:
+        with open(output, 'w') as f:
+            json.dump(result, f, indent=2)
+
 # ==================== ADDITIONAL API ROUTES ====================
 
-@app.route('/api/stats')
+@bp.route('/api/stats')
 def api_stats():
     """Get system statistics for dashboard"""
-    stats = {
-        'total_applications': Application.query.count(),
-        'pending_applications': Application.query.filter_by(status='pending').count(),
-        'available_houses': House.query.filter_by(status='available').count(),
-        'allocated_today': AllocationLog.query.filter(
-            AllocationLog.allocated_date >= datetime.now().date()
-        ).count()
-    }
-    return jsonify(stats)
+    def build():
+        counts = get_status_counts()
+        return {
+            'total_applications': sum(counts['application'].values()),
+            'pending_applications': counts['application']['pending'],
+            'available_houses': counts['house']['available'],
+            'allocated_today': db.session.query(func.coalesce(func.sum(AllocationRollup.allocations), 0)).filter(
+                AllocationRollup.day == datetime.utcnow().date().isoformat()
+            ).scalar()
+        }, 200
+    
+    # allocated_today rolls over at midnight (UTC, like allocated_date) without any write
+    tomorrow = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time())
+    return cached_json('stats', build, ttl=(tomorrow - datetime.utcnow()).total_seconds())
 
-@app.route('/api/waiting-list-count')
+@bp.route('/api/waiting-list-count')
 def waiting_list_count():
     """Get waiting list count"""
-    count = Application.query.filter_by(status='pending').count()
-    return jsonify({'count': count})
+    return cached_json('waiting-list-count',
+                       lambda: ({'count': get_status_counts()['application']['pending']}, 200))
+
+@bp.route('/api/stream')
+def api_stream():
+    """Server-Sent Events feed of changes for admin pages; each event carries
+    the counter deltas.
 
-@app.route('/api/application/<int:app_id>')
+    Each open stream holds a worker thread for as long as the page is open, so
+    it is limited to admin sessions; public pages poll /api/stats instead.
+    Serve it from threaded or async workers (e.g. gunicorn --worker-class
+    gthread or gevent), never from sync workers alone.
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    except (TypeError, ValueError):
+        last_event_id = None
+    
+    app = current_app._get_current_object()
+    
+    def status_snapshot(event_type):
+        with app.app_context():
+            counts = get_status_counts()
+        return {'type': event_type, 'status_counts': {kind: dict(c) for kind, c in counts.items()}}
+    
+    def generate():
+        yield 'retry: 3000\n\n'
+        start_id = last_event_id
+        if start_id is None:
+            # New clients start from the current counts
+            start_id = event_broker.last_id
+            yield format_sse(start_id, status_snapshot('snapshot'))
+        for event in event_broker.listen(start_id):
+            if event is None:
+                yield ': keepalive\n\n'
+            elif event[1]['type'] == 'reset':
+                yield format_sse(event[0], status_snapshot('reset'))
+            else:
+                yield format_sse(*event)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/api/application/<int:app_id>')
 def get_application(app_id):
     """Get application details"""
+    def build():
+        app = Application.query.get(app_id)
+        if app:
+            return {
+                'id': app.id,
+                'name': app.name,
+                'age': app.age,
+                'family_size': app.family_size,
+                'income': app.income,
+                'contact': app.contact,
+                'email': app.email,
+                'address': app.address,
+                'status': app.status,
+                'priority_score': app.priority_score,
+                'applied_date': app.applied_date.strftime('%Y-%m-%d') if app.applied_date else None,
+                'version': app.version
+            }, 200
+        return {'error': 'Application not found'}, 404
+    
+    return cached_json(f'application:{app_id}', build, revision=row_version(Application, app_id))
+
+@bp.route('/api/application/<int:app_id>/position')
+def application_position(app_id):
+    """Get an application's place on the waiting list"""
     app = Application.query.get(app_id)
-    if app:
-        return jsonify({
-            'id': app.id,
-            'name': app.name,
-            'age': app.age,
-            'family_size': app.family_size,
-            'income': app.income,
-            'contact': app.contact,
-            'email': app.email,
-            'address': app.address,
-            'status': app.status,
-            'priority_score': app.priority_score,
-            'applied_date': app.applied_date.strftime('%Y-%m-%d') if app.applied_date else None
-        })
-    return jsonify({'error': 'Application not found'}), 404
+    if not app:
+        return jsonify({'error': 'Application not found'}), 404
+    
+    index = get_waiting_index()
+    rank = index.rank(waiting_key(app.id, app.priority_score, app.applied_date))
+    if rank is None:
+        index_application(app)
+        rank = index.rank(waiting_key(app.id, app.priority_score, app.applied_date))
+    
+    return jsonify({
+        'id': app.id,
+        'position': rank + 1,
+        'total': len(index),
+        'status': app.status,
+        'priority_score': app.priority_score
+    })
 
-@app.route('/api/house/<int:house_id>')
+@bp.route('/api/house/<int:house_id>')
 def get_house(house_id):
     """Get house details"""
-    house = House.query.get(house_id)
-    if house:
-        return jsonify({
-            'id': house.id,
-            'house_id': house.house_id,
-            'address': house.address,
-            'house_type': house.house_type,
-            'bedrooms': house.bedrooms,
-            'size': house.size,
-            'status': house.status,
-            'current_occupant_id': house.current_occupant_id,
-            'facilities': house.facilities,
-            'added_date': house.added_date.strftime('%Y-%m-%d') if house.added_date else None
-        })
-    return jsonify({'error': 'House not found'}), 404
+    def build():
+        house = House.query.get(house_id)
+        if house:
+            return {
+                'id': house.id,
+                'house_id': house.house_id,
+                'address': house.address,
+                'house_type': house.house_type,
+                'bedrooms': house.bedrooms,
+                'size': house.size,
+                'status': house.status,
+                'current_occupant_id': house.current_occupant_id,
+                'facilities': house.facilities,
+                'added_date': house.added_date.strftime('%Y-%m-%d') if house.added_date else None,
+                'version': house.version
+            }, 200
+        return {'error': 'House not found'}, 404
+    
+    return cached_json(f'house:{house_id}', build, revision=row_version(House, house_id))
+
+@bp.route('/api/applications')
+def get_applications():
+    """Get many applications at once: /api/applications?ids=1,2,3"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return batch_lookup(Application, APPLICATION_COLUMNS, 'applied_date')
 
-@app.route('/admin/api/run-allocation-algorithm', methods=['POST'])
+@bp.route('/api/houses')
+def get_houses():
+    """Get many houses at once: /api/houses?ids=1,2,3"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return batch_lookup(House, HOUSE_COLUMNS, 'added_date')
+
+@bp.route('/admin/api/run-allocation-algorithm', methods=['POST'])
 def run_allocation_algorithm():
-    """Run allocation algorithm"""
+    """Run the batch allocation engine (dry run unless dry_run is false).
+
+    Queues a background job and answers 202 with its id, or runs in the
+    request when the body has "wait": true. A dry run answers with a
+    plan_id; sending it back with dry_run false commits only that plan.
+    """
     if not session.get('admin_logged_in'):
         return jsonify({'error': 'Unauthorized'}), 401
     
+    data = request.get_json(silent=True) or {}
+    params = {
+        'dry_run': data.get('dry_run', True),
+        'max_distance_km': data.get('max_distance_km'),
+        'allocated_by': session['admin_username'],
+        'plan_id': data.get('plan_id')
+    }
+    if not data.get('wait'):
+        return enqueue('allocation', params)
+    
     try:
-        # Get approved applications
-        approved_apps = Application.query.filter_by(status='approved', allocated_house_id=None).all()
-        
-        # Get available houses
-        available_houses = House.query.filter_by(status='available').all()
-        
-        if not approved_apps or not available_houses:
-            return jsonify({
-                'success': True,
-                'message': 'No allocations possible',
-                'greedy_allocations': 0,
-                'knapsack_score': 0
-            })
-        
-        # Simple greedy allocation count
-        greedy_allocations = min(len(approved_apps), len(available_houses))
-        
-        # Mock knapsack score
-        knapsack_score = sum(app.priority_score for app in approved_apps[:greedy_allocations])
-        
-        return jsonify({
-            'success': True,
-            'message': f'Algorithm suggests {greedy_allocations} allocations',
-            'greedy_allocations': greedy_allocations,
-            'knapsack_score': knapsack_score
-        })
-        
+        payload, status = run_allocation_round(**params)
+        return jsonify(payload), status
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)})
 
+def allocation_plan_id(allocations):
+    """Fingerprint of a plan, so a commit can check it is the plan that was reviewed"""
+    digest = hashlib.sha256(json.dumps(
+        [[app_id, house_id, match_score] for app_id, house_id, match_score in allocations]
+    ).encode())
+    return digest.hexdigest()[:16]
+
+def run_allocation_round(dry_run, max_distance_km, allocated_by, plan_id=None, progress=None):
+    """One batch allocation pass; returns (payload, http status).
+
+    With a plan_id the commit goes through only if planning again gives
+    exactly the plan that was reviewed.
+    """
+    started = time.perf_counter()
+    
+    # Get approved applications, highest priority and oldest first
+    approved_apps = db.session.query(
+        Application.id, Application.priority_score, Application.family_size,
+        Application.latitude, Application.longitude, Application.applied_date
+    ).filter_by(status='approved', allocated_house_id=None).order_by(
+        Application.priority_score.desc(), Application.applied_date.asc(), Application.id.asc()
+    ).all()
+    
+    # Get available houses
+    available_houses = db.session.query(
+        House.id, House.bedrooms, House.size, House.latitude, House.longitude
+    ).filter_by(status='available').order_by(House.id).all()
+    if progress:
+        progress({'stage': 'planning', 'applications': len(approved_apps), 'houses': len(available_houses)})
+    
+    allocations = plan_allocations(approved_apps, available_houses,
+                                   max_distance_km=float(max_distance_km) if max_distance_km else None)
+    current_plan_id = allocation_plan_id(allocations)
+    if not dry_run and plan_id and plan_id != current_plan_id:
+        return {'success': False, 'plan_id': current_plan_id,
+                'error': 'Applications or houses changed since the plan was reviewed, please run a new dry run'}, 409
+    if progress:
+        progress({'stage': 'planned' if dry_run else 'writing', 'applications': len(approved_apps),
+                  'houses': len(available_houses), 'allocation_count': len(allocations)})
+    
+    if allocations and not dry_run:
+        # Write every allocation in one transaction, and only if no row
+        # changed since it was planned
+        pairs = [{'b_app_id': app_id, 'b_house_id': house_id} for app_id, house_id, _ in allocations]
+        houses_taken = db.session.execute(CLAIM_HOUSE, pairs).rowcount
+        apps_taken = db.session.execute(CLAIM_APPLICATION, pairs).rowcount
+        if houses_taken != len(pairs) or apps_taken != len(pairs):
+            db.session.rollback()
+            return {'success': False,
+                    'error': 'Applications or houses changed during planning, please run again'}, 409
+        allocated_date = datetime.utcnow()
+        db.session.execute(insert(AllocationLog), [
+            {'application_id': app_id, 'house_id': house_id,
+             'allocated_by': allocated_by, 'match_score': match_score,
+             'allocated_date': allocated_date}
+            for app_id, house_id, match_score in allocations
+        ])
+        applied_by_id = {row.id: row.applied_date for row in approved_apps}
+        record_allocations(db.session, [
+            (allocated_date, allocated_by, match_score, applied_by_id[app_id])
+            for app_id, _, match_score in allocations
+        ])
+        deltas = {}
+        count_transition('application', 'approved', 'allocated', len(allocations), deltas=deltas)
+        count_transition('house', 'available', 'occupied', len(allocations), deltas=deltas)
+        invalidate_on_commit()
+        db.session.commit()
+        queue = eligible_queue
+        if queue is not None:
+            for app_id, _, _ in allocations:
+                queue.discard(app_id)
+        event_broker.publish('allocation_batch', {'allocated': len(allocations), 'counts': deltas})
+    
+    priority_by_id = {row.id: row.priority_score for row in approved_apps}
+    total_match = sum(match_score for _, _, match_score in allocations)
+    
+    return {
+        'success': True,
+        'dry_run': dry_run,
+        'plan_id': current_plan_id,
+        'message': f'Algorithm {"suggests" if dry_run else "made"} {len(allocations)} allocations',
+        'allocation_count': len(allocations),
+        'total_priority': sum(priority_by_id[app_id] for app_id, _, _ in allocations),
+        'average_match_score': round(total_match / len(allocations), 1) if allocations else 0,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'allocations': [
+            {'application_id': app_id, 'house_id': house_id, 'match_score': match_score}
+            for app_id, house_id, match_score in allocations
+        ]
+    }, 200
+
+@bp.route('/admin/api/houses-near')
+def houses_near():
+    """Available houses within ?km= of an application (or of ?lat=&lon=), nearest first"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    radius_km = request.args.get('km', 10.0, type=float)
+    by_road = request.args.get('by_road') == '1'
+    limit = request.args.get('limit', 50, type=int)
+    
+    if request.args.get('application_id'):
+        app = db.session.get(Application, request.args.get('application_id', type=int))
+        if not app:
+            return jsonify({'error': 'Application not found'}), 404
+        latitude, longitude = app.latitude, app.longitude
+    else:
+        latitude, longitude = request.args.get('lat', type=float), request.args.get('lon', type=float)
+    if latitude is None or longitude is None:
+        return jsonify({'error': 'No location; pass lat and lon or a geocoded application_id'}), 400
+    
+    started = time.perf_counter()
+    ids, km = houses_within(latitude, longitude, radius_km, by_road=by_road)
+    lookup_ms = (time.perf_counter() - started) * 1000
+    
+    # Keep the nearest available ones, reading status for a bounded prefix at a time
+    houses = []
+    for offset in range(0, len(ids), MAX_BATCH_IDS):
+        chunk_ids = [int(i) for i in ids[offset:offset + MAX_BATCH_IDS]]
+        available = {row.id: row for row in db.session.query(House.id, House.house_id, House.bedrooms, House.size)
+                     .filter(House.id.in_(chunk_ids), House.status == 'available')}
+        for house_id, distance in zip(chunk_ids, km[offset:offset + MAX_BATCH_IDS]):
+            if house_id in available:
+                row = available[house_id]
+                houses.append({'id': row.id, 'house_id': row.house_id, 'bedrooms': row.bedrooms,
+                               'size': row.size, 'distance_km': round(float(distance), 2)})
+        if len(houses) >= limit:
+            break
+    
+    return jsonify({
+        'latitude': latitude,
+        'longitude': longitude,
+        'radius_km': radius_km,
+        'by_road': by_road,
+        'lookup_ms': round(lookup_ms, 3),
+        'houses': houses[:limit]
+    })
+
+@bp.route('/admin/api/match-matrix')
+def match_matrix():
+    """Match scores of applications (rows) against houses (columns)"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        app_ids = parse_id_list(request.args.get('application_ids'))
+        house_ids = parse_id_list(request.args.get('house_ids'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Ids must be integers'}), 400
+    
+    # Default to approved applications without houses and available houses
+    app_query = db.session.query(Application.id, Application.family_size)
+    if app_ids is None:
+        app_query = app_query.filter_by(status='approved', allocated_house_id=None).order_by(
+            Application.priority_score.desc(), Application.applied_date.asc())
+    else:
+        app_query = app_query.filter(Application.id.in_(app_ids))
+    
+    house_query = db.session.query(House.id, House.bedrooms, House.size)
+    if house_ids is None:
+        house_query = house_query.filter_by(status='available')
+    else:
+        house_query = house_query.filter(House.id.in_(house_ids))
+    
+    apps = app_query.all()
+    houses = house_query.all()
+    
+    scores = match_score_matrix(
+        [app.family_size for app in apps],
+        [house.bedrooms for house in houses],
+        [house.size for house in houses]
+    )
+    
+    return jsonify({
+        'success': True,
+        'application_ids': [app.id for app in apps],
+        'house_ids': [house.id for house in houses],
+        'scores': scores.tolist()
+    })
+
+MAX_SUGGESTIONS_K = 50
+
+def suggestion_params():
+    """(k, min_score) from the query string"""
+    k = max(1, min(request.args.get('k', 5, type=int), MAX_SUGGESTIONS_K))
+    min_score = request.args.get('min_score', MIN_MATCH_SCORE, type=int)
+    return k, min_score
+
+@bp.route('/admin/api/suggestions')
+def api_suggestions():
+    """Top-k available houses for every eligible applicant, in waiting list order.
+
+    Page with ?offset=&limit=; ids and scores per applicant are parallel arrays.
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    k, min_score = suggestion_params()
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = max(0, min(request.args.get('limit', MAX_BATCH_IDS, type=int), MAX_BULK_IDS))
+    
+    started = time.perf_counter()
+    index = get_suggestion_index()
+    built = time.perf_counter()
+    by_family = {}
+    applications = []
+    for app_id, _, family_size in index.applications[offset:offset + limit]:
+        if family_size not in by_family:
+            by_family[family_size] = index.top_houses(family_size, k, min_score)
+        top = by_family[family_size]
+        applications.append({
+            'id': app_id,
+            'house_ids': [house_id for house_id, _ in top],
+            'scores': [score for _, score in top]
+        })
+    
+    return jsonify({
+        'success': True,
+        'k': k,
+        'min_score': min_score,
+        'total': index.application_count,
+        'available_houses': index.house_count,
+        'offset': offset,
+        'index_ms': round((built - started) * 1000, 3),
+        'query_ms': round((time.perf_counter() - built) * 1000, 3),
+        'applications': applications
+    })
+
+@bp.route('/admin/api/suggestions/application/<int:app_id>')
+def api_application_suggestions(app_id):
+    """Top-k available houses for one application"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    app = db.session.get(Application, app_id)
+    if not app:
+        return jsonify({'error': 'Application not found'}), 404
+    
+    k, min_score = suggestion_params()
+    top = get_suggestion_index().top_houses(app.family_size, k, min_score)
+    return jsonify({
+        'success': True,
+        'application_id': app.id,
+        'house_ids': [house_id for house_id, _ in top],
+        'scores': [score for _, score in top]
+    })
+
+@bp.route('/admin/api/suggestions/house/<int:house_id>')
+def api_house_suggestions(house_id):
+    """Top-k eligible applicants for one house, best match then waiting list order"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    house = db.session.get(House, house_id)
+    if not house:
+        return jsonify({'error': 'House not found'}), 404
+    
+    k, min_score = suggestion_params()
+    top = get_suggestion_index().top_applicants(house.bedrooms, house.size, k, min_score)
+    return jsonify({
+        'success': True,
+        'house_id': house.id,
+        'application_ids': [app_id for app_id, _ in top],
+        'scores': [score for _, score in top]
+    })
+
+ANALYTICS_DEFAULT_DAYS = 30
+
+def analytics_range():
+    """(start_day, end_day) from ?from=&to= (YYYY-MM-DD), the last 30 days by default"""
+    today = datetime.utcnow().date()
+    end_day = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else today
+    start_day = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from')
+                 else end_day - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1))
+    return start_day.isoformat(), end_day.isoformat()
+
+@bp.route('/admin/api/analytics')
+def api_analytics():
+    """Allocation totals and per-admin throughput over a date range, from the rollups"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        start_day, end_day = analytics_range()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be YYYY-MM-DD'}), 400
+    
+    return jsonify({
+        'success': True,
+        'from': start_day,
+        'to': end_day,
+        'totals': allocation_totals(db.session, start_day, end_day),
+        'by_admin': allocations_by_admin(db.session, start_day, end_day)
+    })
+
+@bp.route('/admin/api/analytics/series')
+def api_analytics_series():
+    """Allocations, average match score and median wait per ?period=day|week, optionally for one ?admin="""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    period = request.args.get('period', 'day')
+    if period not in ('day', 'week'):
+        return jsonify({'success': False, 'error': 'period must be day or week'}), 400
+    try:
+        start_day, end_day = analytics_range()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be YYYY-MM-DD'}), 400
+    
+    return jsonify({
+        'success': True,
+        'from': start_day,
+        'to': end_day,
+        'period': period,
+        'series': allocation_series(db.session, start_day, end_day, period, request.args.get('admin'))
+    })
+
+@bp.route('/admin/api/simulate', methods=['POST'])
+def api_simulate():
+    """Queue a what-if simulation of the configured policies; follow it at the returned job"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    max_scenarios = app_config.get('simulation', {}).get('max_scenarios', 1000)
+    try:
+        scenarios = int(data.get('scenarios', DEFAULT_SCENARIOS))
+        horizon_days = int(data['horizon_days']) if data.get('horizon_days') else None
+        seed = int(data.get('seed', 0))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'scenarios, horizon_days and seed must be integers'}), 400
+    if not 1 <= scenarios <= max_scenarios:
+        return jsonify({'success': False, 'error': f'scenarios must be between 1 and {max_scenarios}'}), 400
+    
+    return enqueue('simulation', {'scenarios': scenarios, 'horizon_days': horizon_days, 'seed': seed})
+
+MAX_SEARCH_RESULTS = 100
+SEARCHES = {'applications': search_applications, 'houses': search_houses}
+
+def run_search(kinds):
+    """Ranked prefix matches for ?q= from each search in kinds, with ?limit= and ?offset="""
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_SEARCH_RESULTS))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    
+    started = time.perf_counter()
+    results, partially_ranked = {}, []
+    for kind in kinds:
+        results[kind], fully_ranked = SEARCHES[kind](db.session, query, limit, offset)
+        if not fully_ranked:
+            partially_ranked.append(kind)
+    return jsonify({
+        'success': True,
+        'query': query,
+        'limit': limit,
+        'offset': offset,
+        **results,
+        # Too many matches to rank them all; only the newest were ranked
+        'partially_ranked': partially_ranked,
+        'query_ms': round((time.perf_counter() - started) * 1000, 2)
+    })
+
+@bp.route('/admin/api/search')
+def api_search():
+    """Full-text search over applications and houses: ?q=ali kar matches words starting with each term"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return run_search(SEARCHES)
+
+@bp.route('/admin/api/search/<kind>')
+def api_search_kind(kind):
+    """The same search over applications or houses only, for paging with ?offset="""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    if kind not in SEARCHES:
+        return jsonify({'error': 'Search applications or houses'}), 404
+    return run_search([kind])
+
 # Add allocation suggestions route
-@app.route('/admin/allocate-suggestions')
+@bp.route('/admin/allocate-suggestions')
 def allocate_suggestions():
     if not session.get('admin_logged_in'):
         return redirect('/admin/login')
     
     # Get approved applications
-    apps = Application.query.filter_by(status='approved', allocated_house_id=None).all()
+    apps = Application.query.filter_by(status='approved', allocated_house_id=None).order_by(*APPLICATION_ORDER).all()
     
     # Get available houses
     houses = House.query.filter_by(status='available').all()
+    houses_by_id = {house.id: house for house in houses}
+    
+    # ?within_km= suggests the best nearby house for each applicant instead
+    within_km = request.args.get('within_km', type=float)
+    by_road = request.args.get('by_road') == '1'
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_BATCH_IDS))
     
     suggestions = []
-    for app in apps[:5]:  # Limit to 5 suggestions
-        for house in houses[:3]:  # Check 3 houses
-            match_score = calculate_match_score(app, house)
-            if match_score >= 70:  # Only good matches
+    if within_km:
+        for app in apps:
+            if len(suggestions) == limit:
+                break
+            if app.latitude is None or app.longitude is None:
+                continue
+            ids, km = houses_within(app.latitude, app.longitude, within_km, by_road=by_road)
+            nearby = [(houses_by_id[i], d) for i, d in zip(ids.tolist(), km) if i in houses_by_id]
+            if not nearby:
+                continue
+            scores = match_score_matrix([app.family_size], [h.bedrooms for h, _ in nearby],
+                                        [h.size for h, _ in nearby])[0]
+            best = int(np.argmax(scores))  # nearest among equal scores
+            if scores[best] >= 70:
                 suggestions.append({
                     'application': app,
-                    'house': house,
-                    'match_score': match_score
+                    'house': nearby[best][0],
+                    'match_score': int(scores[best]),
+                    'distance_km': round(float(nearby[best][1]), 1)
                 })
+    else:
+        # Highest priority first, each taking its best house not already suggested
+        index = get_suggestion_index()
+        apps_by_id = {app.id: app for app in apps}
+        suggested = set()
+        for app_id, _, family_size in index.applications:
+            if len(suggestions) == limit:
                 break
+            top = index.top_houses(family_size, len(suggested) + 1, min_score=70)  # Only good matches
+            house_id, score = next(((h, s) for h, s in top if h not in suggested), (None, None))
+            if house_id is None or app_id not in apps_by_id or house_id not in houses_by_id:
+                continue
+            suggested.add(house_id)
+            suggestions.append({
+                'application': apps_by_id[app_id],
+                'house': houses_by_id[house_id],
+                'match_score': score,
+                'distance_km': None
+            })
     
     return render_template('admin-allocate.html',
                          applications=apps,
                          houses=houses,
-                         suggestions=suggestions[:5])  # Limit to 5
+                         suggestions=suggestions)
 # ==================== MAIN ====================
 
 if __name__ == '__main__':
@@ -680,4 +2521,8 @@ if __name__ == '__main__':
     print("👤 Username: admin | Password: admin123")
     print("="*60)
     
+    app = create_app()
+    # The development server sets up its own database; deployments run `flask init-db`
+    with app.app_context():
+        init_database()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import abort, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+# Files in the project directory that are published, everything else stays private
+PUBLIC_EXTENSIONS = ('.css', '.js')
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _write(path, data):
+    # Write then rename, so a running server never serves a partial file
+    partial = path + '.tmp'
+    with open(partial, 'wb') as f:
+        f.write(data)
+    os.replace(partial, path)
+
+
+def build_assets(source_dir, output_dir):
+    """Copy public assets to output_dir under content-hashed names, with
+    precompressed .gz (and .br) siblings; returns {name: hashed name}.
+
+    Unchanged files are skipped and files from older builds are removed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {}
+    for name in sorted(os.listdir(source_dir)):
+        if not name.endswith(PUBLIC_EXTENSIONS) or not os.path.isfile(os.path.join(source_dir, name)):
+            continue
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            data = f.read()
+        stem, extension = os.path.splitext(name)
+        hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{extension}'
+        manifest[name] = hashed
+
+        path = os.path.join(output_dir, hashed)
+        if os.path.exists(path):
+            continue
+        variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(data):
+                _write(path + suffix, compressed)
+        _write(path, data)
+
+    keep = set(manifest.values())
+    for name in os.listdir(output_dir):
+        original = name[:-3] if name.endswith(('.gz', '.br')) else name
+        if name != MANIFEST_NAME and original not in keep:
+            os.remove(os.path.join(output_dir, name))
+    _write(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=4).encode())
+    return manifest
+
+
+def asset_response(directory, filename, accept_encodings, immutable):
+    """Response for one built asset, precompressed when the client accepts it"""
+    if filename == MANIFEST_NAME or filename.endswith(('.gz', '.br', '.tmp')):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    served, encoding = filename, None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accept_encodings[candidate] and os.path.exists(os.path.join(directory, filename + suffix)):
+            served, encoding = filename + suffix, candidate
+            break
+
+    response = send_from_directory(directory, served, mimetype=mimetype,
+                                   max_age=IMMUTABLE_MAX_AGE if immutable else 0)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    if immutable:
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,45 @@
+// Fetches application and house records in batches from /api/applications and
+// /api/houses, keeping what it already has so clicks on a row cost no request
+(function() {
+    const BATCH_SIZE = 1000;
+    const records = { applications: {}, houses: {} };
+    
+    function fetchBatch(kind, ids) {
+        return fetch(`/api/${kind}?ids=${ids.join(',')}`)
+            .then(res => res.json())
+            .then(data => {
+                const columns = Object.keys(data.columns);
+                data.columns.id.forEach((id, i) => {
+                    const record = {};
+                    columns.forEach(column => record[column] = data.columns[column][i]);
+                    records[kind][id] = record;
+                });
+            });
+    }
+    
+    // Resolves to {id: record} for every requested id that exists
+    window.fetchRecords = function(kind, ids) {
+        const missing = [...new Set(ids)].filter(id => !(id in records[kind]));
+        const batches = [];
+        for (let i = 0; i < missing.length; i += BATCH_SIZE) {
+            batches.push(fetchBatch(kind, missing.slice(i, i + BATCH_SIZE)));
+        }
+        return Promise.all(batches).then(() => {
+            const found = {};
+            ids.forEach(id => {
+                if (id in records[kind]) found[id] = records[kind][id];
+            });
+            return found;
+        });
+    };
+    
+    // Resolves to one record, or {error} if it does not exist
+    window.fetchRecord = function(kind, id) {
+        return window.fetchRecords(kind, [id]).then(found => found[id] || { error: 'Not found' });
+    };
+    
+    // Ids of the rows rendered on the page, e.g. pageIds('[id^="app-item-"]', 'app-item-')
+    window.pageIds = function(selector, prefix) {
+        return Array.from(document.querySelectorAll(selector), el => parseInt(el.id.slice(prefix.length)));
+    };
+})();
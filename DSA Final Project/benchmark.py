@@ -0,0 +1,217 @@
+"""HTTP load benchmark for the HomeAlloc routes.
+
+Drives the app's configured database, so generate data first:
+
+    python generate_data.py --applications 1000000 --houses 100000
+    python benchmark.py --requests 200 --threads 4 --output bench.json
+    python benchmark.py --server            # through a local WSGI server instead
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import random
+import resource
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+from werkzeug.serving import make_server
+
+import app as homealloc
+from app import Application, House, db
+
+ADMIN_LOGIN = {'username': 'admin', 'password': 'admin123'}
+
+app = homealloc.create_app()
+
+
+class TestClientDriver:
+    """Calls the app in-process through Flask's test client"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = app.test_client()
+            self.local.client.post('/admin/login', data=ADMIN_LOGIN)
+        return self.local.client
+
+    def request(self, method, path, form=None, json_body=None):
+        response = self.client().open(path, method=method, data=form, json=json_body)
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class ServerDriver:
+    """Calls the app over HTTP through a local threaded WSGI server"""
+
+    def __init__(self):
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.local = threading.local()
+
+    def opener(self):
+        if not hasattr(self.local, 'opener'):
+            self.local.opener = urllib.request.build_opener(
+                urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+            self.local.opener.open(self.base_url + '/admin/login',
+                                   urllib.parse.urlencode(ADMIN_LOGIN).encode()).read()
+        return self.local.opener
+
+    def request(self, method, path, form=None, json_body=None):
+        data, headers = None, {}
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        elif json_body is not None:
+            data, headers = json.dumps(json_body).encode(), {'Content-Type': 'application/json'}
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener().open(req) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def close(self):
+        self.server.shutdown()
+
+
+def random_application(rng):
+    return {
+        'name': f'Benchmark {rng.randint(1, 10**6)}',
+        'age': rng.randint(18, 90),
+        'family': rng.randint(1, 10),
+        'income': rng.randint(2000, 60000),
+        'contact': f'03{rng.randint(0, 10**9 - 1):09d}',
+    }
+
+
+def allocation_pairs(n):
+    """Eligible (application, house) pairs for the allocate-house route"""
+    with app.app_context():
+        apps = db.session.query(Application.id).filter_by(
+            status='approved', allocated_house_id=None).limit(n).all()
+        houses = db.session.query(House.id).filter_by(status='available').limit(n).all()
+    return [{'application_id': a.id, 'house_id': h.id} for a, h in zip(apps, houses)]
+
+
+def build_routes(n_requests):
+    rng = random.Random(0)
+    pairs = allocation_pairs(n_requests)
+    pair_lock = threading.Lock()
+
+    def next_pair():
+        with pair_lock:
+            return pairs.pop() if pairs else {'application_id': 0, 'house_id': 0}
+
+    return {
+        'apply': lambda driver: driver.request('POST', '/apply', form=random_application(rng)),
+        'waiting_list': lambda driver: driver.request('GET', '/waiting-list'),
+        'admin_dashboard': lambda driver: driver.request('GET', '/admin/dashboard'),
+        'api_stats': lambda driver: driver.request('GET', '/api/stats'),
+        'admin_allocate': lambda driver: driver.request('GET', '/admin/allocate'),
+        'allocate_house': lambda driver: driver.request('POST', '/admin/api/allocate-house', json_body=next_pair()),
+    }
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_route(driver, call, n_requests, n_threads):
+    """Fire n_requests calls over n_threads threads; returns latency stats"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    per_thread = [n_requests // n_threads + (i < n_requests % n_threads) for i in range(n_threads)]
+
+    def worker(count):
+        local = []
+        for _ in range(count):
+            started = time.perf_counter()
+            status = call(driver)
+            local.append(time.perf_counter() - started)
+            if status >= 400:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'requests': n_requests,
+        'errors': errors[0],
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 2),
+        'mean_ms': round(float(latencies_ms.mean()), 2),
+        'throughput_rps': round(n_requests / elapsed, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def table_sizes():
+    with app.app_context():
+        return {
+            'applications': db.session.query(Application.id).count(),
+            'houses': db.session.query(House.id).count(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the HomeAlloc routes')
+    parser.add_argument('--requests', type=int, default=100, help='requests per route')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--routes', help='comma separated subset of routes')
+    parser.add_argument('--server', action='store_true', help='go through a local WSGI server')
+    parser.add_argument('--output', default=f'benchmark-{datetime.now():%Y%m%d-%H%M%S}.json')
+    args = parser.parse_args()
+
+    routes = build_routes(args.requests)
+    if args.routes:
+        routes = {name: routes[name] for name in args.routes.split(',')}
+
+    driver = ServerDriver() if args.server else TestClientDriver()
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'mode': 'server' if args.server else 'test_client',
+        'threads': args.threads,
+        'database': table_sizes(),
+        'routes': {},
+    }
+    try:
+        print(f"{'route':<18}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}{'RSS MB':>9}")
+        for name, call in routes.items():
+            stats = run_route(driver, call, args.requests, args.threads)
+            results['routes'][name] = stats
+            print(f"{name:<18}{stats['p50_ms']:>10}{stats['p99_ms']:>10}{stats['throughput_rps']:>10}"
+                  f"{stats['errors']:>8}{stats['peak_rss_mb']:>9}")
+    finally:
+        driver.close()
+
+    results['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f'✅ Results saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import json
+import os
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+# Override any key under "sqlite" in config.json
+DEFAULT_SQLITE_SETTINGS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout_ms': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size_kib': 64 * 1024,
+    'reader_pool_size': 8,
+    'writer_queue_timeout': 30,
+}
+
+READER_BIND = 'reader'
+
+
+def load_config(config_path='config.json'):
+    """Settings from config.json, or an empty dict if there is none"""
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path) as f:
+        return json.load(f)
+
+
+def sqlite_settings(config):
+    settings = dict(DEFAULT_SQLITE_SETTINGS)
+    settings.update(config.get('sqlite', {}))
+    return settings
+
+
+def engine_options(settings, role):
+    """create_engine() options for the writer or reader pool.
+
+    The writer pool holds a single connection, so concurrent writers queue on
+    the pool (up to writer_queue_timeout seconds) instead of failing with
+    "database is locked". Readers get a pool of their own and never block on
+    the writer in WAL mode.
+    """
+    options = {
+        'connect_args': {'timeout': settings['busy_timeout_ms'] / 1000, 'check_same_thread': False},
+    }
+    if role == 'writer':
+        options.update(pool_size=1, max_overflow=0, pool_timeout=settings['writer_queue_timeout'])
+    else:
+        options.update(pool_size=settings['reader_pool_size'], max_overflow=settings['reader_pool_size'])
+    return options
+
+
+def configure_engine(engine, settings, role):
+    """Apply the connection pragmas and transaction mode for a pool"""
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        # Let SQLAlchemy's 'begin' event below issue BEGIN itself
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout_ms'])}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+        cursor.execute(f"PRAGMA cache_size = {-int(settings['cache_size_kib'])}")
+        if role == 'reader':
+            cursor.execute('PRAGMA query_only = ON')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin(connection):
+        # Writers take the write lock up front so they wait on busy_timeout
+        # rather than failing when upgrading a read transaction
+        connection.exec_driver_sql('BEGIN IMMEDIATE' if role == 'writer' else 'BEGIN')
+
+
+def is_write(clause):
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip().upper().startswith(('SELECT', 'WITH', 'EXPLAIN'))
+    return False
+
+
+class RoutingSession(Session):
+    """Session that reads from the reader pool until it first writes.
+
+    Flushes and DML go to the writer; after that the rest of the transaction
+    stays on the writer so it reads its own uncommitted changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        engines = self._db.engines
+        if READER_BIND not in engines:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self._flushing or self.info.get('writing') or is_write(clause):
+            self.info['writing'] = True
+            return engines[None]
+        return engines[READER_BIND]
+
+    def pin_writer(self):
+        """Run the rest of this transaction on the writer, so reads that
+        decide a write see the rows under the write lock"""
+        self.info['writing'] = True
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _end_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('writing', None)
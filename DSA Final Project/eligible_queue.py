@@ -0,0 +1,81 @@
+import heapq
+import threading
+from collections import defaultdict
+
+from matching import MIN_MATCH_SCORE, match_score
+
+
+class EligibleQueue:
+    """Approved applicants without a house, one heap per family size.
+
+    Kept up to date as applications change, so placing a house that just
+    became available costs one heap peek per family size instead of a scan
+    of the application table. Keys are waiting list keys (smallest first);
+    removals are lazy and stale heap entries are dropped when they surface.
+    """
+
+    def __init__(self, rows=()):
+        """rows: (id, waiting key, family_size)"""
+        self.heaps = defaultdict(list)
+        self.entries = {}  # id -> (key, family_size)
+        self.lock = threading.Lock()
+        for app_id, key, family_size in rows:
+            self.entries[app_id] = (key, family_size)
+            self.heaps[family_size].append((key, app_id))
+        for heap in self.heaps.values():
+            heapq.heapify(heap)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, app_id):
+        return app_id in self.entries
+
+    def push(self, app_id, key, family_size):
+        """Add or re-key an applicant"""
+        with self.lock:
+            if self.entries.get(app_id) == (key, family_size):
+                return
+            self.entries[app_id] = (key, family_size)
+            heapq.heappush(self.heaps[family_size], (key, app_id))
+
+    def discard(self, app_id):
+        with self.lock:
+            self.entries.pop(app_id, None)
+
+    def _top(self, family_size, excluded):
+        """Top live entry of one heap, skipping excluded ids; returns (entry, skipped)"""
+        heap = self.heaps[family_size]
+        skipped = []
+        while heap:
+            key, app_id = heap[0]
+            if self.entries.get(app_id) != (key, family_size):
+                heapq.heappop(heap)
+            elif app_id in excluded:
+                skipped.append(heapq.heappop(heap))
+            else:
+                return heap[0], skipped
+        return None, skipped
+
+    def best_for(self, bedrooms, size, min_score=MIN_MATCH_SCORE, exclude=()):
+        """(application id, match score) of the first applicant in waiting list
+        order whose match with the house reaches min_score, or None.
+
+        The applicant stays queued; discard() it once the house is taken.
+        """
+        excluded = set(exclude)
+        with self.lock:
+            best = None
+            for family_size in list(self.heaps):
+                score = match_score(family_size, bedrooms, size)
+                if score < min_score:
+                    continue
+                entry, skipped = self._top(family_size, excluded)
+                for item in skipped:
+                    heapq.heappush(self.heaps[family_size], item)
+                if entry is not None and (best is None or entry < best[0]):
+                    best = (entry, score)
+            if best is None:
+                return None
+            (_, app_id), score = best
+            return app_id, score
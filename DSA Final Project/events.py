@@ -0,0 +1,63 @@
+import json
+import threading
+from collections import deque
+from itertools import islice
+
+EVENT_BUFFER_SIZE = 1000
+HEARTBEAT_SECONDS = 15
+
+
+class EventBroker:
+    """In-process pub/sub for change events.
+
+    Events get increasing ids and the last buffer_size are kept, so a client
+    that reconnects with Last-Event-ID receives what it missed. A client that
+    fell further behind than the buffer (or saw ids from before a restart)
+    gets a single 'reset' event and should reload instead.
+    """
+
+    def __init__(self, buffer_size=EVENT_BUFFER_SIZE):
+        self.events = deque(maxlen=buffer_size)
+        self.last_id = 0
+        self.condition = threading.Condition()
+
+    def publish(self, event_type, data):
+        with self.condition:
+            self.last_id += 1
+            self.events.append((self.last_id, {'type': event_type, **data}))
+            self.condition.notify_all()
+            return self.last_id
+
+    def _missed(self, last_id):
+        # Ids are consecutive, so the buffer holds last_id + 1 unless it was dropped
+        if last_id > self.last_id:
+            return True
+        return bool(self.events) and self.events[0][0] > last_id + 1
+
+    def listen(self, last_id=None, heartbeat=HEARTBEAT_SECONDS):
+        """Yield (id, data) for every event after last_id, forever.
+
+        Yields None when nothing happened for heartbeat seconds, so the caller
+        can keep the connection alive and notice disconnects.
+        """
+        if last_id is None:
+            last_id = self.last_id
+        while True:
+            with self.condition:
+                if last_id == self.last_id:
+                    self.condition.wait(heartbeat)
+                if self._missed(last_id):
+                    pending = [(self.last_id, {'type': 'reset'})]
+                else:
+                    first_id = self.events[0][0] if self.events else last_id + 1
+                    pending = list(islice(self.events, last_id + 1 - first_id, None))
+
+            if not pending:
+                yield None
+                continue
+            yield from pending
+            last_id = pending[-1][0]
+
+
+def format_sse(event_id, data):
+    return f'id: {event_id}\ndata: {json.dumps(data)}\n\n'
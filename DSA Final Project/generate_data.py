@@ -0,0 +1,179 @@
+"""Fill a HomeAlloc database with synthetic applications, houses and allocations.
+
+    python generate_data.py --applications 1000000 --houses 100000 --db instance/homes.db
+"""
+import argparse
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from analytics import backfill_rollups
+from location import DEFAULT_PLACES
+from matching import pair_match_scores
+from scoring import load_policy, priority_scores
+from setup import SCHEMA, migrate_database
+
+CHUNK_SIZE = 50000
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+FIRST_NAMES = ['Ali', 'Sara', 'Ahmed', 'Fatima', 'Bilal', 'Ayesha', 'Usman', 'Zainab', 'Hamza', 'Maryam',
+               'Omar', 'Hira', 'Saad', 'Hassan', 'Amna', 'Imran', 'Sana', 'Tariq', 'Nadia', 'Kashif']
+LAST_NAMES = ['Khan', 'Ahmed', 'Raza', 'Noor', 'Malik', 'Butt', 'Sheikh', 'Qureshi', 'Chaudhry', 'Siddiqui',
+              'Hussain', 'Iqbal', 'Javed', 'Tanoli', 'Sarwar', 'Mirza', 'Abbasi', 'Shah', 'Baig', 'Aslam']
+CITIES = ['Karachi', 'Lahore', 'Islamabad', 'Rawalpindi', 'Faisalabad', 'Multan', 'Peshawar', 'Quetta',
+          'Abbottabad', 'Hyderabad']
+CITY_WEIGHTS = [0.22, 0.2, 0.1, 0.1, 0.1, 0.08, 0.08, 0.05, 0.03, 0.04]
+STREETS = ['Main St', 'Park Rd', 'Garden Ave', 'Market St', 'Hill Rd', 'Canal Rd', 'Mall Rd', 'Jinnah Ave']
+HOUSE_TYPES = ['apartment', 'house', 'duplex']
+# Spread of synthetic coordinates around each city centre, in degrees (~5 km)
+CITY_SPREAD = 0.045
+
+
+def random_addresses(rng, n):
+    """n addresses with synthetic coordinates near their city: (addresses, lats, lons)"""
+    numbers = rng.integers(1, 1000, n)
+    streets = rng.choice(STREETS, n)
+    cities = rng.choice(CITIES, n, p=CITY_WEIGHTS)
+    centres = np.array([DEFAULT_PLACES[city] for city in cities])
+    lats = centres[:, 0] + rng.normal(0, CITY_SPREAD, n)
+    lons = centres[:, 1] + rng.normal(0, CITY_SPREAD, n)
+    addresses = [f'{number} {street}, {city}' for number, street, city in zip(numbers, streets, cities)]
+    return addresses, lats.round(6), lons.round(6)
+
+
+def random_dates(rng, n, start, end):
+    seconds = rng.integers(0, int((end - start).total_seconds()), n)
+    return [start + timedelta(seconds=int(s), microseconds=int(us))
+            for s, us in zip(seconds, rng.integers(0, 1000000, n))]
+
+
+def generate_houses(conn, rng, n, start, end):
+    """Insert n houses; returns (ids, bedrooms, sizes)"""
+    bedrooms = rng.choice([1, 2, 3, 4, 5, 6], n, p=[0.1, 0.25, 0.3, 0.2, 0.1, 0.05])
+    sizes = np.maximum(300, bedrooms * 400 + rng.normal(0, 150, n)).round(-1).astype(int)
+    rents = (sizes * rng.uniform(8, 16, n)).round(-2)
+    types = np.where(bedrooms <= 2, 'apartment', rng.choice(HOUSE_TYPES, n))
+    first_id = (conn.execute('SELECT coalesce(max(id), 0) FROM house').fetchone()[0]) + 1
+
+    for offset in range(0, n, CHUNK_SIZE):
+        stop = min(n, offset + CHUNK_SIZE)
+        addresses, lats, lons = random_addresses(rng, stop - offset)
+        dates = random_dates(rng, stop - offset, start, end)
+        conn.executemany(
+            'INSERT INTO house (house_id, address, house_type, bedrooms, size, rent, status, facilities, added_date, '
+            "latitude, longitude) VALUES (?, ?, ?, ?, ?, ?, 'available', 'Parking, Water, Electricity', ?, ?, ?)",
+            [(f'H-G{first_id + i:07d}', addresses[i - offset], str(types[i]), int(bedrooms[i]), int(sizes[i]),
+              float(rents[i]), dates[i - offset].strftime(DATE_FORMAT), float(lats[i - offset]),
+              float(lons[i - offset])) for i in range(offset, stop)]
+        )
+        conn.commit()
+
+    return np.arange(first_id, first_id + n), bedrooms, sizes
+
+
+def generate_applications(conn, rng, n, start, end, policy):
+    """Insert n pending applications; returns (ids, family_sizes, applied_dates)"""
+    ages = np.clip(rng.normal(42, 13, n), 18, 100).astype(int)
+    family_sizes = np.clip(rng.poisson(3.5, n) + 1, 1, 20)
+    incomes = np.clip(rng.lognormal(np.log(18000), 0.55, n), 0, None).round(-2)
+    scores = priority_scores(ages, family_sizes, incomes, policy)
+    applied_dates = random_dates(rng, n, start, end)
+    first_id = (conn.execute('SELECT coalesce(max(id), 0) FROM application').fetchone()[0]) + 1
+
+    for offset in range(0, n, CHUNK_SIZE):
+        stop = min(n, offset + CHUNK_SIZE)
+        first = rng.choice(FIRST_NAMES, stop - offset)
+        last = rng.choice(LAST_NAMES, stop - offset)
+        addresses, lats, lons = random_addresses(rng, stop - offset)
+        contacts = rng.integers(0, 10**9, stop - offset)
+        conn.executemany(
+            'INSERT INTO application (name, age, family_size, income, contact, email, address, status, '
+            "priority_score, applied_date, latitude, longitude) VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?)",
+            [(f'{first[i - offset]} {last[i - offset]}', int(ages[i]), int(family_sizes[i]), float(incomes[i]),
+              f'03{contacts[i - offset]:09d}', f'applicant{first_id + i}@example.com', addresses[i - offset],
+              int(scores[i]), applied_dates[i].strftime(DATE_FORMAT), float(lats[i - offset]), float(lons[i - offset]))
+             for i in range(offset, stop)]
+        )
+        conn.commit()
+
+    return np.arange(first_id, first_id + n), family_sizes, applied_dates
+
+
+def generate(db_path, n_applications, n_houses, n_allocations, seed=0, config_path='config.json'):
+    rng = np.random.default_rng(seed)
+    end = datetime.utcnow()
+    start = end - timedelta(days=730)
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    conn.close()
+    migrate_database(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous = OFF')
+    started = time.perf_counter()
+
+    house_ids, bedrooms, sizes = generate_houses(conn, rng, n_houses, start, end)
+    print(f'  {n_houses:,} houses')
+    app_ids, family_sizes, applied_dates = generate_applications(
+        conn, rng, n_applications, start, end, load_policy(config_path))
+    print(f'  {n_applications:,} applications')
+
+    # Allocate random applicants to random houses, logged after they applied
+    n_allocations = min(n_allocations, n_applications, n_houses)
+    apps = rng.choice(n_applications, n_allocations, replace=False)
+    houses = rng.choice(n_houses, n_allocations, replace=False)
+    scores = pair_match_scores(family_sizes[apps], bedrooms[houses], sizes[houses])
+    admins = rng.choice(['admin', 'officer1', 'officer2', 'officer3'], n_allocations)
+    for offset in range(0, n_allocations, CHUNK_SIZE):
+        chunk = range(offset, min(n_allocations, offset + CHUNK_SIZE))
+        rows = []
+        for i in chunk:
+            applied = applied_dates[apps[i]]
+            waited = timedelta(days=float(rng.exponential(60)))
+            rows.append((int(app_ids[apps[i]]), int(house_ids[houses[i]]),
+                         min(end, applied + waited).strftime(DATE_FORMAT), str(admins[i]), int(scores[i])))
+        conn.executemany(
+            'INSERT INTO allocation_log (application_id, house_id, allocated_date, allocated_by, match_score) '
+            'VALUES (?, ?, ?, ?, ?)', rows)
+        conn.executemany("UPDATE application SET status = 'allocated', allocated_house_id = ? WHERE id = ?",
+                         [(house_id, app_id) for app_id, house_id, *_ in rows])
+        conn.executemany("UPDATE house SET status = 'occupied', current_occupant_id = ? WHERE id = ?",
+                         [(app_id, house_id) for app_id, house_id, *_ in rows])
+        conn.commit()
+    print(f'  {n_allocations:,} allocations')
+
+    # Review part of the remaining queue
+    conn.execute("UPDATE application SET status = CASE WHEN abs(random()) % 10 < 4 THEN 'approved' "
+                 "WHEN abs(random()) % 10 < 2 THEN 'rejected' ELSE 'pending' END "
+                 "WHERE status = 'pending' AND id >= ?", (int(app_ids[0]),))
+
+    # Rebuild the status counters the dashboard reads
+    conn.execute('DELETE FROM status_counter')
+    for kind in ('application', 'house'):
+        conn.execute(f"INSERT INTO status_counter (kind, status, count) SELECT '{kind}', status, count(*) "
+                     f"FROM {kind} WHERE status IS NOT NULL GROUP BY status")
+    conn.commit()
+    conn.close()
+
+    # And the analytics rollups over the generated allocation log
+    engine = create_engine(f'sqlite:///{db_path}')
+    backfill_rollups(engine)
+    engine.dispose()
+    print(f'✅ Generated data in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='instance/homes.db')
+    parser.add_argument('--applications', type=int, default=100000)
+    parser.add_argument('--houses', type=int, default=10000)
+    parser.add_argument('--allocations', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f'Generating data into {args.db}...')
+    generate(args.db, args.applications, args.houses, args.allocations, args.seed)
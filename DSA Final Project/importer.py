@@ -0,0 +1,118 @@
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+
+from scoring import DEFAULT_POLICY, priority_scores
+
+CHUNK_SIZE = 10000
+MAX_REPORTED_ERRORS = 100
+
+# Column name in the file -> Application column
+FIELD_ALIASES = {'family': 'family_size'}
+
+
+def read_records(lines, fmt):
+    """Yield (line_no, record) from an iterable of text lines in csv or jsonl format"""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        try:
+            for record in reader:
+                yield reader.line_num, record
+        except csv.Error as e:
+            # The file itself is unreadable from here on, not just one record
+            raise ValueError(f'after line {reader.line_num}: {e}') from e
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(lines, 1):
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, None
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+
+def validate_record(record, now):
+    """Convert one raw record into an application row, raising ValueError if invalid"""
+    if not isinstance(record, dict):
+        raise ValueError('not a JSON object')
+    record = {FIELD_ALIASES.get(key, key): value for key, value in record.items()}
+
+    name = str(record.get('name') or '').strip()
+    contact = str(record.get('contact') or '').strip()
+    if not name:
+        raise ValueError('name is required')
+    if not contact:
+        raise ValueError('contact is required')
+
+    age = int(record['age'])
+    family_size = int(record['family_size'])
+    income = float(record['income'])
+    if not 18 <= age <= 100:
+        raise ValueError('age must be between 18 and 100')
+    if not 1 <= family_size <= 20:
+        raise ValueError('family_size must be between 1 and 20')
+    if income < 0:
+        raise ValueError('income must not be negative')
+
+    applied_date = record.get('applied_date')
+    return {
+        'name': name,
+        'age': age,
+        'family_size': family_size,
+        'income': income,
+        'contact': contact,
+        'email': record.get('email') or '',
+        'address': record.get('address') or '',
+        'status': 'pending',
+        'applied_date': datetime.fromisoformat(applied_date) if applied_date else now,
+        'allocated_house_id': None,
+    }
+
+
+def import_applications(engine, table, lines, fmt, chunk_size=CHUNK_SIZE, progress=None, policy=DEFAULT_POLICY):
+    """Stream applications from a csv/jsonl file into table in chunks.
+
+    Each chunk is validated, scored in one vectorized pass and inserted with a
+    single executemany in its own transaction, so memory stays flat whatever the
+    file size. progress(stats) is called after every chunk.
+    """
+    stats = {'read': 0, 'imported': 0, 'rejected': 0, 'errors': []}
+    records = read_records(lines, fmt)
+    now = datetime.utcnow()
+
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+
+        rows = []
+        for line_no, record in chunk:
+            try:
+                rows.append(validate_record(record, now))
+            except (KeyError, TypeError, ValueError) as e:
+                stats['rejected'] += 1
+                if len(stats['errors']) < MAX_REPORTED_ERRORS:
+                    error = f'missing field {e}' if isinstance(e, KeyError) else str(e)
+                    stats['errors'].append({'line': line_no, 'error': error})
+        stats['read'] += len(chunk)
+
+        if rows:
+            scores = priority_scores(
+                [row['age'] for row in rows],
+                [row['family_size'] for row in rows],
+                [row['income'] for row in rows],
+                policy,
+            )
+            for row, score in zip(rows, scores.tolist()):
+                row['priority_score'] = score
+
+            with engine.begin() as conn:
+                conn.execute(table.insert(), rows)
+            stats['imported'] += len(rows)
+
+        if progress:
+            progress(stats)
+
+    return stats
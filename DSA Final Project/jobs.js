@@ -0,0 +1,38 @@
+// Starts background jobs and polls /admin/api/jobs/<id> until they finish
+(function() {
+    const POLL_INTERVAL_MS = 500;
+    
+    // Resolves to the finished job (succeeded or failed); onProgress gets each running snapshot
+    window.waitForJob = function(jobId, onProgress) {
+        return new Promise((resolve, reject) => {
+            function poll() {
+                fetch(`/admin/api/jobs/${jobId}`)
+                    .then(res => res.json())
+                    .then(job => {
+                        if (job.status === 'succeeded' || job.status === 'failed') {
+                            resolve(job);
+                            return;
+                        }
+                        if (onProgress) onProgress(job);
+                        setTimeout(poll, POLL_INTERVAL_MS);
+                    })
+                    .catch(reject);
+            }
+            poll();
+        });
+    };
+    
+    // POSTs to an endpoint that queues a job and resolves to the finished job
+    window.runJob = function(url, body, onProgress) {
+        return fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        })
+        .then(res => res.json())
+        .then(data => {
+            if (!data.success) return { status: 'failed', error: data.error };
+            return waitForJob(data.job_id, onProgress);
+        });
+    };
+})();
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import text
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 32
+PROGRESS_INTERVAL_SECONDS = 0.5
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'  # as SQLAlchemy stores DateTime in SQLite
+
+
+class JobFailed(Exception):
+    """Raised by a handler to fail its job with a message instead of a traceback"""
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _now():
+    return datetime.utcnow().strftime(DATE_FORMAT)
+
+
+class JobStore:
+    """Job rows in the job table; params, progress and result are JSON text"""
+
+    def __init__(self, engine):
+        self.engine = engine  # callable, since the engine belongs to the app context
+
+    def create(self, kind, params, created_by):
+        with self.engine().begin() as conn:
+            return conn.execute(text(
+                "INSERT INTO job (kind, status, params, created_by, created_date) "
+                "VALUES (:kind, 'queued', :params, :created_by, :created_date) RETURNING id"
+            ), {'kind': kind, 'params': json.dumps(params), 'created_by': created_by,
+                'created_date': _now()}).scalar_one()
+
+    def update(self, job_id, **fields):
+        for key in ('progress', 'result'):
+            if key in fields:
+                fields[key] = json.dumps(fields[key], default=str)
+        assignments = ', '.join(f'{key} = :{key}' for key in fields)
+        with self.engine().begin() as conn:
+            conn.execute(text(f'UPDATE job SET {assignments} WHERE id = :job_id'), {'job_id': job_id, **fields})
+
+    def fail_interrupted(self):
+        """Fail jobs left queued or running by a previous process"""
+        with self.engine().begin() as conn:
+            return conn.execute(text(
+                "UPDATE job SET status = 'failed', error = 'Interrupted by a restart', finished_date = :now "
+                "WHERE status IN ('queued', 'running')"
+            ), {'now': _now()}).rowcount
+
+
+class JobRunner:
+    """Runs registered handlers on a bounded thread pool, recording each run in the job table.
+
+    A handler is called as handler(params, progress) inside an app context and
+    returns the result dict. progress(dict) stores partial progress at most
+    every PROGRESS_INTERVAL_SECONDS; it writes to the database, so call it
+    between transactions, not in the middle of one.
+    """
+
+    def __init__(self, app, store, max_workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING, cleanup=None):
+        self.app = app
+        self.store = store
+        self.cleanup = cleanup  # called after each handler, e.g. to give back its database session
+        self.handlers = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        # Running plus waiting jobs, so a burst of requests cannot queue without bound
+        self.slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def submit(self, kind, params, created_by=None):
+        """Queue a job and return its id; raises QueueFull when the pool is saturated"""
+        handler = self.handlers[kind]
+        if not self.slots.acquire(blocking=False):
+            raise QueueFull('Too many jobs queued, try again later')
+        try:
+            job_id = self.store.create(kind, params, created_by)
+            self.executor.submit(self._run, job_id, handler, params)
+        except Exception:
+            self.slots.release()
+            raise
+        return job_id
+
+    def _run(self, job_id, handler, params):
+        try:
+            with self.app.app_context():
+                self.store.update(job_id, status='running', started_date=_now())
+                last_report = [0.0]
+
+                def progress(data):
+                    now = time.monotonic()
+                    if now - last_report[0] >= PROGRESS_INTERVAL_SECONDS:
+                        last_report[0] = now
+                        self.store.update(job_id, progress=data)
+
+                try:
+                    try:
+                        result = handler(params, progress)
+                    finally:
+                        if self.cleanup:
+                            self.cleanup()
+                except JobFailed as e:
+                    self.store.update(job_id, status='failed', error=str(e), finished_date=_now())
+                    return
+                except Exception as e:
+                    self.app.logger.exception('Job %s failed', job_id)
+                    self.store.update(job_id, status='failed', error=f'{type(e).__name__}: {e}',
+                                      finished_date=_now())
+                    return
+                self.store.update(job_id, status='succeeded', result=result, finished_date=_now())
+        finally:
+            self.slots.release()
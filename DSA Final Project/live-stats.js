@@ -0,0 +1,38 @@
+// Keeps elements marked data-count="application.pending" (or data-count="house"
+// for the total of a table) in sync with the /api/stream change feed.
+// Admin pages only: the feed needs an admin session; public pages use public-stats.js
+(function() {
+    const counts = { application: {}, house: {} };
+    
+    function render() {
+        document.querySelectorAll('[data-count]').forEach(el => {
+            const [kind, status] = el.dataset.count.split('.');
+            const value = status
+                ? (counts[kind][status] || 0)
+                : Object.values(counts[kind]).reduce((total, n) => total + n, 0);
+            el.textContent = value + (el.dataset.suffix || '');
+        });
+    }
+    
+    const stream = new EventSource('/api/stream');
+    stream.onmessage = function(e) {
+        const event = JSON.parse(e.data);
+        
+        // Snapshots, resets and imports carry absolute counts, everything else deltas
+        if (event.status_counts) {
+            Object.keys(counts).forEach(kind => {
+                counts[kind] = Object.assign({}, event.status_counts[kind]);
+            });
+        }
+        if (event.counts) {
+            Object.entries(event.counts).forEach(([kind, deltas]) => {
+                Object.entries(deltas).forEach(([status, delta]) => {
+                    counts[kind][status] = (counts[kind][status] || 0) + delta;
+                });
+            });
+        }
+        
+        render();
+        document.dispatchEvent(new CustomEvent('homealloc:change', { detail: event }));
+    };
+})();
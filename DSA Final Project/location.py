@@ -0,0 +1,199 @@
+import heapq
+import math
+import re
+import threading
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0
+
+# Place name -> (latitude, longitude). Extend or override with "locations"
+# in config.json; the most specific (longest) name found in an address wins.
+DEFAULT_PLACES = {
+    'Karachi': (24.8607, 67.0011),
+    'Hyderabad': (25.3960, 68.3578),
+    'Lahore': (31.5204, 74.3587),
+    'Faisalabad': (31.4504, 73.1350),
+    'Multan': (30.1575, 71.5249),
+    'Islamabad': (33.6844, 73.0479),
+    'Rawalpindi': (33.5651, 73.0169),
+    'Peshawar': (34.0151, 71.5249),
+    'Quetta': (30.1798, 66.9750),
+    'Abbottabad': (34.1688, 73.2215),
+}
+
+# Approximate road distances in km between places, like the edges of
+# LocationGraph in HouseAllocationSystem.java. Override with "roads".
+DEFAULT_ROADS = [
+    ('Karachi', 'Hyderabad', 165),
+    ('Karachi', 'Quetta', 690),
+    ('Hyderabad', 'Multan', 770),
+    ('Quetta', 'Multan', 630),
+    ('Multan', 'Faisalabad', 240),
+    ('Multan', 'Lahore', 340),
+    ('Faisalabad', 'Lahore', 180),
+    ('Faisalabad', 'Islamabad', 310),
+    ('Lahore', 'Islamabad', 375),
+    ('Islamabad', 'Rawalpindi', 15),
+    ('Islamabad', 'Peshawar', 185),
+    ('Islamabad', 'Abbottabad', 120),
+    ('Rawalpindi', 'Abbottabad', 120),
+    ('Peshawar', 'Abbottabad', 210),
+]
+
+
+def load_locations(config):
+    """(places, roads) from the "locations" and "roads" sections of config.json"""
+    places = dict(DEFAULT_PLACES)
+    places.update({name: tuple(point) for name, point in config.get('locations', {}).items()})
+    roads = [tuple(road) for road in config.get('roads', DEFAULT_ROADS)]
+    return places, roads
+
+
+class Geocoder:
+    """Offline geocoder that matches known place names inside free-text addresses"""
+
+    def __init__(self, places):
+        self.places = {name.lower(): point for name, point in places.items()}
+        names = sorted(self.places, key=len, reverse=True)
+        self.pattern = re.compile(r'\b(' + '|'.join(re.escape(name) for name in names) + r')\b', re.IGNORECASE)
+
+    def geocode(self, address):
+        """(latitude, longitude) of the most specific known place, or None"""
+        if not address:
+            return None
+        matches = self.pattern.findall(address)
+        if not matches:
+            return None
+        return self.places[max(matches, key=len).lower()]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance; works elementwise on arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(1.0, a)))
+
+
+def _unit_vectors(lats, lons):
+    lats, lons = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+    return np.column_stack((np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats)))
+
+
+def _chord(radius_km):
+    return 2 * math.sin(min(math.pi, radius_km / EARTH_RADIUS_KM) / 2)
+
+
+class SpatialIndex:
+    """KD-tree over points on the unit sphere, queried by radius in km.
+
+    Points are 3D unit vectors, so straight-line (chord) distance in the tree
+    is monotonic in great-circle distance and there are no seams at the poles
+    or the antimeridian.
+    """
+
+    def __init__(self, ids, lats, lons):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.tree = cKDTree(_unit_vectors(self.lats, self.lons)) if len(self.ids) else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def within(self, lat, lon, radius_km):
+        """(positions, distances_km) of points within radius_km, nearest first.
+
+        Positions index into ids, lats and lons.
+        """
+        if self.tree is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        positions = np.asarray(self.tree.query_ball_point(_unit_vectors([lat], [lon])[0], _chord(radius_km)),
+                               dtype=np.int64)
+        distances = haversine_km(lat, lon, self.lats[positions], self.lons[positions])
+        order = np.argsort(distances, kind='stable')
+        return positions[order], distances[order]
+
+    def within_many(self, lats, lons, radius_km):
+        """For each query point, the positions (not ids) of points within radius_km"""
+        if self.tree is None:
+            return [np.zeros(0, dtype=np.int64) for _ in range(len(lats))]
+        return [np.asarray(found, dtype=np.int64)
+                for found in self.tree.query_ball_point(_unit_vectors(lats, lons), _chord(radius_km))]
+
+    def nearest(self, lats, lons):
+        """Position of the nearest point to each query point"""
+        return self.tree.query(_unit_vectors(lats, lons))[1]
+
+
+class RoadGraph:
+    """Weighted road graph between places with cached Dijkstra results.
+
+    Points are snapped to their nearest place; within one place the distance
+    is the straight line, since there is no street network.
+    """
+
+    def __init__(self, places, roads):
+        self.names = sorted(places)
+        self.points = SpatialIndex(range(len(self.names)), *zip(*(places[name] for name in self.names)))
+        self.places = places
+        self.adjacency = {name: [] for name in self.names}
+        for a, b, km in roads:
+            if a in self.adjacency and b in self.adjacency:
+                self.adjacency[a].append((b, float(km)))
+                self.adjacency[b].append((a, float(km)))
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def shortest_from(self, source):
+        """(distances, previous) from one place to every reachable place"""
+        cached = self.cache.get(source)
+        if cached is not None:
+            return cached
+
+        distances, previous = {source: 0.0}, {}
+        heap = [(0.0, source)]
+        while heap:
+            distance, place = heapq.heappop(heap)
+            if distance > distances[place]:
+                continue
+            for neighbour, km in self.adjacency[place]:
+                candidate = distance + km
+                if candidate < distances.get(neighbour, math.inf):
+                    distances[neighbour] = candidate
+                    previous[neighbour] = place
+                    heapq.heappush(heap, (candidate, neighbour))
+
+        with self.lock:
+            self.cache[source] = (distances, previous)
+        return distances, previous
+
+    def path(self, source, target):
+        """(km, [places]) along the shortest road route, or (inf, []) if unreachable"""
+        distances, previous = self.shortest_from(source)
+        if target not in distances:
+            return math.inf, []
+        route = [target]
+        while route[-1] != source:
+            route.append(previous[route[-1]])
+        return distances[target], route[::-1]
+
+    def snap(self, lat, lon):
+        return self.names[int(self.points.nearest([lat], [lon])[0])]
+
+    def road_distances_km(self, lat, lon, lats, lons):
+        """Road distance from one point to many, through the nearest places"""
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        start = int(self.points.nearest([lat], [lon])[0])
+        ends = self.points.nearest(lats, lons)
+        distances = self.shortest_from(self.names[start])[0]
+        via = np.array([distances.get(name, math.inf) for name in self.names])[ends]
+
+        place_lats, place_lons = self.points.lats, self.points.lons
+        routed = (haversine_km(lat, lon, place_lats[start], place_lons[start]) + via
+                  + haversine_km(place_lats[ends], place_lons[ends], lats, lons))
+        return np.where(ends == start, haversine_km(lat, lon, lats, lons), routed)
+
+    def road_distance_km(self, lat1, lon1, lat2, lon2):
+        return float(self.road_distances_km(lat1, lon1, [lat2], [lon2])[0])
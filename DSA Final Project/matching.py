@@ -0,0 +1,48 @@
+import numpy as np
+
+# Same constants as AllocationSystem.calculateMatchScore in HouseAllocationSystem.java
+BASE_SCORE = 50
+MAX_BEDROOM_POINTS = 30
+POINTS_PER_BEDROOM_OFF = 10
+MIN_SIZE_PER_PERSON = 150.0
+MAX_SIZE_POINTS = 20.0
+SQFT_PER_SIZE_POINT = 50.0
+MAX_SCORE = 100.0
+MIN_MATCH_SCORE = 60
+
+
+def _match_scores(family_sizes, bedrooms, sizes):
+    # Bedroom compatibility
+    ideal_bedrooms = (family_sizes + 1) // 2
+    bedroom_diff = np.abs(bedrooms - ideal_bedrooms)
+    score = BASE_SCORE + np.maximum(0, MAX_BEDROOM_POINTS - bedroom_diff * POINTS_PER_BEDROOM_OFF).astype(np.float64)
+
+    # Size adequacy
+    required_size = family_sizes * MIN_SIZE_PER_PERSON
+    surplus = sizes - required_size
+    score = score + np.where(surplus >= 0, np.minimum(MAX_SIZE_POINTS, surplus / SQFT_PER_SIZE_POINT), 0.0)
+
+    return np.rint(np.minimum(MAX_SCORE, score)).astype(np.int32)
+
+
+def match_score(family_size, bedrooms, size):
+    """Match score of one applicant against one house, through the same formula"""
+    return int(_match_scores(np.int64(family_size), np.int64(bedrooms), np.float64(size)))
+
+
+def match_score_matrix(family_sizes, bedrooms, sizes):
+    """Match score of every applicant (rows) against every house (columns)"""
+    return _match_scores(
+        np.asarray(family_sizes, dtype=np.int64).reshape(-1, 1),
+        np.asarray(bedrooms, dtype=np.int64).reshape(1, -1),
+        np.asarray(sizes, dtype=np.float64).reshape(1, -1),
+    )
+
+
+def pair_match_scores(family_sizes, bedrooms, sizes):
+    """Match score of applicant i against house i for aligned arrays"""
+    return _match_scores(
+        np.asarray(family_sizes, dtype=np.int64),
+        np.asarray(bedrooms, dtype=np.int64),
+        np.asarray(sizes, dtype=np.float64),
+    )
@@ -0,0 +1,253 @@
+import bisect
+import contextvars
+import cProfile
+import io
+import logging
+import pstats
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Override any key under "instrumentation" in config.json
+DEFAULT_INSTRUMENTATION = {
+    'slow_query_ms': 100,
+    'slow_query_log_size': 200,
+    'profiling': True,
+    'metrics_token': None,
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# Slow statements beyond this many distinct ones are counted under "other"
+MAX_SLOW_STATEMENTS = 100
+PROFILES_KEPT = 20
+PROFILE_LINES = 40
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def instrumentation_settings(config):
+    settings = dict(DEFAULT_INSTRUMENTATION)
+    settings.update(config.get('instrumentation', {}))
+    return settings
+
+
+def normalize_sql(statement):
+    """Statement with literals replaced by ? and IN lists collapsed, so runs
+    of the same query with different values group together"""
+    sql = _NUMBER.sub('?', _STRING.sub('?', statement))
+    return _VALUE_LIST.sub('(...)', _SPACE.sub(' ', sql).strip())
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name, self.help_text, self.label_names = name, help_text, label_names
+        self.values = defaultdict(float)
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_labels(self.label_names, labels)} {value:g}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label_names=()):
+        self.name, self.help_text, self.label_names = name, help_text, label_names
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [count per bucket..., count above the last, sum]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        names = self.label_names + ('le',)
+        bounds = [f'{bound:g}' for bound in self.buckets] + ['+Inf']
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {series[-1]:g}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+class RequestStats:
+    """Queries issued while serving one request"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+class Metrics:
+    """Request and query metrics for the whole process, rendered in the
+    Prometheus text format.
+
+    Queries are attributed to the request being served on the same thread;
+    queries outside a request (jobs, CLI) only count towards the totals.
+    """
+
+    def __init__(self, slow_query_ms=DEFAULT_INSTRUMENTATION['slow_query_ms'],
+                 slow_query_log_size=DEFAULT_INSTRUMENTATION['slow_query_log_size']):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.lock = threading.Lock()
+        self.current = contextvars.ContextVar('request_stats', default=None)
+        self.slow_log = deque(maxlen=slow_query_log_size)
+
+        self.requests = Counter('homealloc_http_requests_total', 'Requests served',
+                                ('method', 'endpoint', 'status'))
+        self.latency = Histogram('homealloc_http_request_duration_seconds', 'Time to build a response',
+                                 LATENCY_BUCKETS, ('endpoint',))
+        self.request_queries = Histogram('homealloc_http_request_queries', 'SQL statements issued per request',
+                                         QUERY_COUNT_BUCKETS, ('endpoint',))
+        self.request_query_time = Histogram('homealloc_http_request_query_duration_seconds',
+                                            'Time spent in SQL per request', LATENCY_BUCKETS, ('endpoint',))
+        self.queries = Counter('homealloc_db_queries_total', 'SQL statements executed', ('pool',))
+        self.query_time = Histogram('homealloc_db_query_duration_seconds', 'SQL statement latency',
+                                    LATENCY_BUCKETS, ('pool',))
+        self.slow_queries = Counter('homealloc_db_slow_queries_total',
+                                    'Statements slower than the slow query threshold, by normalized SQL',
+                                    ('statement',))
+
+    def request_started(self, endpoint):
+        self.current.set(RequestStats(endpoint))
+
+    def request_finished(self, method, status):
+        """Record the current request; returns its stats, or None outside a request"""
+        stats = self.current.get()
+        if stats is None:
+            return None
+        self.current.set(None)
+        elapsed = time.perf_counter() - stats.started
+        labels = (stats.endpoint,)
+        with self.lock:
+            self.requests.inc((method, stats.endpoint, str(status)))
+            self.latency.observe(labels, elapsed)
+            self.request_queries.observe(labels, stats.queries)
+            self.request_query_time.observe(labels, stats.query_seconds)
+        return stats
+
+    def query_finished(self, pool, statement, elapsed):
+        stats = self.current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+        with self.lock:
+            self.queries.inc((pool,))
+            self.query_time.observe((pool,), elapsed)
+            if elapsed < self.slow_query_seconds:
+                return
+            sql = normalize_sql(statement)
+            known = {labels[0] for labels in self.slow_queries.values}
+            self.slow_queries.inc((sql if sql in known or len(known) < MAX_SLOW_STATEMENTS else 'other',))
+            self.slow_log.append({
+                'sql': sql,
+                'duration_ms': round(elapsed * 1000, 1),
+                'pool': pool,
+                'endpoint': stats.endpoint if stats else None,
+                'at': datetime.utcnow().isoformat(),
+            })
+        logger.warning('Slow query (%.0f ms, %s): %s', elapsed * 1000, stats.endpoint if stats else pool, sql)
+
+    def recent_slow_queries(self):
+        """Slow query log, newest first"""
+        with self.lock:
+            return list(reversed(self.slow_log))
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.request_queries, self.request_query_time,
+                           self.queries, self.query_time, self.slow_queries):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_engine(engine, metrics, pool):
+    """Time every statement on an engine's connections"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def finish_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        metrics.query_finished(pool, statement, time.perf_counter() - started)
+
+    @event.listens_for(engine, 'handle_error')
+    def failed_query(context):
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+class RequestProfiler:
+    """cProfile runs of single requests, keeping the last few reports.
+
+    One request is profiled at a time; others asking while it runs go
+    unprofiled rather than wait.
+    """
+
+    def __init__(self, kept=PROFILES_KEPT, lines=PROFILE_LINES):
+        self.kept = kept
+        self.lines = lines
+        self.busy = threading.Lock()
+        self.lock = threading.Lock()
+        self.reports = OrderedDict()
+        self.next_id = 1
+
+    def start(self):
+        """A running profiler, or None if another request is being profiled"""
+        if not self.busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler, title):
+        """Stop a profiler from start() and keep its report; returns the report id"""
+        profiler.disable()
+        self.busy.release()
+        out = io.StringIO()
+        out.write(f'{title}\n\n')
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(self.lines)
+        with self.lock:
+            report_id = self.next_id
+            self.next_id += 1
+            self.reports[report_id] = out.getvalue()
+            while len(self.reports) > self.kept:
+                self.reports.popitem(last=False)
+        return report_id
+
+    def report(self, report_id):
+        with self.lock:
+            return self.reports.get(report_id)
@@ -0,0 +1,26 @@
+// Keeps elements marked data-stat="pending_applications" (any field of
+// /api/stats) current on public pages. Polls the cached, ETag-revalidated
+// endpoint instead of holding a /api/stream connection open per visitor.
+(function() {
+    const POLL_INTERVAL_MS = 60000;
+    
+    function refresh() {
+        fetch('/api/stats')
+            .then(res => res.json())
+            .then(stats => {
+                document.querySelectorAll('[data-stat]').forEach(el => {
+                    if (stats[el.dataset.stat] !== undefined) {
+                        el.textContent = stats[el.dataset.stat] + (el.dataset.suffix || '');
+                    }
+                });
+            })
+            .catch(() => {});
+    }
+    
+    refresh();
+    setInterval(() => {
+        if (!document.hidden) {
+            refresh();
+        }
+    }, POLL_INTERVAL_MS);
+})();
@@ -0,0 +1,137 @@
+from bisect import bisect_left, insort
+import threading
+
+
+class RankIndex:
+    """Order-statistic index over sortable keys.
+
+    Keys live in sorted blocks of at most 2 * LOAD entries, with a Fenwick
+    tree over the block sizes, so insert, remove, rank and "k-th key" lookups
+    all cost O(log n) block searches plus a short in-block shift.
+    """
+
+    LOAD = 512
+
+    def __init__(self, keys=()):
+        self._lock = threading.RLock()
+        self._build(sorted(keys))
+
+    def _build(self, keys):
+        self._blocks = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(keys)
+        self._rebuild_tree()
+
+    def _rebuild_tree(self):
+        tree = [0] * (len(self._blocks) + 1)
+        for i, block in enumerate(self._blocks, 1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= len(self._blocks):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, block_no, delta):
+        i = block_no + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_before(self, block_no):
+        """Number of keys in blocks before block_no"""
+        total, i = 0, block_no
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        """Block number and offset of the key at 0-based position"""
+        block_no, step = 0, 1 << len(self._blocks).bit_length()
+        while step:
+            nxt = block_no + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                block_no = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return block_no, position
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, key):
+        with self._lock:
+            block_no = bisect_left(self._maxes, key)
+            if block_no == len(self._blocks):
+                return False
+            block = self._blocks[block_no]
+            i = bisect_left(block, key)
+            return i < len(block) and block[i] == key
+
+    def add(self, key):
+        with self._lock:
+            if not self._blocks:
+                self._build([key])
+                return
+            block_no = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+            block = self._blocks[block_no]
+            insort(block, key)
+            self._maxes[block_no] = block[-1]
+            self._len += 1
+            if len(block) > 2 * self.LOAD:
+                self._blocks[block_no:block_no + 1] = [block[:self.LOAD], block[self.LOAD:]]
+                self._maxes[block_no:block_no + 1] = [block[self.LOAD - 1], block[-1]]
+                self._rebuild_tree()
+            else:
+                self._tree_add(block_no, 1)
+
+    def discard(self, key):
+        with self._lock:
+            block_no = bisect_left(self._maxes, key)
+            if block_no == len(self._blocks):
+                return False
+            block = self._blocks[block_no]
+            i = bisect_left(block, key)
+            if i == len(block) or block[i] != key:
+                return False
+            del block[i]
+            self._len -= 1
+            if block:
+                self._maxes[block_no] = block[-1]
+                self._tree_add(block_no, -1)
+            else:
+                del self._blocks[block_no]
+                del self._maxes[block_no]
+                self._rebuild_tree()
+            return True
+
+    def rank(self, key):
+        """0-based position of key, or None if it is not indexed"""
+        with self._lock:
+            block_no = bisect_left(self._maxes, key)
+            if block_no == len(self._blocks):
+                return None
+            block = self._blocks[block_no]
+            i = bisect_left(block, key)
+            if i == len(block) or block[i] != key:
+                return None
+            return self._count_before(block_no) + i
+
+    def slice(self, start, stop):
+        """Keys ranked start (inclusive) to stop (exclusive), 0-based"""
+        with self._lock:
+            start, stop = max(0, start), min(stop, self._len)
+            if start >= stop:
+                return []
+            block_no, offset = self._locate(start)
+            keys = []
+            while len(keys) < stop - start:
+                keys.extend(self._blocks[block_no][offset:offset + stop - start - len(keys)])
+                block_no, offset = block_no + 1, 0
+            return keys
+
+    def replace_all(self, keys):
+        """Swap in a freshly built key set in one step"""
+        keys = sorted(keys)
+        with self._lock:
+            self._build(keys)
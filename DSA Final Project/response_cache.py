@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MAX_CACHED_RESPONSES = 10000
+# Invalidation only reaches this process, so no entry outlives this and
+# writes handled by other workers show up within it
+MAX_TTL_SECONDS = 30
+
+
+class ResponseCache:
+    """Bounded LRU of serialized response bodies with version ETags.
+
+    Every stored body gets a fresh version, so an ETag never matches once its
+    entry was invalidated and rebuilt. A body built while an invalidation
+    happened is returned but not stored, since it may predate the write.
+
+    An entry may also carry the revision of the rows it was built from (a row
+    version, say); it is only served while the caller still sees that revision.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_RESPONSES, max_ttl=MAX_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.entries = OrderedDict()  # key -> (etag, body, expires_at, revision)
+        self.lock = threading.Lock()
+        self.invalidations = 0
+        self.version = 0
+        # Keeps ETags from one process run from matching another
+        self.epoch = f'{os.getpid():x}.{int(time.time()):x}'
+
+    def get(self, key, revision=None):
+        """(etag, body) for a cached key built at this revision, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            etag, body, expires_at, built_at = entry
+            if time.monotonic() >= expires_at or built_at != revision:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return etag, body
+
+    def begin(self):
+        """Token to pass to put() for a body about to be built"""
+        return self.invalidations
+
+    def put(self, key, body, token, ttl=None, revision=None):
+        """Store a freshly built body; returns its ETag"""
+        with self.lock:
+            self.version += 1
+            etag = f'{self.epoch}.{self.version}'
+            if token == self.invalidations:
+                expires_at = time.monotonic() + min(ttl if ttl is not None else self.max_ttl, self.max_ttl)
+                self.entries[key] = (etag, body, expires_at, revision)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            return etag
+
+    def invalidate(self, *keys):
+        with self.lock:
+            self.invalidations += 1
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += 1
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
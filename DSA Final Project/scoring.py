@@ -0,0 +1,107 @@
+import json
+import os
+
+import numpy as np
+from sqlalchemy import bindparam, text
+
+# Bands are (threshold, points), checked from the top band down.
+# Override any key under "priority_scoring" in config.json.
+DEFAULT_POLICY = {
+    'age_bands': [[60, 30], [50, 20], [40, 10]],
+    'family_bands': [[6, 30], [4, 20], [2, 10]],
+    'income_base': 20000,
+    'income_bands': [[0.5, 40], [0.75, 30], [1.0, 20]],
+    'income_default': 10,
+    'max_score': 100,
+}
+
+# Applications that can still be allocated get rescored
+INACTIVE_STATUSES = ('allocated', 'rejected')
+RESCORE_CHUNK_SIZE = 50000
+
+
+def load_policy(config_path='config.json'):
+    """Scoring policy from config.json, falling back to the defaults"""
+    policy = dict(DEFAULT_POLICY)
+    if os.path.exists(config_path):
+        with open(config_path) as f:
+            policy.update(json.load(f).get('priority_scoring', {}))
+    return policy
+
+
+def priority_score(age, family_size, income, policy=DEFAULT_POLICY):
+    """Priority score for one applicant"""
+    score = 0
+    for threshold, points in policy['age_bands']:
+        if age >= threshold:
+            score += points
+            break
+
+    for threshold, points in policy['family_bands']:
+        if family_size >= threshold:
+            score += points
+            break
+
+    income_ratio = income / policy['income_base']
+    for threshold, points in policy['income_bands']:
+        if income_ratio <= threshold:
+            score += points
+            break
+    else:
+        score += policy['income_default']
+
+    return min(policy['max_score'], score)
+
+
+def priority_scores(ages, family_sizes, incomes, policy=DEFAULT_POLICY):
+    """Priority scores for a batch of applicants in one vectorized pass"""
+    ages = np.asarray(ages, dtype=np.int64)
+    family_sizes = np.asarray(family_sizes, dtype=np.int64)
+    income_ratio = np.asarray(incomes, dtype=np.float64) / policy['income_base']
+
+    score = np.select([ages >= t for t, _ in policy['age_bands']],
+                      [p for _, p in policy['age_bands']], 0)
+    score += np.select([family_sizes >= t for t, _ in policy['family_bands']],
+                       [p for _, p in policy['family_bands']], 0)
+    score += np.select([income_ratio <= t for t, _ in policy['income_bands']],
+                       [p for _, p in policy['income_bands']], policy['income_default'])
+
+    return np.minimum(policy['max_score'], score)
+
+
+def rescore_applications(engine, policy=DEFAULT_POLICY, chunk_size=RESCORE_CHUNK_SIZE, progress=None):
+    """Recompute priority_score for every active application.
+
+    Walks the table by id in chunks of plain rows (no ORM objects), scores each
+    chunk at once and writes only the scores that changed, one transaction per
+    chunk. progress(stats) is called after every chunk.
+    """
+    stats = {'scanned': 0, 'updated': 0}
+    select_chunk = text(
+        'SELECT id, age, family_size, income, priority_score FROM application '
+        'WHERE id > :last_id AND status NOT IN :inactive ORDER BY id LIMIT :limit'
+    ).bindparams(bindparam('inactive', value=list(INACTIVE_STATUSES), expanding=True))
+    last_id = 0
+
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_chunk, {'last_id': last_id, 'limit': chunk_size}).fetchall()
+            if not rows:
+                break
+
+            ids, ages, family_sizes, incomes, old_scores = (np.asarray(col) for col in zip(*rows))
+            new_scores = priority_scores(ages, family_sizes, incomes, policy)
+            changed = np.flatnonzero(new_scores != old_scores)
+            if changed.size:
+                conn.execute(
+                    text('UPDATE application SET priority_score = :score, version = version + 1 WHERE id = :id'),
+                    [{'id': int(ids[i]), 'score': int(new_scores[i])} for i in changed]
+                )
+
+        last_id = int(ids[-1])
+        stats['scanned'] += len(rows)
+        stats['updated'] += int(changed.size)
+        if progress:
+            progress(stats)
+
+    return stats
@@ -0,0 +1,67 @@
+import re
+
+from sqlalchemy import text
+
+# Column weights for bm25(), in the column order of each FTS table (setup.py
+# migration 7): an exact name or house code outranks a word in an address
+APPLICATION_WEIGHTS = (10.0, 5.0, 5.0, 1.0)   # name, contact, email, address
+HOUSE_WEIGHTS = (10.0, 2.0, 1.0)               # house_id, address, facilities
+MAX_TERMS = 8
+MIN_TERM_LENGTH = 2
+# bm25() costs about a microsecond per matching row, so a broad prefix such as
+# "ka" over a million rows is ranked among its newest matches only
+RANKED_MATCHES = 10000
+
+_TERM = re.compile(r'\w+')
+
+
+def match_expression(query):
+    """FTS5 MATCH expression for free text: every word must appear, each as
+    a prefix, so "ali kar" finds "Ali Khan, Karachi"; None if no words.
+
+    Words are quoted, so FTS5 operators and punctuation in the input are
+    searched for literally rather than parsed. Single letters are left out,
+    since they match most rows.
+    """
+    terms = [term for term in _TERM.findall(query.lower()) if len(term) >= MIN_TERM_LENGTH][:MAX_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _search(conn, table, weights, columns, query, limit, offset):
+    """(rows, whether every match was ranked)"""
+    expression = match_expression(query)
+    if expression is None:
+        return [], True
+
+    # Rowid of the RANKED_MATCHES-th newest match; FTS5 walks its doclists
+    # in rowid order, so this costs no ranking
+    oldest_ranked = conn.execute(text(
+        f'SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH :query ORDER BY rowid DESC LIMIT 1 OFFSET :n'
+    ), {'query': expression, 'n': RANKED_MATCHES - 1}).scalar()
+
+    rows = conn.execute(text(
+        f'SELECT {", ".join("t." + column for column in columns)}, m.relevance FROM ('
+        f'SELECT rowid, -bm25({table}_fts, {", ".join(map(str, weights))}) AS relevance FROM {table}_fts '
+        f'WHERE {table}_fts MATCH :query AND rowid >= :oldest_ranked '
+        f'ORDER BY relevance DESC, rowid DESC LIMIT :limit OFFSET :offset'
+        f') m JOIN {table} t ON t.id = m.rowid ORDER BY m.relevance DESC, t.id DESC'
+    ), {'query': expression, 'oldest_ranked': oldest_ranked or 0, 'limit': limit, 'offset': offset})
+    return [{**row._mapping, 'relevance': round(row.relevance, 3)} for row in rows], oldest_ranked is None
+
+
+def search_applications(conn, query, limit=20, offset=0):
+    """Applications matching query in name, contact, email or address, best
+    match first; returns (rows, whether every match was ranked)"""
+    return _search(conn, 'application', APPLICATION_WEIGHTS,
+                   ('id', 'name', 'contact', 'email', 'address', 'status', 'priority_score'),
+                   query, limit, offset)
+
+
+def search_houses(conn, query, limit=20, offset=0):
+    """Houses matching query in house_id, address or facilities, best match
+    first; returns (rows, whether every match was ranked)"""
+    return _search(conn, 'house', HOUSE_WEIGHTS,
+                   ('id', 'house_id', 'address', 'house_type', 'bedrooms', 'size', 'rent', 'status', 'facilities'),
+                   query, limit, offset)
@@ -1,14 +1,18 @@
+import copy
 import sqlite3
 import json
+import os
+import re
+import sys
 from datetime import datetime
 
-def setup_database():
-    """Initialize the database with sample data"""
-    conn = sqlite3.connect('homes.db')
-    cursor = conn.cursor()
-    
-    # Create tables
-    cursor.executescript('''
+from database import DEFAULT_SQLITE_SETTINGS
+from jobs import DEFAULT_MAX_PENDING, DEFAULT_WORKERS
+from metrics import DEFAULT_INSTRUMENTATION
+from scoring import DEFAULT_POLICY
+from simulation import DEFAULT_HORIZON_DAYS, DEFAULT_POLICIES
+
+SCHEMA = '''
     CREATE TABLE IF NOT EXISTS application (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
@@ -57,7 +61,67 @@ def setup_database():
         FOREIGN KEY (application_id) REFERENCES application (id),
         FOREIGN KEY (house_id) REFERENCES house (id)
     );
-    ''')
+    
+    CREATE TABLE IF NOT EXISTS status_counter (
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (kind, status)
+    );
+    
+    CREATE TABLE IF NOT EXISTS allocation_proposal (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        application_id INTEGER NOT NULL,
+        house_id INTEGER NOT NULL,
+        match_score INTEGER,
+        status TEXT NOT NULL DEFAULT 'pending',
+        proposed_date TIMESTAMP,
+        proposed_by TEXT,
+        decided_date TIMESTAMP,
+        decided_by TEXT,
+        FOREIGN KEY (application_id) REFERENCES application (id),
+        FOREIGN KEY (house_id) REFERENCES house (id)
+    );
+    
+    CREATE TABLE IF NOT EXISTS allocation_rollup (
+        day TEXT NOT NULL,
+        allocated_by TEXT NOT NULL,
+        allocations INTEGER NOT NULL DEFAULT 0,
+        match_score_sum INTEGER NOT NULL DEFAULT 0,
+        match_score_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, allocated_by)
+    );
+    
+    CREATE TABLE IF NOT EXISTS allocation_wait_rollup (
+        day TEXT NOT NULL,
+        allocated_by TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        allocations INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, allocated_by, bucket)
+    );
+    
+    CREATE TABLE IF NOT EXISTS job (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        params TEXT,
+        progress TEXT,
+        result TEXT,
+        error TEXT,
+        created_by TEXT,
+        created_date TIMESTAMP,
+        started_date TIMESTAMP,
+        finished_date TIMESTAMP
+    );
+'''
+
+def setup_database():
+    """Initialize the database with sample data"""
+    conn = sqlite3.connect('homes.db')
+    cursor = conn.cursor()
+    
+    # Create tables
+    cursor.executescript(SCHEMA)
     
     # Insert sample admin
     cursor.execute('''
@@ -105,26 +169,276 @@ def setup_database():
     conn.close()
     print("Database setup completed successfully!")
 
-def create_config_file():
-    """Create configuration file"""
-    config = {
-        "database": "homes.db",
-        "secret_key": "your-secret-key-change-this",
-        "debug": True,
-        "host": "0.0.0.0",
-        "port": 5000,
-        "admin_username": "admin",
-        "admin_default_password": "admin123"
-    }
-    
-    with open('config.json', 'w') as f:
+def add_column(table, column, definition):
+    """Migration step that adds a column unless create_all already made it"""
+    def step(conn):
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+        if column not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return step
+
+# Versioned schema migrations, tracked in PRAGMA user_version.
+# Each entry is (version, description, statements) and runs in one transaction.
+# A statement may also be a callable that takes the connection.
+MIGRATIONS = [
+    (1, "Indexes for the hot query predicates", [
+        # Store legacy CURRENT_TIMESTAMP values in the same format SQLAlchemy writes,
+        # so string comparisons against bound datetimes stay correct
+        "UPDATE application SET applied_date = applied_date || '.000000' WHERE length(applied_date) = 19",
+        "UPDATE house SET added_date = added_date || '.000000' WHERE length(added_date) = 19",
+        "UPDATE allocation_log SET allocated_date = allocated_date || '.000000' WHERE length(allocated_date) = 19",
+        '''CREATE TABLE IF NOT EXISTS status_counter (
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, status)
+        )''',
+        "CREATE INDEX IF NOT EXISTS ix_application_eligible ON application (status, allocated_house_id, priority_score DESC, applied_date)",
+        "CREATE INDEX IF NOT EXISTS ix_application_rank ON application (priority_score DESC, applied_date)",
+        "CREATE INDEX IF NOT EXISTS ix_application_applied_date ON application (applied_date)",
+        "CREATE INDEX IF NOT EXISTS ix_house_status ON house (status)",
+        "CREATE INDEX IF NOT EXISTS ix_allocation_log_allocated_date ON allocation_log (allocated_date)",
+    ]),
+    (2, "Row versions for optimistic concurrency", [
+        add_column('application', 'version', 'INTEGER NOT NULL DEFAULT 0'),
+        add_column('house', 'version', 'INTEGER NOT NULL DEFAULT 0'),
+    ]),
+    (3, "Geocoded coordinates", [
+        add_column('application', 'latitude', 'FLOAT'),
+        add_column('application', 'longitude', 'FLOAT'),
+        add_column('house', 'latitude', 'FLOAT'),
+        add_column('house', 'longitude', 'FLOAT'),
+    ]),
+    (4, "Allocation proposals from the incremental matcher", [
+        '''CREATE TABLE IF NOT EXISTS allocation_proposal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            application_id INTEGER NOT NULL,
+            house_id INTEGER NOT NULL,
+            match_score INTEGER,
+            status TEXT NOT NULL DEFAULT 'pending',
+            proposed_date TIMESTAMP,
+            proposed_by TEXT,
+            decided_date TIMESTAMP,
+            decided_by TEXT,
+            FOREIGN KEY (application_id) REFERENCES application (id),
+            FOREIGN KEY (house_id) REFERENCES house (id)
+        )''',
+        "CREATE INDEX IF NOT EXISTS ix_allocation_proposal_status ON allocation_proposal (status, house_id)",
+    ]),
+    # Filled by `flask backfill-analytics` for logs written before this version
+    (5, "Allocation analytics rollups", [
+        '''CREATE TABLE IF NOT EXISTS allocation_rollup (
+            day TEXT NOT NULL,
+            allocated_by TEXT NOT NULL,
+            allocations INTEGER NOT NULL DEFAULT 0,
+            match_score_sum INTEGER NOT NULL DEFAULT 0,
+            match_score_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, allocated_by)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS allocation_wait_rollup (
+            day TEXT NOT NULL,
+            allocated_by TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            allocations INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, allocated_by, bucket)
+        )''',
+    ]),
+    (6, "Background jobs", [
+        '''CREATE TABLE IF NOT EXISTS job (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            params TEXT,
+            progress TEXT,
+            result TEXT,
+            error TEXT,
+            created_by TEXT,
+            created_date TIMESTAMP,
+            started_date TIMESTAMP,
+            finished_date TIMESTAMP
+        )''',
+    ]),
+    # External-content indexes over the searchable columns. Triggers fire only
+    # when those columns change, so status and score updates cost nothing extra
+    (7, "Full-text search over applications and houses", [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS application_fts USING fts5(
+            name, contact, email, address,
+            content='application', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS application_fts_insert AFTER INSERT ON application BEGIN
+            INSERT INTO application_fts (rowid, name, contact, email, address) VALUES (new.id, new.name, new.contact, new.email, new.address);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS application_fts_delete AFTER DELETE ON application BEGIN
+            INSERT INTO application_fts (application_fts, rowid, name, contact, email, address) VALUES ('delete', old.id, old.name, old.contact, old.email, old.address);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS application_fts_update AFTER UPDATE OF name, contact, email, address ON application BEGIN
+            INSERT INTO application_fts (application_fts, rowid, name, contact, email, address) VALUES ('delete', old.id, old.name, old.contact, old.email, old.address);
+            INSERT INTO application_fts (rowid, name, contact, email, address) VALUES (new.id, new.name, new.contact, new.email, new.address);
+        END''',
+        "INSERT INTO application_fts (application_fts) VALUES ('rebuild')",
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS house_fts USING fts5(
+            house_id, address, facilities,
+            content='house', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS house_fts_insert AFTER INSERT ON house BEGIN
+            INSERT INTO house_fts (rowid, house_id, address, facilities) VALUES (new.id, new.house_id, new.address, new.facilities);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS house_fts_delete AFTER DELETE ON house BEGIN
+            INSERT INTO house_fts (house_fts, rowid, house_id, address, facilities) VALUES ('delete', old.id, old.house_id, old.address, old.facilities);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS house_fts_update AFTER UPDATE OF house_id, address, facilities ON house BEGIN
+            INSERT INTO house_fts (house_fts, rowid, house_id, address, facilities) VALUES ('delete', old.id, old.house_id, old.address, old.facilities);
+            INSERT INTO house_fts (rowid, house_id, address, facilities) VALUES (new.id, new.house_id, new.address, new.facilities);
+        END''',
+        "INSERT INTO house_fts (house_fts) VALUES ('rebuild')",
+    ]),
+]
+
+def migrate_database(path='homes.db'):
+    """Upgrade an existing database in place to the latest schema version"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for target, description, statements in MIGRATIONS:
+            if target <= version:
+                continue
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {target}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            version = target
+            print(f"Applied migration {target}: {description}")
+        return version
+    finally:
+        conn.close()
+
+# The queries behind the waiting list, allocation and stats pages,
+# with sample parameters
+HOT_QUERIES = {
+    'waiting list first page': (
+        "SELECT id FROM application ORDER BY priority_score DESC, applied_date ASC, id ASC LIMIT 51", ()),
+    'waiting list next page': (
+        "SELECT id FROM application WHERE priority_score <= ? AND (priority_score < ? OR applied_date > ? "
+        "OR (applied_date = ? AND id > ?)) ORDER BY priority_score DESC, applied_date ASC, id ASC LIMIT 51",
+        (80, 80, '2025-01-01 00:00:00.000000', '2025-01-01 00:00:00.000000', 10)),
+    'eligible applications': (
+        "SELECT id, priority_score, family_size FROM application WHERE status = ? AND allocated_house_id IS NULL "
+        "ORDER BY priority_score DESC, applied_date ASC, id ASC", ('approved',)),
+    'available houses': (
+        "SELECT id, bedrooms, size FROM house WHERE status = ?", ('available',)),
+    'recent applications': (
+        "SELECT id FROM application ORDER BY applied_date DESC LIMIT 10", ()),
+    'recent allocations': (
+        "SELECT id FROM allocation_log ORDER BY allocated_date DESC LIMIT 5", ()),
+    'allocated today': (
+        "SELECT count(*) FROM allocation_log WHERE allocated_date >= ?", ('2025-01-01',)),
+    'status counters': (
+        "SELECT kind, status, count FROM status_counter", ()),
+    'search applications': (
+        "SELECT rowid FROM application_fts WHERE application_fts MATCH ? ORDER BY bm25(application_fts) LIMIT 20",
+        ('"ali"* "kar"*',)),
+}
+
+def explain_hot_queries(path='homes.db'):
+    """Print EXPLAIN QUERY PLAN for the hot queries; False if any does a full table scan"""
+    conn = sqlite3.connect(path)
+    ok = True
+    try:
+        for name, (sql, params) in HOT_QUERIES.items():
+            try:
+                details = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+            except sqlite3.OperationalError as e:
+                ok = False
+                print(f"{'ERROR':>9}  {name}: {e}")
+                continue
+            full_scans = [d for d in details
+                          if re.fullmatch(r'SCAN (application|house|allocation_log)', d)]
+            ok = ok and not full_scans
+            print(f"{'FULL SCAN' if full_scans else 'ok':>9}  {name}: {'; '.join(details)}")
+    finally:
+        conn.close()
+    return ok
+
+# Every section app.py reads from config.json, with its default values
+# Sections the modules have defaults for are built from them, so the
+# generated file always matches what the app falls back to
+DEFAULT_CONFIG = {
+    "database": "homes.db",
+    "secret_key": "your-secret-key-change-this",
+    "debug": True,
+    "host": "0.0.0.0",
+    "port": 5000,
+    "admin_username": "admin",
+    "admin_default_password": "admin123",
+    "incremental_allocation": "propose",
+    "jobs": {
+        "workers": DEFAULT_WORKERS,
+        "max_pending": DEFAULT_MAX_PENDING
+    },
+    "simulation": {
+        "horizon_days": DEFAULT_HORIZON_DAYS,
+        "workers": None,
+        "max_scenarios": 1000,
+        "arrivals_per_day": None,
+        "vacancies_per_day": None,
+        "policies": {
+            **DEFAULT_POLICIES,
+            "income-first": {"priority_scoring": {"income_bands": [[0.5, 50], [0.75, 35], [1.0, 20]]}}
+        }
+    },
+    "instrumentation": dict(DEFAULT_INSTRUMENTATION),
+    "sqlite": dict(DEFAULT_SQLITE_SETTINGS),
+    "priority_scoring": dict(DEFAULT_POLICY)
+}
+
+def create_config_file(path='config.json'):
+    """Create the configuration file, or add missing defaults to an existing one.
+
+    Keys already in the file are kept as they are; within a section only the
+    missing keys are filled in.
+    """
+    config = {}
+    existed = os.path.exists(path)
+    if existed:
+        with open(path) as f:
+            config = json.load(f)
+    
+    for key, value in DEFAULT_CONFIG.items():
+        if key not in config:
+            config[key] = copy.deepcopy(value)
+        elif isinstance(value, dict) and isinstance(config[key], dict):
+            for option, default in value.items():
+                config[key].setdefault(option, copy.deepcopy(default))
+    
+    with open(path, 'w') as f:
         json.dump(config, f, indent=4)
     
-    print("Configuration file created!")
+    print("Configuration file updated!" if existed else "Configuration file created!")
 
 if __name__ == '__main__':
+    # python setup.py migrate [db]  -> upgrade an existing database only
+    # python setup.py explain [db]  -> check the hot queries use indexes
+    if len(sys.argv) > 1 and sys.argv[1] in ('migrate', 'explain'):
+        db_path = sys.argv[2] if len(sys.argv) > 2 else 'homes.db'
+        if sys.argv[1] == 'migrate':
+            print(f"Database {db_path} is at schema version {migrate_database(db_path)}")
+        else:
+            sys.exit(0 if explain_hot_queries(db_path) else 1)
+        sys.exit(0)
+    
     print("Setting up HomeAlloc System...")
     setup_database()
+    migrate_database()
     create_config_file()
     print("\nSetup completed! You can now run:")
     print("1. python app.py (for Flask backend)")
@@ -0,0 +1,309 @@
+import heapq
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sqlalchemy import bindparam, text
+
+from matching import MIN_MATCH_SCORE, match_score_matrix
+from scoring import DEFAULT_POLICY, priority_scores
+
+# Applications still waiting for a house; pending ones are assumed approved in time
+WAITING_STATUSES = ('pending', 'approved')
+DEFAULT_HORIZON_DAYS = 365
+DEFAULT_SCENARIOS = 100
+HISTORY_DAYS = 90
+WAIT_PERCENTILES = (10, 50, 90)
+SPREAD_PERCENTILES = (5, 95)
+
+# Used when config.json has no "simulation" policies: today's rules, and
+# the stricter threshold allocate_suggestions applies
+DEFAULT_POLICIES = {
+    'current': {},
+    'match-70': {'min_match_score': 70},
+}
+
+
+class Snapshot:
+    """The waiting list and housing stock as NumPy arrays.
+
+    Waiting applicants carry how long they have waited so far; the whole
+    application history and house table are kept as the populations new
+    arrivals and vacancies are drawn from.
+    """
+
+    def __init__(self, waiting, waited_days, population, available, stock,
+                 arrivals_per_day=0.0, vacancies_per_day=0.0):
+        """waiting, population: (ages, family_sizes, incomes) arrays.
+        available, stock: (bedrooms, sizes) arrays.
+        """
+        self.waiting = waiting
+        self.waited_days = waited_days
+        self.population = population
+        self.available = available
+        self.stock = stock
+        self.arrivals_per_day = arrivals_per_day
+        self.vacancies_per_day = vacancies_per_day
+
+    @classmethod
+    def from_database(cls, engine, history_days=HISTORY_DAYS):
+        """Snapshot the current tables. The arrival rate is applications per
+        day over the last history_days; the vacancy rate is allocations per
+        day, since every allocation filled a house that came free"""
+        def columns(conn, statement, dtypes):
+            rows = conn.execute(statement).fetchall()
+            return tuple(np.array([row[i] for row in rows], dtype=dtype) for i, dtype in enumerate(dtypes))
+
+        person = (np.int64, np.int64, np.float64)
+        with engine.connect() as conn:
+            *waiting, waited_days = columns(
+                conn,
+                text(
+                    'SELECT age, family_size, income, '
+                    "max(0, julianday('now') - julianday(coalesce(applied_date, 'now'))) "
+                    'FROM application WHERE status IN :waiting AND allocated_house_id IS NULL'
+                ).bindparams(bindparam('waiting', value=list(WAITING_STATUSES), expanding=True)),
+                person + (np.float64,))
+            population = columns(conn, text('SELECT age, family_size, income FROM application'), person)
+            available = columns(conn, text("SELECT bedrooms, size FROM house WHERE status = 'available'"),
+                                (np.int64, np.float64))
+            stock = columns(conn, text('SELECT bedrooms, size FROM house'), (np.int64, np.float64))
+
+            since = f'-{int(history_days)} days'
+            arrivals = conn.execute(text(
+                "SELECT count(*) FROM application WHERE applied_date >= datetime('now', :since)"),
+                {'since': since}).scalar()
+            vacancies = conn.execute(text(
+                "SELECT count(*) FROM allocation_log WHERE allocated_date >= datetime('now', :since)"),
+                {'since': since}).scalar()
+
+        return cls(tuple(waiting), waited_days, population, available, stock,
+                   arrivals / history_days, vacancies / history_days)
+
+
+def build_policies(base_scoring, definitions=None):
+    """Named policies from {name: {"priority_scoring": overrides, "min_match_score": n}},
+    each applied on top of base_scoring and the default match threshold"""
+    policies = {}
+    for name, definition in (definitions or DEFAULT_POLICIES).items():
+        policies[name] = {
+            'scoring': {**base_scoring, **definition.get('priority_scoring', {})},
+            'min_match_score': definition.get('min_match_score', MIN_MATCH_SCORE),
+        }
+    return policies
+
+
+def reporting_bands(policy=DEFAULT_POLICY):
+    """Age, family and income bands to report fairness over, from a scoring
+    policy's thresholds so every simulated policy is judged on the same bands.
+
+    Returns {dimension: (edges, labels)}; np.digitize(values, edges) gives the label index.
+    """
+    bands = {}
+    for dimension, key in (('age', 'age_bands'), ('family_size', 'family_bands')):
+        edges = sorted(threshold for threshold, _ in policy[key])
+        labels = [f'<{edges[0]}'] + [f'{lo}-{hi - 1}' for lo, hi in zip(edges, edges[1:])] + [f'{edges[-1]}+']
+        bands[dimension] = (edges, labels)
+
+    # Income bands are upper bounds, so a value on the edge belongs to the lower band
+    edges = sorted(ratio * policy['income_base'] for ratio, _ in policy['income_bands'])
+    labels = [f'<={edge:g}' for edge in edges] + [f'>{edges[-1]:g}']
+    bands['income'] = (np.nextafter(edges, np.inf), labels)
+    return bands
+
+
+def _replay(people, times, vacancy_times, eligible, family_index, policy):
+    """Give each vacancy, in time order, to the waiting applicant with the
+    highest priority (earliest arrival on ties) whose match with the house
+    reaches the policy threshold, as place_house does.
+
+    Returns (allocation time per applicant, NaN if never housed; match score).
+    """
+    ages, family_sizes, incomes = people
+    priority = priority_scores(ages, family_sizes, incomes, policy['scoring']).tolist()
+    acceptable = eligible >= policy['min_match_score']
+
+    # One heap per family size of (-priority, arrival time, applicant)
+    heaps = [[] for _ in range(eligible.shape[0])]
+    arrival_order = np.argsort(times, kind='stable').tolist()
+    times_list = times.tolist()
+    family_list = family_index.tolist()
+    allocated_at = np.full(len(times_list), np.nan)
+    match_scores = np.zeros(len(times_list), dtype=np.int32)
+
+    arrived = 0
+    for house, now in enumerate(vacancy_times.tolist()):
+        while arrived < len(arrival_order) and times_list[arrival_order[arrived]] <= now:
+            person = arrival_order[arrived]
+            heapq.heappush(heaps[family_list[person]], (-priority[person], times_list[person], person))
+            arrived += 1
+
+        best = None
+        for family in np.flatnonzero(acceptable[:, house]).tolist():
+            heap = heaps[family]
+            if heap and (best is None or heap[0] < heaps[best][0]):
+                best = family
+        if best is not None:
+            person = heapq.heappop(heaps[best])[2]
+            allocated_at[person] = now
+            match_scores[person] = eligible[best, house]
+
+    return allocated_at, match_scores
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 1) if values.size else None
+
+
+def _metrics(people, times, allocated_at, match_scores, horizon_days, bands):
+    housed = ~np.isnan(allocated_at)
+    waits = (allocated_at - times)[housed]
+    still_waiting = (horizon_days - times)[~housed]
+    metrics = {
+        'applicants': int(times.size),
+        'allocated': int(housed.sum()),
+        'allocation_rate': round(float(housed.mean()), 4) if times.size else None,
+        'average_match_score': round(float(match_scores[housed].mean()), 1) if housed.any() else None,
+        'still_waiting_median_days': _percentile(still_waiting, 50),
+    }
+    for q in WAIT_PERCENTILES:
+        metrics[f'wait_p{q}_days'] = _percentile(waits, q)
+
+    fairness = {}
+    for (dimension, (edges, labels)), values in zip(bands.items(), people):
+        band_index = np.digitize(values, edges)
+        rows = {}
+        for position, label in enumerate(labels):
+            in_band = band_index == position
+            band_housed = housed & in_band
+            rows[label] = {
+                'applicants': int(in_band.sum()),
+                'allocation_rate': round(float(band_housed.sum() / in_band.sum()), 4) if in_band.any() else None,
+                'median_wait_days': _percentile((allocated_at - times)[band_housed], 50),
+            }
+        rates = [row['allocation_rate'] for row in rows.values() if row['allocation_rate'] is not None]
+        # Lowest band rate over the highest: 1.0 means every band is housed at the same rate
+        fairness[dimension] = {
+            'bands': rows,
+            'rate_ratio': round(min(rates) / max(rates), 4) if rates and max(rates) > 0 else None,
+        }
+    metrics['fairness'] = fairness
+    return metrics
+
+
+def run_scenario(snapshot, policies, seed, horizon_days, bands):
+    """Draw one arrival/vacancy scenario and replay it under every policy.
+
+    Arrivals and vacancies are Poisson processes at the snapshot's rates, with
+    applicants and houses resampled from the populations. All policies see the
+    same draw, so differences between them are not sampling noise.
+    """
+    rng = np.random.default_rng(seed)
+    n_arrivals = rng.poisson(snapshot.arrivals_per_day * horizon_days) if snapshot.population[0].size else 0
+    n_vacancies = rng.poisson(snapshot.vacancies_per_day * horizon_days) if snapshot.stock[0].size else 0
+
+    picks = rng.integers(snapshot.population[0].size, size=n_arrivals)
+    people = tuple(np.concatenate([current, everyone[picks]])
+                   for current, everyone in zip(snapshot.waiting, snapshot.population))
+    times = np.concatenate([-snapshot.waited_days, np.sort(rng.uniform(0, horizon_days, n_arrivals))])
+
+    picks = rng.integers(snapshot.stock[0].size, size=n_vacancies)
+    bedrooms, sizes = (np.concatenate([now, stock[picks]]) for now, stock in zip(snapshot.available, snapshot.stock))
+    vacancy_times = np.concatenate([np.zeros(snapshot.available[0].size),
+                                    np.sort(rng.uniform(0, horizon_days, n_vacancies))])
+
+    # A match score depends only on family size, so score each distinct size once
+    families, family_index = np.unique(people[1], return_inverse=True)
+    eligible = match_score_matrix(families, bedrooms, sizes)
+
+    results = {}
+    for name, policy in policies.items():
+        allocated_at, match_scores = _replay(people, times, vacancy_times, eligible, family_index, policy)
+        results[name] = _metrics(people, times, allocated_at, match_scores, horizon_days, bands)
+    return results
+
+
+# Set once per worker process, so the snapshot is pickled per worker, not per task
+_worker_state = {}
+
+
+def _init_worker(snapshot, policies, horizon_days, bands):
+    _worker_state.update(snapshot=snapshot, policies=policies, horizon_days=horizon_days, bands=bands)
+
+
+def _run_chunk(seeds):
+    state = _worker_state
+    return [run_scenario(state['snapshot'], state['policies'], seed, state['horizon_days'], state['bands'])
+            for seed in seeds]
+
+
+def _summarize(values):
+    """Mean and 5th-95th percentile spread of one metric across scenarios"""
+    values = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    if np.isnan(values).all():
+        return None
+    low, high = np.nanpercentile(values, SPREAD_PERCENTILES)
+    return {'mean': round(float(np.nanmean(values)), 4), 'p5': round(float(low), 4), 'p95': round(float(high), 4)}
+
+
+def _combine(results):
+    """Per-scenario metric dicts folded into one dict of summaries"""
+    first = results[0]
+    if isinstance(first, dict):
+        return {key: _combine([result[key] for result in results]) for key in first}
+    return _summarize(results)
+
+
+def simulate(snapshot, policies, scenarios=DEFAULT_SCENARIOS, horizon_days=DEFAULT_HORIZON_DAYS,
+             workers=None, seed=0, bands=None, progress=None):
+    """Replay `scenarios` random futures of the waiting list under each policy.
+
+    Scenarios are spread over a process pool of `workers` (all cores by
+    default; 1 runs them in this process). Every metric is reported as its
+    mean and 5th-95th percentile spread across scenarios. progress(stats) is
+    called as chunks of scenarios finish.
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    bands = bands or reporting_bands()
+    seeds = np.random.SeedSequence(seed).spawn(scenarios)
+    stats = {'scenarios': scenarios, 'completed': 0}
+    results = []
+
+    if workers == 1:
+        for child in seeds:
+            results.append(run_scenario(snapshot, policies, child, horizon_days, bands))
+            stats['completed'] += 1
+            if progress:
+                progress(stats)
+    else:
+        # Several chunks per worker keeps them busy when scenarios take uneven time
+        chunk_size = max(1, scenarios // (workers * 4))
+        chunks = [seeds[i:i + chunk_size] for i in range(0, scenarios, chunk_size)]
+        # spawn, not fork: the caller may be a threaded web server
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(snapshot, policies, horizon_days, bands)) as pool:
+            futures = {pool.submit(_run_chunk, chunk): i for i, chunk in enumerate(chunks)}
+            chunk_results = [None] * len(chunks)
+            for future in as_completed(futures):
+                chunk_results[futures[future]] = future.result()
+                stats['completed'] += len(chunk_results[futures[future]])
+                if progress:
+                    progress(stats)
+        # In seed order, so the report does not depend on which worker finished first
+        results = [result for chunk in chunk_results for result in chunk]
+
+    return {
+        'scenarios': scenarios,
+        'horizon_days': horizon_days,
+        'waiting_applicants': int(snapshot.waited_days.size),
+        'available_houses': int(snapshot.available[0].size),
+        'arrivals_per_day': round(snapshot.arrivals_per_day, 3),
+        'vacancies_per_day': round(snapshot.vacancies_per_day, 3),
+        'workers': workers,
+        'elapsed_seconds': round(time.perf_counter() - started, 2),
+        'policies': {name: _combine([result[name] for result in results]) for name in policies},
+    }
@@ -0,0 +1,87 @@
+"""Startup benchmark: time from a fresh interpreter to the first response.
+
+Starts one worker process, then N at once as a pre-forking server would,
+each importing the app, building it with create_app() and serving its first
+request in-process. Uses the app's configured database, so set it up first:
+
+    python -m flask --app app init-db
+    python startup_benchmark.py --workers 4 --path /api/stats
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+def child(path):
+    """Runs in each worker process; prints its timings as JSON"""
+    started = time.perf_counter()
+    import app as homealloc
+    imported = time.perf_counter()
+    flask_app = homealloc.create_app()
+    created = time.perf_counter()
+    response = flask_app.test_client().get(path)
+    answered = time.perf_counter()
+    print(json.dumps({
+        'import_ms': round((imported - started) * 1000, 1),
+        'create_app_ms': round((created - imported) * 1000, 1),
+        'first_response_ms': round((answered - created) * 1000, 1),
+        'status': response.status_code,
+    }))
+
+
+def start_workers(n_workers, path):
+    """Start n_workers at once and wait for all; returns (per-worker timings, wall ms)"""
+    started = time.perf_counter()
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', path],
+                                  stdout=subprocess.PIPE, text=True)
+                 for _ in range(n_workers)]
+    timings = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in processes]
+    # Wall time includes interpreter start, which the workers cannot measure themselves
+    return timings, round((time.perf_counter() - started) * 1000, 1)
+
+
+def summarize(timings, wall_ms):
+    summary = {'workers': len(timings), 'wall_ms': wall_ms,
+               'errors': sum(1 for worker in timings if worker['status'] >= 400)}
+    for key in ('import_ms', 'create_app_ms', 'first_response_ms'):
+        values = np.array([worker[key] for worker in timings])
+        summary[key] = {'median': round(float(np.median(values)), 1), 'max': round(float(values.max()), 1)}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import-to-first-response time of the HomeAlloc app')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='workers for the parallel run')
+    parser.add_argument('--path', default='/', help='route the first request goes to')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each size; the best is reported')
+    parser.add_argument('--output', default=f'startup-{datetime.now():%Y%m%d-%H%M%S}.json')
+    parser.add_argument('--child', metavar='PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    results = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'path': args.path, 'runs': {}}
+    print(f"{'workers':<9}{'import ms':>11}{'create ms':>11}{'first req ms':>14}{'wall ms':>10}")
+    for n_workers in sorted({1, args.workers}):
+        # Best of several runs, so a cold disk cache on the first run does not count
+        runs = [summarize(*start_workers(n_workers, args.path)) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run['wall_ms'])
+        results['runs'][str(n_workers)] = best
+        print(f"{n_workers:<9}{best['import_ms']['median']:>11}{best['create_app_ms']['median']:>11}"
+              f"{best['first_response_ms']['median']:>14}{best['wall_ms']:>10}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f'✅ Results saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import bisect
+import heapq
+from collections import defaultdict
+
+from matching import MAX_SIZE_POINTS, MIN_MATCH_SCORE, MIN_SIZE_PER_PERSON, SQFT_PER_SIZE_POINT, match_score
+
+
+class SuggestionIndex:
+    """Available houses bucketed by bedrooms and sorted by size, and eligible
+    applicants bucketed by family size in waiting list order.
+
+    Within a bucket the match score only depends on size (for houses) or not
+    at all (for applicants), so each bucket can be walked best-first and a
+    heap over the buckets yields the exact top k without scoring every pair.
+    """
+
+    def __init__(self, houses, applications):
+        """houses: rows of (id, bedrooms, size).
+        applications: rows of (id, priority_score, family_size), in waiting list order.
+        """
+        by_bedrooms = defaultdict(list)
+        for house_id, bedrooms, size in houses:
+            by_bedrooms[bedrooms].append((size, house_id))
+        self.house_buckets = {}
+        for bedrooms, rows in by_bedrooms.items():
+            rows.sort()
+            self.house_buckets[bedrooms] = ([size for size, _ in rows], [house_id for _, house_id in rows])
+
+        self.applications = [tuple(row) for row in applications]
+        self.app_buckets = defaultdict(list)
+        for rank, (app_id, priority, family_size) in enumerate(self.applications):
+            self.app_buckets[family_size].append((app_id, priority, rank))
+
+        self.house_count = len(houses)
+        self.application_count = len(self.applications)
+
+    def _house_stream(self, family_size, bedrooms):
+        """Houses in one bucket with non-increasing score for this family.
+
+        Houses big enough for the full size points all tie, so the smallest of
+        them comes first, leaving larger houses for larger families; then the
+        rest from largest down.
+        """
+        sizes, ids = self.house_buckets[bedrooms]
+        cap = bisect.bisect_left(sizes, family_size * MIN_SIZE_PER_PERSON + MAX_SIZE_POINTS * SQFT_PER_SIZE_POINT)
+        for position in range(cap, len(sizes)):
+            yield ids[position], sizes[position]
+        for position in range(cap - 1, -1, -1):
+            yield ids[position], sizes[position]
+
+    def top_houses(self, family_size, k=5, min_score=MIN_MATCH_SCORE):
+        """[(house_id, score)] of the k best houses for a family, best first"""
+        heap = []
+        for bedrooms in self.house_buckets:
+            stream = self._house_stream(family_size, bedrooms)
+            for house_id, size in stream:
+                heap.append((-match_score(family_size, bedrooms, size), bedrooms, house_id, stream))
+                break
+        heapq.heapify(heap)
+
+        top = []
+        while heap and len(top) < k:
+            negative_score, bedrooms, house_id, stream = heapq.heappop(heap)
+            if -negative_score < min_score:
+                break
+            top.append((house_id, -negative_score))
+            for next_id, size in stream:
+                heapq.heappush(heap, (-match_score(family_size, bedrooms, size), bedrooms, next_id, stream))
+                break
+        return top
+
+    def top_applicants(self, bedrooms, size, k=5, min_score=MIN_MATCH_SCORE):
+        """[(application_id, score)] of the k best applicants for a house.
+
+        Best match first; equal scores go by waiting list order.
+        """
+        heap = []
+        for family_size, bucket in self.app_buckets.items():
+            score = match_score(family_size, bedrooms, size)
+            if score >= min_score and bucket:
+                heap.append((-score, bucket[0][2], family_size, 0))
+        heapq.heapify(heap)
+
+        top = []
+        while heap and len(top) < k:
+            negative_score, _, family_size, position = heapq.heappop(heap)
+            bucket = self.app_buckets[family_size]
+            top.append((bucket[position][0], -negative_score))
+            if position + 1 < len(bucket):
+                heapq.heappush(heap, (negative_score, bucket[position + 1][2], family_size, position + 1))
+        return top
@@ -0,0 +1,42 @@
+import pytest
+
+import app as homealloc
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App on a fresh, seeded database (admin and three available houses)"""
+    flask_app = homealloc.create_app({'database': str(tmp_path / 'homes.db'), 'secret_key': 'test',
+                                      'jobs': {'workers': 1}})
+    flask_app.testing = True
+    with flask_app.app_context():
+        homealloc.init_database()
+    yield flask_app
+    homealloc.job_runner.executor.shutdown(wait=True)
+    with flask_app.app_context():
+        for engine in homealloc.db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+        session['admin_username'] = 'admin'
+    return client
+
+
+def add_application(**fields):
+    """Insert one application directly, inside an app context"""
+    values = {'name': 'Test Applicant', 'age': 40, 'family_size': 4, 'income': 10000, 'contact': '+920000000000',
+              'status': 'pending', 'priority_score': 50, **fields}
+    application = homealloc.Application(**values)
+    homealloc.db.session.add(application)
+    homealloc.db.session.commit()
+    return application
@@ -0,0 +1,134 @@
+from sqlalchemy.orm.exc import StaleDataError
+
+import app as homealloc
+from conftest import add_application
+
+
+def allocate(app, app_id, house_id, **versions):
+    with app.app_context():
+        payload, status = homealloc.allocate_pair(app_id, house_id, 'admin', **versions)
+        return payload, status
+
+
+def house_status(app, house_id):
+    with app.app_context():
+        return homealloc.db.session.get(homealloc.House, house_id).status
+
+
+def test_second_claim_on_a_house_loses(app):
+    with app.app_context():
+        first = add_application(status='approved').id
+        second = add_application(status='approved').id
+
+    assert allocate(app, first, 1)[1] == 200
+    payload, status = allocate(app, second, 1)
+
+    assert status == 409
+    assert payload == {'success': False, 'error': 'House is not available'}
+    with app.app_context():
+        assert homealloc.db.session.get(homealloc.Application, second).status == 'approved'
+        assert homealloc.get_status_counts()['application']['allocated'] == 1
+
+
+def test_application_with_a_house_does_not_claim_another(app):
+    with app.app_context():
+        app_id = add_application(status='approved').id
+
+    assert allocate(app, app_id, 1)[1] == 200
+    payload, status = allocate(app, app_id, 2)
+
+    assert status == 409
+    assert payload['error'] == 'Application already has a house'
+    # The conditional claim on house 2 was rolled back
+    assert house_status(app, 2) == 'available'
+
+
+def test_stale_versions_are_conflicts(app):
+    with app.app_context():
+        application = add_application(status='approved')
+        app_id, app_version = application.id, application.version
+        house_version = homealloc.db.session.get(homealloc.House, 1).version
+
+    payload, status = allocate(app, app_id, 1, house_version=house_version + 1)
+    assert status == 409
+    assert payload['error'] == 'House was changed by someone else, please reload'
+    assert house_status(app, 1) == 'available'
+
+    payload, status = allocate(app, app_id, 1, application_version=app_version + 1)
+    assert status == 409
+    assert payload['error'] == 'Application was changed by someone else, please reload'
+    assert house_status(app, 1) == 'available'
+
+    payload, status = allocate(app, app_id, 1, application_version=app_version, house_version=house_version)
+    assert status == 200
+
+
+def test_allocate_house_route_answers_409(app, admin_client):
+    with app.app_context():
+        first = add_application(status='approved').id
+        second = add_application(status='approved').id
+
+    assert admin_client.post('/admin/api/allocate-house', json={'application_id': first, 'house_id': 1}).status_code == 200
+    response = admin_client.post('/admin/api/allocate-house', json={'application_id': second, 'house_id': 1})
+    assert response.status_code == 409
+    assert not response.json['success']
+
+
+def test_missing_rows_are_not_found(app):
+    with app.app_context():
+        app_id = add_application(status='approved').id
+
+    assert allocate(app, app_id, 999)[1] == 404
+    assert allocate(app, 999, 1)[1] == 404
+    assert house_status(app, 1) == 'available'
+
+
+def test_update_application_answers_409_on_a_stale_row(app, admin_client, monkeypatch):
+    with app.app_context():
+        app_id = add_application().id
+
+    def lose_race():
+        raise StaleDataError('application row was updated concurrently')
+
+    monkeypatch.setattr(homealloc.db.session, 'commit', lose_race)
+    response = admin_client.post('/admin/api/update-application', json={'id': app_id, 'action': 'approve'})
+    monkeypatch.undo()
+
+    assert response.status_code == 409
+    assert not response.json['success']
+    with app.app_context():
+        assert homealloc.db.session.get(homealloc.Application, app_id).status == 'pending'
+        assert homealloc.get_status_counts()['application']['approved'] == 0
+
+
+def run_allocation(admin_client, **body):
+    response = admin_client.post('/admin/api/run-allocation-algorithm', json={'wait': True, **body})
+    return response.json, response.status_code
+
+
+def test_commit_writes_the_reviewed_plan(app, admin_client):
+    with app.app_context():
+        add_application(status='approved')
+
+    plan, status = run_allocation(admin_client, dry_run=True)
+    assert status == 200 and plan['allocation_count'] == 1
+
+    payload, status = run_allocation(admin_client, dry_run=False, plan_id=plan['plan_id'])
+    assert status == 200
+    assert payload['allocations'] == plan['allocations']
+    assert house_status(app, plan['allocations'][0]['house_id']) == 'occupied'
+
+
+def test_commit_of_an_outdated_plan_is_a_conflict(app, admin_client):
+    with app.app_context():
+        add_application(status='approved', priority_score=50)
+
+    plan, _ = run_allocation(admin_client, dry_run=True)
+    with app.app_context():
+        add_application(status='approved', priority_score=90)
+
+    payload, status = run_allocation(admin_client, dry_run=False, plan_id=plan['plan_id'])
+    assert status == 409
+    assert payload['plan_id'] != plan['plan_id']
+    with app.app_context():
+        assert homealloc.get_status_counts()['application']['allocated'] == 0
@@ -0,0 +1,70 @@
+import itertools
+import random
+
+from allocation_engine import plan_allocations
+from matching import match_score_matrix
+
+
+def best_total(applications, houses, min_match_score):
+    """Largest total priority * match score over every possible assignment"""
+    scores = match_score_matrix([a[2] for a in applications], [h[1] for h in houses], [h[2] for h in houses])
+    best = 0
+    slots = list(range(len(houses))) + [None] * len(applications)
+    for choice in itertools.permutations(slots, len(applications)):
+        total = sum(applications[row][1] * scores[row, col] for row, col in enumerate(choice)
+                    if col is not None and scores[row, col] >= min_match_score)
+        best = max(best, total)
+    return best
+
+
+def test_empty_inputs():
+    assert plan_allocations([], [(1, 2, 1000)]) == []
+    assert plan_allocations([(1, 80, 4)], []) == []
+
+
+def test_identical_applicants_go_in_list_order():
+    # Same priority and family size: the earliest rows get the houses
+    applications = [(10, 80, 4), (11, 80, 4), (12, 80, 4)]
+    houses = [(1, 2, 1600), (2, 2, 1600)]
+
+    allocations = plan_allocations(applications, houses)
+
+    assert sorted(app_id for app_id, _, _ in allocations) == [10, 11]
+    assert sorted(house_id for _, house_id, _ in allocations) == [1, 2]
+
+
+def test_higher_priority_wins_a_contested_house():
+    applications = [(10, 40, 4), (11, 90, 4)]
+    houses = [(1, 2, 1600)]
+
+    assert plan_allocations(applications, houses) == [(11, 1, 100)]
+
+
+def test_pairs_below_min_score_are_never_matched():
+    # Family of 4 in a 5-bedroom, 100 sq ft house scores 50
+    applications = [(10, 90, 4)]
+    assert plan_allocations(applications, [(1, 5, 100)]) == []
+    assert plan_allocations(applications, [(1, 5, 100)], min_match_score=50) == [(10, 1, 50)]
+
+
+def test_min_score_is_inclusive():
+    # 2 bedrooms for a family of 4 with no spare space scores exactly 80
+    applications = [(10, 90, 4)]
+    houses = [(1, 2, 600)]
+    assert plan_allocations(applications, houses, min_match_score=80) == [(10, 1, 80)]
+    assert plan_allocations(applications, houses, min_match_score=81) == []
+
+
+def test_total_is_optimal():
+    rng = random.Random(7)
+    for _ in range(20):
+        applications = [(i, rng.randint(10, 100), rng.randint(1, 8)) for i in range(5)]
+        houses = [(100 + i, rng.randint(1, 5), rng.randint(300, 2500)) for i in range(4)]
+
+        allocations = plan_allocations(applications, houses)
+
+        priorities = {app_id: priority for app_id, priority, _ in applications}
+        assert len({house_id for _, house_id, _ in allocations}) == len(allocations)
+        assert all(score >= 60 for _, _, score in allocations)
+        total = sum(priorities[app_id] * score for app_id, _, score in allocations)
+        assert total == best_total(applications, houses, 60)
@@ -0,0 +1,90 @@
+import random
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+import app as homealloc
+from analytics import WAIT_BUCKET_RATIO, allocation_totals, backfill_rollups, bucket_hours, wait_bucket
+from conftest import add_application
+
+
+def rollup_rows():
+    session = homealloc.db.session
+    return (sorted(session.execute(text('SELECT * FROM allocation_rollup')).fetchall()),
+            sorted(session.execute(text('SELECT * FROM allocation_wait_rollup')).fetchall()))
+
+
+def add_houses(n):
+    for i in range(n):
+        homealloc.db.session.add(homealloc.House(house_id=f'T-{i}', address='Karachi', house_type='house',
+                                                 bedrooms=2 + i % 3, size=900 + 100 * i, rent=10000))
+    homealloc.db.session.commit()
+
+
+def test_live_rollups_equal_a_backfill(app):
+    rng = random.Random(7)
+    with app.app_context():
+        add_houses(9)
+        now = datetime.utcnow()
+        for i in range(12):
+            applied_date = None if i % 5 == 0 else now - timedelta(hours=rng.uniform(0, 2000))
+            add_application(status='approved', family_size=rng.randint(1, 8), applied_date=applied_date,
+                            priority_score=rng.randint(0, 100))
+        # One by one by two admins, then the rest in a batch
+        ids = [row.id for row in homealloc.Application.query.order_by(homealloc.Application.id).limit(4)]
+        for app_id, house_id, admin in zip(ids, (1, 2, 4, 5), ('admin', 'clerk', 'admin', 'clerk')):
+            assert homealloc.allocate_pair(app_id, house_id, admin)[1] == 200
+        payload, status = homealloc.run_allocation_round(False, None, 'admin')
+        assert status == 200 and payload['allocation_count'] > 0
+
+        live = rollup_rows()
+        assert sum(row.allocations for row in live[0]) == homealloc.AllocationLog.query.count()
+        homealloc.db.session.commit()
+
+        backfill_rollups(homealloc.db.engine, chunk_size=3)
+        assert rollup_rows() == live
+
+
+def test_backfill_replaces_drifted_rollups(app):
+    with app.app_context():
+        app_id = add_application(status='approved', applied_date=datetime.utcnow() - timedelta(days=3)).id
+        assert homealloc.allocate_pair(app_id, 1, 'admin')[1] == 200
+        expected = rollup_rows()
+        homealloc.db.session.execute(text('UPDATE allocation_rollup SET allocations = 99'))
+        homealloc.db.session.execute(text("INSERT INTO allocation_wait_rollup VALUES ('2001-01-01', 'x', 1, 5)"))
+        homealloc.db.session.commit()
+
+        stats = backfill_rollups(homealloc.db.engine)
+
+        assert stats == {'scanned': 1, 'days': 1}
+        assert rollup_rows() == expected
+
+
+@pytest.mark.parametrize('hours', [0, 0.5, 1, 23, 24, 100, 1000, 20000])
+def test_bucket_midpoint_is_within_ten_percent(hours):
+    # A bucket spans [r^b, r^(b+1)) in hours + 1, so its midpoint is off by at most (r - 1) / 2
+    assert abs(bucket_hours(wait_bucket(hours)) - hours) <= (WAIT_BUCKET_RATIO - 1) / 2 * (hours + 1) + 1e-9
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_median_wait_is_close_to_the_exact_median(app, seed):
+    rng = random.Random(seed)
+    waits = [rng.expovariate(1 / 500) for _ in range(rng.randint(1, 60))]
+    allocated_date = datetime(2025, 6, 1, 12)
+    with app.app_context():
+        homealloc.record_allocations(homealloc.db.session, [
+            (allocated_date, 'admin', 80, allocated_date - timedelta(hours=hours)) for hours in waits])
+
+        median_days = allocation_totals(homealloc.db.session, '2025-06-01', '2025-06-01')['median_wait_days']
+
+    # The lower median, as the histogram walk reports it
+    exact = statistics.median_low(waits)
+    assert abs(median_days * 24 - exact) <= (WAIT_BUCKET_RATIO - 1) / 2 * (exact + 1) + 0.05 * 24
+
+
+def test_totals_without_allocations(app):
+    with app.app_context():
+        assert allocation_totals(homealloc.db.session, '2025-01-01', '2025-01-31') == {
+            'allocations': 0, 'average_match_score': None, 'median_wait_days': None}
@@ -0,0 +1,27 @@
+import json
+
+from database import DEFAULT_SQLITE_SETTINGS
+from metrics import DEFAULT_INSTRUMENTATION
+from scoring import DEFAULT_POLICY
+from setup import create_config_file
+
+
+def test_new_config_matches_the_module_defaults(tmp_path):
+    path = tmp_path / 'config.json'
+    create_config_file(str(path))
+    config = json.loads(path.read_text())
+
+    assert config['priority_scoring'] == DEFAULT_POLICY
+    assert config['sqlite'] == DEFAULT_SQLITE_SETTINGS
+    assert config['instrumentation'] == DEFAULT_INSTRUMENTATION
+
+
+def test_existing_config_keeps_its_values_and_gains_missing_keys(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({'port': 8000, 'sqlite': {'reader_pool_size': 2}}))
+    create_config_file(str(path))
+    config = json.loads(path.read_text())
+
+    assert config['port'] == 8000
+    assert config['sqlite'] == {**DEFAULT_SQLITE_SETTINGS, 'reader_pool_size': 2}
+    assert config['jobs']['workers'] >= 1
@@ -0,0 +1,94 @@
+import json
+from itertools import islice
+
+import app as homealloc
+from events import EventBroker, format_sse
+
+
+def take(broker, n, last_id=None):
+    return list(islice(broker.listen(last_id, heartbeat=0), n))
+
+
+def test_reconnect_resends_what_was_missed():
+    broker = EventBroker()
+    for n in range(5):
+        broker.publish('allocation', {'n': n})
+
+    assert take(broker, 3, last_id=2) == [(3, {'type': 'allocation', 'n': 2}),
+                                          (4, {'type': 'allocation', 'n': 3}),
+                                          (5, {'type': 'allocation', 'n': 4})]
+    assert take(broker, 1, last_id=5) == [None]
+
+
+def test_falling_behind_the_buffer_is_a_reset():
+    broker = EventBroker(buffer_size=3)
+    for n in range(6):
+        broker.publish('allocation', {'n': n})
+
+    assert take(broker, 1, last_id=2) == [(6, {'type': 'reset'})]
+    # Still in the buffer
+    assert take(broker, 1, last_id=3)[0][0] == 4
+
+
+def test_ids_from_before_a_restart_are_a_reset():
+    broker = EventBroker()
+    broker.publish('allocation', {})
+
+    assert take(broker, 1, last_id=40) == [(1, {'type': 'reset'})]
+
+
+def test_empty_broker_waits():
+    assert take(EventBroker(), 1, last_id=0) == [None]
+
+
+def sse_events(response, n):
+    """The data of the first n events of an event stream"""
+    events = []
+    for chunk in response.response:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith('id: '):
+            event_id, data = chunk.split('\n')[:2]
+            events.append((int(event_id[4:]), json.loads(data[6:])))
+            if len(events) == n:
+                break
+    response.close()
+    return events
+
+
+def test_stream_needs_an_admin(client):
+    assert client.get('/api/stream').status_code == 401
+
+
+def test_stream_resumes_from_last_event_id(app, admin_client):
+    broker = homealloc.event_broker
+    start = broker.publish('allocation', {'application_id': 1})
+    broker.publish('vacated', {'house_id': 2})
+
+    response = admin_client.get('/api/stream', headers={'Last-Event-ID': str(start - 1)}, buffered=False)
+
+    assert response.mimetype == 'text/event-stream'
+    assert sse_events(response, 2) == [(start, {'type': 'allocation', 'application_id': 1}),
+                                       (start + 1, {'type': 'vacated', 'house_id': 2})]
+
+
+def test_stream_reset_carries_current_counts(app, admin_client):
+    last_id = homealloc.event_broker.publish('allocation', {})
+
+    response = admin_client.get(f'/api/stream?last_event_id={last_id + 100}', buffered=False)
+
+    [(event_id, data)] = sse_events(response, 1)
+    assert event_id == last_id
+    assert data['type'] == 'reset'
+    assert data['status_counts']['house'] == {'available': 3}
+
+
+def test_new_stream_starts_with_a_snapshot(app, admin_client):
+    response = admin_client.get('/api/stream', buffered=False)
+
+    [(event_id, data)] = sse_events(response, 1)
+    assert event_id == homealloc.event_broker.last_id
+    assert data['type'] == 'snapshot'
+
+
+def test_format_sse():
+    assert format_sse(7, {'type': 'reset'}) == 'id: 7\ndata: {"type": "reset"}\n\n'
@@ -0,0 +1,99 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, func, select
+
+import app as homealloc
+from importer import import_applications
+from location import DEFAULT_PLACES
+
+VALID = {'name': 'Ayesha Khan', 'age': 45, 'family': 5, 'income': 12000, 'contact': '+923001234567'}
+
+
+@pytest.fixture
+def table():
+    engine = create_engine('sqlite://')
+    applications = Table('application', MetaData(), Column('id', Integer, primary_key=True),
+                         *(Column(name, String) for name in ('name', 'contact', 'email', 'address', 'status',
+                                                             'applied_date')),
+                         Column('age', Integer), Column('family_size', Integer), Column('income', Float),
+                         Column('priority_score', Integer), Column('allocated_house_id', Integer))
+    applications.metadata.create_all(engine)
+    return engine, applications
+
+
+def jsonl(*records):
+    return [record if isinstance(record, str) else json.dumps(record) for record in records]
+
+
+def test_invalid_records_are_reported_by_line(table):
+    engine, applications = table
+    lines = jsonl(VALID, {**VALID, 'age': 12}, 'not json', {**VALID, 'name': ' '}, '',
+                  {k: v for k, v in VALID.items() if k != 'income'}, {**VALID, 'family': 0})
+
+    stats = import_applications(engine, applications, lines, 'jsonl')
+
+    assert (stats['read'], stats['imported'], stats['rejected']) == (6, 1, 5)
+    assert stats['errors'] == [
+        {'line': 2, 'error': 'age must be between 18 and 100'},
+        {'line': 3, 'error': 'not a JSON object'},
+        {'line': 4, 'error': 'name is required'},
+        {'line': 6, 'error': "missing field 'income'"},
+        {'line': 7, 'error': 'family_size must be between 1 and 20'},
+    ]
+    with engine.connect() as conn:
+        row = conn.execute(select(applications)).one()
+    assert (row.family_size, row.status) == (5, 'pending')
+    assert row.priority_score == homealloc.priority_score(45, 5, 12000)
+
+
+def test_chunks_are_committed_and_reported_one_by_one(table):
+    engine, applications = table
+    reports = []
+
+    stats = import_applications(engine, applications, jsonl(*[VALID] * 7), 'jsonl', chunk_size=3,
+                                progress=lambda s: reports.append((s['read'], s['imported'])))
+
+    assert stats['imported'] == 7
+    assert reports == [(3, 3), (6, 6), (7, 7)]
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(applications)).scalar() == 7
+
+
+def test_unknown_format_is_an_error(table):
+    with pytest.raises(ValueError):
+        import_applications(*table, [], 'xml')
+
+
+def upload(admin_client, text, filename='applications.csv'):
+    return admin_client.post('/admin/api/import-applications', data={
+        'file': (io.BytesIO(text.encode()), filename), 'wait': '1'})
+
+
+def test_upload_imports_counts_and_geocodes_the_new_rows(app, admin_client):
+    with app.app_context():
+        untouched = homealloc.Application(name='Old', age=40, family_size=2, income=1, contact='x',
+                                          address='1 Mall Rd, Lahore')
+        homealloc.db.session.add(untouched)
+        homealloc.db.session.commit()
+        untouched_id = untouched.id
+
+    response = upload(admin_client, 'name,age,family,income,contact,address\n'
+                                    'Ali,50,4,9000,+92300,"7 Sea View, Karachi"\n'
+                                    'Bad,12,4,9000,+92300,\n')
+
+    assert response.status_code == 200
+    assert (response.json['imported'], response.json['rejected']) == (1, 1)
+    with app.app_context():
+        ali = homealloc.Application.query.filter_by(name='Ali').one()
+        assert (ali.latitude, ali.longitude) == DEFAULT_PLACES['Karachi']
+        assert homealloc.db.session.get(homealloc.Application, untouched_id).latitude is None
+        assert homealloc.get_status_counts()['application']['pending'] == 2
+
+
+def test_unreadable_csv_is_a_bad_request(app, admin_client):
+    response = upload(admin_client, 'name,age,family,income,contact\nAli,50,4,9000,"' + 'x' * 200000 + '"\n')
+
+    assert response.status_code == 400
+    assert 'field larger than field limit' in response.json['error']
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+from sqlalchemy import update
+
+import app as homealloc
+from conftest import add_application
+from eligible_queue import EligibleQueue
+from matching import match_score
+
+
+def test_proposal_skips_an_applicant_changed_behind_the_queue(app):
+    with app.app_context():
+        first = add_application(status='approved', priority_score=90).id
+        second = add_application(status='approved', priority_score=80).id
+        assert homealloc.get_eligible_queue().best_for(3, 1200)[0] == first
+        # Another worker rejects the first applicant; this worker's queue never hears of it
+        homealloc.db.session.execute(update(homealloc.APPLICATION_TABLE).where(
+            homealloc.APPLICATION_TABLE.c.id == first).values(status='rejected'))
+        homealloc.db.session.commit()
+
+        placed = homealloc.place_house(1, 'admin')
+
+        assert placed['proposal']['application_id'] == second
+        assert first not in homealloc.get_eligible_queue()
+        assert homealloc.AllocationProposal.query.filter_by(application_id=first).count() == 0
+
+
+def test_no_proposal_when_every_queued_applicant_is_stale(app):
+    with app.app_context():
+        app_id = add_application(status='approved').id
+        homealloc.get_eligible_queue()
+        homealloc.db.session.execute(update(homealloc.APPLICATION_TABLE).where(
+            homealloc.APPLICATION_TABLE.c.id == app_id).values(status='allocated', allocated_house_id=2))
+        homealloc.db.session.commit()
+
+        assert homealloc.place_house(1, 'admin') is None
+        assert homealloc.AllocationProposal.query.count() == 0
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_best_for_matches_a_scan_of_the_waiting_list(seed):
+    rng = random.Random(seed)
+    live = {}
+    queue = EligibleQueue()
+    for app_id in range(1, 200):
+        key, family_size = (rng.randint(0, 30), app_id), rng.randint(1, 8)
+        live[app_id] = (key, family_size)
+        queue.push(app_id, key, family_size)
+    for _ in range(300):
+        app_id = rng.randint(1, 199)
+        if rng.random() < 0.5:
+            live.pop(app_id, None)
+            queue.discard(app_id)
+        else:
+            # Re-keying leaves the old heap entry behind as a stale one
+            live[app_id] = ((rng.randint(0, 30), app_id), rng.randint(1, 8))
+            queue.push(app_id, *live[app_id])
+
+        bedrooms, size = rng.randint(1, 5), rng.choice([300, 600, 900, 1200, 2000])
+        min_score = rng.choice([60, 75, 90])
+        exclude = set(rng.sample(range(1, 200), 10))
+
+        scores = {family_size: match_score(family_size, bedrooms, size) for family_size in range(1, 9)}
+        eligible = sorted((key, app_id) for app_id, (key, family_size) in live.items()
+                          if app_id not in exclude and scores[family_size] >= min_score)
+        expected = None
+        if eligible:
+            app_id = eligible[0][1]
+            expected = (app_id, scores[live[app_id][1]])
+        assert queue.best_for(bedrooms, size, min_score=min_score, exclude=exclude) == expected
+    assert len(queue) == len(live)
+
+
+def test_vacated_house_is_proposed_then_offered_on_after_a_rejection(app, admin_client):
+    with app.app_context():
+        tenant = add_application(status='approved', priority_score=95).id
+        first = add_application(status='approved', priority_score=90).id
+        second = add_application(status='approved', priority_score=80).id
+        assert homealloc.allocate_pair(tenant, 1, 'admin')[1] == 200
+
+    response = admin_client.post('/admin/api/vacate-house/1').json
+    assert response['success']
+    assert response['proposal']['application_id'] == first
+
+    response = admin_client.post(f"/admin/api/proposals/{response['proposal']['id']}/reject").json
+    assert response['proposal']['status'] == 'rejected'
+    assert response['next']['proposal']['application_id'] == second
+
+    response = admin_client.post(f"/admin/api/proposals/{response['next']['proposal']['id']}/approve").json
+    assert response['success']
+    assert response['proposal']['status'] == 'approved'
+    with app.app_context():
+        house = homealloc.db.session.get(homealloc.House, 1)
+        assert (house.status, house.current_occupant_id) == ('occupied', second)
+        assert homealloc.db.session.get(homealloc.Application, tenant).status == 'vacated'
+        # The rejected applicant is back in line for the next house
+        assert first in homealloc.get_eligible_queue()
+        assert homealloc.get_status_counts()['application']['allocated'] == 1
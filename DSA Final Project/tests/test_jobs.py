@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+import app as homealloc
+from conftest import add_application
+from jobs import JobFailed, JobRunner, JobStore, QueueFull
+
+
+def job(app, job_id):
+    with app.app_context():
+        return homealloc.job_json(homealloc.db.session.get(homealloc.Job, job_id))
+
+
+def wait_for(app, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = job(app, job_id)
+        if state['status'] in ('succeeded', 'failed'):
+            return state
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+@pytest.fixture
+def runner(app):
+    """A one-worker runner on the test database, with room for one waiting job"""
+    runner = JobRunner(app, JobStore(lambda: homealloc.db.engine), max_workers=1, max_pending=1)
+    # Jobs are submitted from requests, where the store can reach the engine
+    with app.app_context():
+        yield runner
+    runner.executor.shutdown(wait=True)
+
+
+def test_job_goes_from_queued_to_running_to_succeeded(app, runner):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking(params, progress):
+        started.set()
+        progress({'stage': 'waiting'})
+        release.wait(5)
+        return {'echo': params['value']}
+
+    runner.register('blocking', blocking)
+    first = runner.submit('blocking', {'value': 1}, 'admin')
+    second = runner.submit('blocking', {'value': 2}, 'admin')
+    assert started.wait(5)
+
+    assert job(app, first)['status'] == 'running'
+    assert job(app, first)['progress'] == {'stage': 'waiting'}
+    assert job(app, second)['status'] == 'queued'
+    release.set()
+
+    done = wait_for(app, first)
+    assert (done['status'], done['result'], done['created_by']) == ('succeeded', {'echo': 1}, 'admin')
+    assert done['started_date'] and done['finished_date']
+    assert wait_for(app, second)['result'] == {'echo': 2}
+
+
+def test_failures_are_recorded(app, runner):
+    def refuse(params, progress):
+        raise JobFailed('Nothing to do')
+
+    def crash(params, progress):
+        return params['missing']
+
+    runner.register('refuse', refuse)
+    runner.register('crash', crash)
+
+    assert wait_for(app, runner.submit('refuse', {}))['error'] == 'Nothing to do'
+    failed = wait_for(app, runner.submit('crash', {}))
+    assert (failed['status'], failed['error']) == ('failed', "KeyError: 'missing'")
+
+
+def test_full_queue_is_refused_until_a_slot_frees(app, runner):
+    release = threading.Event()
+    runner.register('blocking', lambda params, progress: release.wait(5) and {})
+    running = runner.submit('blocking', {})
+    waiting = runner.submit('blocking', {})
+
+    with pytest.raises(QueueFull):
+        runner.submit('blocking', {})
+    release.set()
+    wait_for(app, running)
+    wait_for(app, waiting)
+    # The slot is given back just after the status is written; the single
+    # worker reaching this no-op means both runs have returned
+    runner.executor.submit(lambda: None).result()
+    wait_for(app, runner.submit('blocking', {}))
+
+
+def test_restart_fails_unfinished_jobs(app):
+    with app.app_context():
+        store = homealloc.job_runner.store
+        queued = store.create('allocation', {}, 'admin')
+        running = store.create('allocation', {}, 'admin')
+        store.update(running, status='running')
+        finished = store.create('allocation', {}, 'admin')
+        store.update(finished, status='succeeded', result={})
+
+        assert store.fail_interrupted() == 2
+    for job_id in (queued, running):
+        assert (job(app, job_id)['status'], job(app, job_id)['error']) == ('failed', 'Interrupted by a restart')
+    assert job(app, finished)['status'] == 'succeeded'
+
+
+def test_allocation_route_runs_as_a_job(app, admin_client):
+    with app.app_context():
+        add_application(status='approved')
+
+    response = admin_client.post('/admin/api/run-allocation-algorithm', json={'dry_run': True})
+    assert response.status_code == 202
+    status = admin_client.get(response.json['status_url']).json
+    assert status['kind'] == 'allocation'
+
+    done = wait_for(app, response.json['job_id'])
+    assert done['status'] == 'succeeded'
+    assert done['result']['allocation_count'] == 1
+    assert admin_client.get('/admin/api/jobs').json['jobs'][0]['id'] == response.json['job_id']
+    assert admin_client.get('/admin/api/jobs/999').status_code == 404
@@ -0,0 +1,98 @@
+import itertools
+import math
+import random
+
+import numpy as np
+import pytest
+
+from location import DEFAULT_PLACES, DEFAULT_ROADS, Geocoder, RoadGraph, SpatialIndex, haversine_km
+
+
+def random_points(rng, n):
+    # Clustered around Pakistan, plus points across the poles and the antimeridian
+    lats = [rng.uniform(23, 37) for _ in range(n)] + [89.9, -89.9, 10.0, 10.0]
+    lons = [rng.uniform(60, 78) for _ in range(n)] + [0.0, 120.0, 179.99, -179.99]
+    return lats, lons
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_within_finds_exactly_the_points_in_range(seed):
+    rng = random.Random(seed)
+    lats, lons = random_points(rng, 300)
+    index = SpatialIndex(range(100, 100 + len(lats)), lats, lons)
+
+    for _ in range(20):
+        point = rng.choice([(rng.uniform(23, 37), rng.uniform(60, 78)), (10.0, 179.5), (89.0, 45.0)])
+        radius_km = rng.choice([1, 50, 200, 800])
+        positions, km = index.within(*point, radius_km)
+
+        all_km = haversine_km(point[0], point[1], np.array(lats), np.array(lons))
+        # Points right on the boundary can land either side of it through rounding
+        clear = np.abs(all_km - radius_km) > 1e-6
+        assert set(np.flatnonzero(clear & (all_km <= radius_km))) <= set(positions)
+        assert not set(np.flatnonzero(clear & (all_km > radius_km))) & set(positions)
+        assert np.all(np.diff(km) >= 0)
+        assert np.allclose(km, all_km[positions])
+        assert sorted(index.within_many([point[0]], [point[1]], radius_km)[0]) == sorted(positions)
+
+
+def test_empty_index():
+    index = SpatialIndex([], [], [])
+
+    positions, km = index.within(30.0, 70.0, 100)
+    assert len(positions) == len(km) == 0
+    assert [len(found) for found in index.within_many([30.0, 31.0], [70.0, 71.0], 100)] == [0, 0]
+
+
+def floyd_warshall(names, roads):
+    distances = {(a, b): 0.0 if a == b else math.inf for a in names for b in names}
+    for a, b, km in roads:
+        distances[a, b] = distances[b, a] = min(distances[a, b], float(km))
+    for via, a, b in itertools.product(names, names, names):
+        distances[a, b] = min(distances[a, b], distances[a, via] + distances[via, b])
+    return distances
+
+
+def test_dijkstra_matches_floyd_warshall_on_the_default_roads():
+    graph = RoadGraph(DEFAULT_PLACES, DEFAULT_ROADS)
+    expected = floyd_warshall(sorted(DEFAULT_PLACES), DEFAULT_ROADS)
+
+    for source, target in itertools.product(DEFAULT_PLACES, DEFAULT_PLACES):
+        km, route = graph.path(source, target)
+        assert km == expected[source, target]
+        assert route[0] == source and route[-1] == target
+        legs = {(a, b): km for a, b, km in DEFAULT_ROADS}
+        legs.update({(b, a): km for (a, b), km in list(legs.items())})
+        assert sum(legs[a, b] for a, b in zip(route, route[1:])) == km
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_dijkstra_matches_floyd_warshall_on_random_graphs(seed):
+    rng = random.Random(seed)
+    names = [f'P{i}' for i in range(12)]
+    places = {name: (rng.uniform(23, 37), rng.uniform(60, 78)) for name in names}
+    roads = [(a, b, rng.randint(1, 500)) for a, b in itertools.combinations(names, 2) if rng.random() < 0.25]
+    graph = RoadGraph(places, roads)
+    expected = floyd_warshall(names, roads)
+
+    for source in names:
+        distances, _ = graph.shortest_from(source)
+        for target in names:
+            assert distances.get(target, math.inf) == expected[source, target]
+
+
+def test_road_distance_is_never_shorter_than_the_straight_line():
+    graph = RoadGraph(DEFAULT_PLACES, DEFAULT_ROADS)
+    karachi, lahore = DEFAULT_PLACES['Karachi'], DEFAULT_PLACES['Lahore']
+
+    assert graph.road_distance_km(*karachi, *lahore) == graph.path('Karachi', 'Lahore')[0]
+    assert graph.road_distance_km(*karachi, *lahore) >= haversine_km(*karachi, *lahore)
+
+
+def test_geocoder_prefers_the_most_specific_place():
+    geocoder = Geocoder({**DEFAULT_PLACES, 'Model Town Lahore': (31.48, 74.32)})
+
+    assert geocoder.geocode('12 Main Blvd, model town lahore') == (31.48, 74.32)
+    assert geocoder.geocode('456 Park Rd, Lahore') == DEFAULT_PLACES['Lahore']
+    assert geocoder.geocode('Somewhere else') is None
+    assert geocoder.geocode(None) is None
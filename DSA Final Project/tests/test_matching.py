@@ -0,0 +1,43 @@
+import itertools
+
+import numpy as np
+
+from matching import match_score_matrix, pair_match_scores
+
+FAMILY_SIZES = range(1, 11)
+BEDROOMS = range(1, 7)
+SIZES = (0, 150, 449, 450, 451, 600, 875, 1000, 1200, 1525, 2000, 3000)
+
+
+def java_match_score(family_size, bedrooms, size):
+    """AllocationSystem.calculateMatchScore from HouseAllocationSystem.java"""
+    score = 50.0
+    ideal_bedrooms = (family_size + 1) // 2
+    bedroom_diff = abs(bedrooms - ideal_bedrooms)
+    score += max(0, 30 - bedroom_diff * 10)
+    required_size = family_size * 150.0
+    if size >= required_size:
+        score += min(20, (size - required_size) / 50.0)
+    return min(100.0, score)
+
+
+def test_matrix_matches_java_formula():
+    scores = match_score_matrix(list(FAMILY_SIZES), [b for b, _ in itertools.product(BEDROOMS, SIZES)],
+                                [s for _, s in itertools.product(BEDROOMS, SIZES)])
+    for row, family_size in enumerate(FAMILY_SIZES):
+        for col, (bedrooms, size) in enumerate(itertools.product(BEDROOMS, SIZES)):
+            assert scores[row, col] == round(java_match_score(family_size, bedrooms, size)), \
+                (family_size, bedrooms, size)
+
+
+def test_pair_scores_are_the_matrix_diagonal():
+    family_sizes = [1, 2, 4, 7, 10]
+    bedrooms = [1, 3, 2, 4, 1]
+    sizes = [100, 700, 1600, 450, 3000]
+
+    assert np.array_equal(pair_match_scores(family_sizes, bedrooms, sizes),
+                          np.diag(match_score_matrix(family_sizes, bedrooms, sizes)))
+
+
+def test_scores_are_capped_at_100():
+    assert match_score_matrix([2], [1], [10000])[0, 0] == 100
@@ -0,0 +1,34 @@
+import app as homealloc
+
+
+def test_failing_view_releases_the_profiler(app, admin_client):
+    @app.route('/test-failure')
+    def failure():
+        raise RuntimeError('view failed')
+
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    with admin_client.session_transaction() as session:
+        session['profiling'] = True
+
+    assert admin_client.get('/test-failure').status_code == 500
+    assert not homealloc.request_profiler.busy.locked()
+
+    # The next request is profiled again
+    response = admin_client.get('/api/stats')
+    assert 'X-Profile-Id' in response.headers
+    assert not homealloc.request_profiler.busy.locked()
+
+
+def test_view_exception_propagating_still_releases_the_profiler(app, admin_client):
+    @app.route('/test-failure')
+    def failure():
+        raise RuntimeError('view failed')
+
+    with admin_client.session_transaction() as session:
+        session['profiling'] = True
+
+    try:
+        admin_client.get('/test-failure')
+    except RuntimeError:
+        pass
+    assert not homealloc.request_profiler.busy.locked()
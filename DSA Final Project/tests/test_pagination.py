@@ -0,0 +1,93 @@
+import random
+import re
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import app as homealloc
+from conftest import add_application
+
+
+@pytest.mark.parametrize('applied_date', [
+    datetime(2025, 3, 1, 12, 30, 5, 123456),
+    datetime(2025, 3, 1),
+    None,
+])
+def test_cursor_round_trip(applied_date):
+    row = SimpleNamespace(priority_score=85, applied_date=applied_date, id=42)
+    token = homealloc.encode_cursor(row)
+
+    assert '=' not in token
+    assert homealloc.decode_cursor(token) == (85, applied_date, 42)
+
+
+def test_garbage_cursor_is_a_bad_request(client):
+    assert client.get('/waiting-list?after=not-a-cursor').status_code == 400
+
+
+@pytest.fixture
+def waiting_list(app):
+    """Forty applications with tied scores and dates, a third of them undated;
+    returns their ids in waiting list order"""
+    rng = random.Random(3)
+    with app.app_context():
+        for _ in range(40):
+            add_application(priority_score=rng.choice([30, 60, 90]),
+                            applied_date=rng.choice([datetime(2025, 1, 1), datetime(2025, 1, 2)]))
+        homealloc.db.session.execute(homealloc.update(homealloc.Application)
+                                     .where(homealloc.Application.id % 3 == 0).values(applied_date=None))
+        homealloc.db.session.commit()
+        rows = homealloc.Application.query.all()
+        return [key[2] for key in sorted(homealloc.waiting_key(row.id, row.priority_score, row.applied_date)
+                                         for row in rows)]
+
+
+def test_keyset_pages_cover_the_list_in_order(app, waiting_list):
+    with app.app_context():
+        query = homealloc.Application.query
+        assert [row.id for row in query.order_by(*homealloc.APPLICATION_ORDER)] == waiting_list
+
+        pages, after = [], None
+        while True:
+            rows, prev_cursor, next_cursor = homealloc.keyset_page(query, after, limit=7)
+            pages.append(([row.id for row in rows], prev_cursor))
+            if next_cursor is None:
+                break
+            after = homealloc.decode_cursor(next_cursor)
+
+        assert [app_id for ids, _ in pages for app_id in ids] == waiting_list
+        assert pages[0][1] is None
+        # Each page's prev cursor leads back to the page before it
+        for (ids, _), (_, prev_cursor) in zip(pages, pages[1:]):
+            rows, _, _ = homealloc.keyset_page(query, before=homealloc.decode_cursor(prev_cursor), limit=7)
+            assert [row.id for row in rows] == ids
+
+
+def test_waiting_list_pages_through_undated_rows(client, waiting_list):
+    seen, positions, url = [], [], '/waiting-list'
+    while url:
+        page = client.get(url)
+        assert page.status_code == 200
+        html = page.get_data(as_text=True)
+        seen += [int(app_id) for app_id in re.findall(r'viewApplication\((\d+)\)', html)]
+        positions += [int(n) for n in re.findall(r'<tr>\s*<td>(\d+)</td>', html)]
+        next_cursor = re.search(r'/waiting-list\?after=([\w-]+)', html)
+        url = f'/waiting-list?after={next_cursor.group(1)}' if next_cursor else None
+
+    assert seen == waiting_list
+    assert positions == list(range(1, len(waiting_list) + 1))
+
+
+def test_batch_lookup_needs_an_admin(app, client, admin_client):
+    with app.app_context():
+        app_id = add_application().id
+
+    assert client.get(f'/api/applications?ids={app_id}').status_code == 401
+    assert client.get('/api/houses?ids=1,2').status_code == 401
+
+    response = admin_client.get(f'/api/applications?ids={app_id},999')
+    assert response.status_code == 200
+    assert response.json['columns']['id'] == [app_id]
+    assert response.json['missing'] == [999]
+    assert admin_client.get('/api/houses?ids=3,1').json['columns']['house_id'] == ['H-101', 'H-103']
@@ -0,0 +1,82 @@
+import bisect
+import random
+
+import pytest
+
+from rank_index import RankIndex
+
+
+class SmallRankIndex(RankIndex):
+    # Small blocks so a few hundred keys split and merge blocks often
+    LOAD = 4
+
+
+@pytest.fixture(params=[RankIndex, SmallRankIndex])
+def index_class(request):
+    return request.param
+
+
+def check_against(index, oracle):
+    assert len(index) == len(oracle)
+    assert index.slice(0, len(oracle)) == oracle
+    for position, key in enumerate(oracle):
+        assert index.rank(key) == position
+        assert key in index
+
+
+def test_build_rank_and_slice(index_class):
+    rng = random.Random(1)
+    keys = rng.sample(range(10000), 300)
+    index = index_class(keys)
+
+    oracle = sorted(keys)
+    check_against(index, oracle)
+    assert index.slice(10, 20) == oracle[10:20]
+    assert index.slice(-5, 3) == oracle[:3]
+    assert index.slice(295, 400) == oracle[295:]
+    assert index.slice(20, 10) == []
+
+
+def test_add_and_discard_match_a_sorted_list(index_class):
+    rng = random.Random(2)
+    index = index_class()
+    oracle = []
+    for step in range(2000):
+        if oracle and rng.random() < 0.4:
+            key = rng.choice(oracle)
+            oracle.remove(key)
+            assert index.discard(key)
+        else:
+            key = rng.randrange(100000)
+            if key in oracle:
+                continue
+            bisect.insort(oracle, key)
+            index.add(key)
+        if step % 100 == 0:
+            check_against(index, oracle)
+    check_against(index, oracle)
+
+
+def test_missing_keys(index_class):
+    index = index_class([(-90, 1), (-80, 2)])
+    assert index.rank((-85, 3)) is None
+    assert index.rank((-70, 4)) is None
+    assert (-85, 3) not in index
+    assert not index.discard((-85, 3))
+    assert len(index) == 2
+
+
+def test_empty_index(index_class):
+    index = index_class()
+    assert len(index) == 0
+    assert index.rank(1) is None
+    assert index.slice(0, 10) == []
+    assert not index.discard(1)
+    index.add(1)
+    assert index.rank(1) == 0
+
+
+def test_replace_all(index_class):
+    index = index_class(range(50))
+    index.replace_all([7, 3, 5])
+    check_against(index, [3, 5, 7])
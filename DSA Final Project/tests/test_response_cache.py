@@ -0,0 +1,52 @@
+import sqlite3
+
+from response_cache import ResponseCache
+
+
+def test_entry_is_served_only_at_its_revision():
+    cache = ResponseCache()
+    etag = cache.put('house:1', '{}', cache.begin(), revision=3)
+
+    assert cache.get('house:1', 3) == (etag, '{}')
+    assert cache.get('house:1', 4) is None
+    # A mismatch drops the entry
+    assert cache.get('house:1', 3) is None
+
+
+def test_every_entry_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('response_cache.time.monotonic', lambda: now[0])
+    cache = ResponseCache(max_ttl=30)
+    cache.put('stats', '{}', cache.begin(), ttl=3600)
+    cache.put('house:1', '{}', cache.begin())
+
+    now[0] += 29
+    assert cache.get('stats') is not None
+    assert cache.get('house:1') is not None
+    now[0] += 1
+    assert cache.get('stats') is None
+    assert cache.get('house:1') is None
+
+
+def test_body_built_during_an_invalidation_is_not_stored():
+    cache = ResponseCache()
+    token = cache.begin()
+    cache.invalidate('house:1')
+    cache.put('house:1', '{}', token)
+
+    assert cache.get('house:1') is None
+
+
+def test_write_from_another_process_refreshes_the_response(app, client):
+    first = client.get('/api/house/1')
+    assert client.get('/api/house/1', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    # Another worker commits a change this process never hears about
+    conn = sqlite3.connect(app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):])
+    conn.execute("UPDATE house SET status = 'maintenance', version = version + 1 WHERE id = 1")
+    conn.commit()
+    conn.close()
+
+    response = client.get('/api/house/1', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.json['status'] == 'maintenance'
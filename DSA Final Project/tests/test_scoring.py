@@ -0,0 +1,50 @@
+import itertools
+
+import numpy as np
+
+from scoring import DEFAULT_POLICY, priority_score, priority_scores
+
+AGES = (18, 39, 40, 49, 50, 59, 60, 85)
+FAMILY_SIZES = (1, 2, 3, 4, 5, 6, 9)
+INCOMES = (0, 5000, 10000, 10001, 15000, 20000, 20001, 50000)
+
+INCOME_FIRST = {**DEFAULT_POLICY, 'income_bands': [[0.5, 50], [0.75, 35], [1.0, 20]], 'max_score': 90}
+
+
+def check_batch(policy):
+    ages, family_sizes, incomes = zip(*itertools.product(AGES, FAMILY_SIZES, INCOMES))
+    batch = priority_scores(ages, family_sizes, incomes, policy)
+    expected = [priority_score(*applicant, policy) for applicant in zip(ages, family_sizes, incomes)]
+    assert np.array_equal(batch, expected)
+
+
+def test_batch_matches_scalar_with_default_policy():
+    check_batch(DEFAULT_POLICY)
+
+
+def test_batch_matches_scalar_with_custom_policy():
+    check_batch(INCOME_FIRST)
+
+
+def original_priority_score(age, family_size, income):
+    """The formula apply() used before scoring became configurable"""
+    score = 0
+    if age >= 60: score += 30
+    elif age >= 50: score += 20
+    elif age >= 40: score += 10
+
+    if family_size >= 6: score += 30
+    elif family_size >= 4: score += 20
+    elif family_size >= 2: score += 10
+
+    income_ratio = income / 20000
+    if income_ratio <= 0.5: score += 40
+    elif income_ratio <= 0.75: score += 30
+    elif income_ratio <= 1.0: score += 20
+    else: score += 10
+    return min(100, score)
+
+
+def test_default_policy_matches_original_formula():
+    for applicant in itertools.product(AGES, FAMILY_SIZES, INCOMES):
+        assert priority_score(*applicant) == original_priority_score(*applicant), applicant
@@ -0,0 +1,92 @@
+import pytest
+
+import app as homealloc
+import search
+from conftest import add_application
+from search import match_expression
+
+
+def ids(rows):
+    return [row['id'] for row in rows]
+
+
+def test_match_expression_quotes_prefixes_and_drops_single_letters():
+    assert match_expression('Ali  K. Karachi') == '"ali"* "karachi"*'
+    assert match_expression('"drop" OR name:*') == '"drop"* "or"* "name"*'
+    assert match_expression('a b -') is None
+
+
+def test_name_match_outranks_address_match(app):
+    with app.app_context():
+        # The newer row wins ties, so the name match goes in first
+        by_name = add_application(name='Ali Raza', address='Lahore').id
+        by_address = add_application(name='Sana Malik', address='7 Ali Street, Lahore').id
+        # bm25 needs the term to be rare to score it at all
+        for i in range(8):
+            add_application(name=f'Other {i}', address='Karachi')
+
+        rows, fully_ranked = search.search_applications(homealloc.db.session, 'ali')
+
+    assert ids(rows) == [by_name, by_address]
+    assert fully_ranked
+    assert rows[0]['relevance'] > rows[1]['relevance']
+
+
+def test_every_term_must_match_as_a_prefix(app):
+    with app.app_context():
+        wanted = add_application(name='Ali Khan', address='Karachi').id
+        add_application(name='Ali Khan', address='Lahore')
+        add_application(name='Bilal', address='Karachi')
+
+        rows, _ = search.search_applications(homealloc.db.session, 'ali kar')
+
+    assert ids(rows) == [wanted]
+
+
+def test_index_follows_updates_and_deletes(app):
+    with app.app_context():
+        application = add_application(name='Zainab Qureshi')
+        app_id = application.id
+        application.name = 'Zainab Siddiqui'
+        homealloc.db.session.commit()
+
+        assert search.search_applications(homealloc.db.session, 'qureshi')[0] == []
+        assert ids(search.search_applications(homealloc.db.session, 'siddiq')[0]) == [app_id]
+
+        homealloc.db.session.delete(application)
+        homealloc.db.session.commit()
+        assert search.search_applications(homealloc.db.session, 'zainab')[0] == []
+
+
+def test_house_search_follows_facility_changes(app):
+    with app.app_context():
+        house = homealloc.db.session.get(homealloc.House, 2)
+        house.facilities = 'solar panels, garden'
+        homealloc.db.session.commit()
+
+        rows, _ = search.search_houses(homealloc.db.session, 'solar')
+        assert [row['house_id'] for row in rows] == ['H-102']
+        assert [row['house_id'] for row in search.search_houses(homealloc.db.session, 'h 101')[0]] == ['H-101']
+
+
+def test_broad_queries_rank_only_the_newest_matches(app, monkeypatch):
+    monkeypatch.setattr(search, 'RANKED_MATCHES', 2)
+    with app.app_context():
+        matches = [add_application(name=f'Ahmed {i}').id for i in range(4)]
+
+        rows, fully_ranked = search.search_applications(homealloc.db.session, 'ahmed')
+
+    assert not fully_ranked
+    assert sorted(ids(rows)) == matches[-2:]
+
+
+def test_search_route(app, client, admin_client):
+    with app.app_context():
+        app_id = add_application(name='Hamza Tariq').id
+
+    assert client.get('/admin/api/search?q=hamza').status_code == 401
+    response = admin_client.get('/admin/api/search?q=hamza').json
+    assert ids(response['applications']) == [app_id]
+    assert response['houses'] == []
+    assert admin_client.get('/admin/api/search/owners?q=x').status_code == 404
+    assert ids(admin_client.get('/admin/api/search/applications?q=hamza&offset=1').json['applications']) == []
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import app as homealloc
+from conftest import add_application
+from scoring import DEFAULT_POLICY
+from simulation import Snapshot, build_policies, reporting_bands, run_scenario, simulate
+
+
+def random_snapshot(seed=0, waiting=40, houses=10):
+    rng = np.random.default_rng(seed)
+
+    def people(n):
+        return (rng.integers(18, 80, n), rng.integers(1, 9, n), rng.uniform(2000, 40000, n))
+
+    def stock(n):
+        return (rng.integers(1, 6, n), rng.uniform(400, 3000, n))
+
+    return Snapshot(people(waiting), rng.uniform(0, 200, waiting), people(200), stock(houses), stock(60),
+                    arrivals_per_day=0.5, vacancies_per_day=0.3)
+
+
+def report_without_timing(result):
+    return {key: value for key, value in result.items() if key not in ('elapsed_seconds', 'workers')}
+
+
+def test_same_seed_gives_the_same_report():
+    snapshot, policies = random_snapshot(), build_policies(DEFAULT_POLICY)
+
+    first = simulate(snapshot, policies, scenarios=6, horizon_days=120, workers=1, seed=3)
+    again = simulate(snapshot, policies, scenarios=6, horizon_days=120, workers=1, seed=3)
+    other = simulate(snapshot, policies, scenarios=6, horizon_days=120, workers=1, seed=4)
+
+    assert report_without_timing(first) == report_without_timing(again)
+    assert report_without_timing(first) != report_without_timing(other)
+
+
+def test_worker_count_does_not_change_the_report():
+    snapshot, policies = random_snapshot(), build_policies(DEFAULT_POLICY)
+
+    alone = simulate(snapshot, policies, scenarios=8, horizon_days=120, workers=1, seed=5)
+    pooled = simulate(snapshot, policies, scenarios=8, horizon_days=120, workers=2, seed=5)
+
+    assert report_without_timing(alone) == report_without_timing(pooled)
+
+
+def test_policies_share_each_scenario_draw():
+    snapshot = random_snapshot(waiting=0)
+    policies = build_policies(DEFAULT_POLICY, {'a': {}, 'b': {}})
+
+    result = run_scenario(snapshot, policies, np.random.SeedSequence(1), 200, reporting_bands())
+
+    assert result['a'] == result['b']
+    assert result['a']['applicants'] > 0
+
+
+@pytest.mark.parametrize('min_match_score', [60, 90])
+def test_nobody_is_housed_below_the_policy_threshold(min_match_score):
+    policies = build_policies(DEFAULT_POLICY, {'p': {'min_match_score': min_match_score}})
+
+    result = simulate(random_snapshot(), policies, scenarios=4, horizon_days=200, workers=1, seed=0)
+
+    score = result['policies']['p']['average_match_score']
+    assert score is None or score['p5'] >= min_match_score
+
+
+def test_snapshot_from_the_database(app):
+    with app.app_context():
+        add_application(status='approved')
+        add_application(status='pending')
+        add_application(status='rejected')
+        snapshot = Snapshot.from_database(homealloc.db.engine)
+
+    assert snapshot.waited_days.size == 2
+    assert snapshot.population[0].size == 3
+    assert snapshot.available[0].size == snapshot.stock[0].size == 3
+    assert snapshot.arrivals_per_day == pytest.approx(3 / 90)
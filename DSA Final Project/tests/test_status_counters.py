@@ -0,0 +1,78 @@
+from sqlalchemy import func
+
+import app as homealloc
+
+
+def table_counts():
+    """Status counts straight from the tables, for comparison with the counters"""
+    counts = {}
+    for kind, model in (('application', homealloc.Application), ('house', homealloc.House)):
+        rows = homealloc.db.session.query(model.status, func.count(model.id)).group_by(model.status)
+        counts[kind] = {status: n for status, n in rows}
+    return counts
+
+
+def counter_counts():
+    return {kind: {status: n for status, n in counts.items() if n}
+            for kind, counts in homealloc.get_status_counts().items()}
+
+
+def assert_counters_consistent(app):
+    with app.app_context():
+        assert counter_counts() == table_counts()
+
+
+def apply(client, n):
+    for i in range(n):
+        response = client.post('/apply', data={'name': f'Applicant {i}', 'age': 30 + 10 * i, 'family': 4,
+                                               'income': 12000, 'contact': '+920000000000'})
+        assert response.status_code == 200
+
+
+def test_seeded_by_init_db(app):
+    assert_counters_consistent(app)
+    with app.app_context():
+        assert homealloc.get_status_counts()['house']['available'] == 3
+
+
+def test_apply_update_allocate_and_bulk_updates(app, admin_client):
+    apply(admin_client, 4)
+    assert_counters_consistent(app)
+
+    response = admin_client.post('/admin/api/bulk-update-applications', json={'action': 'approve', 'ids': [1, 2]})
+    assert response.json['updated'] == 2
+    assert_counters_consistent(app)
+
+    response = admin_client.post('/admin/api/update-application', json={'id': 3, 'action': 'reject'})
+    assert response.json['success']
+    assert_counters_consistent(app)
+
+    response = admin_client.post('/admin/api/allocate-house', json={'application_id': 1, 'house_id': 1})
+    assert response.status_code == 200
+    assert_counters_consistent(app)
+
+    # Allocated applications are never touched by bulk updates
+    response = admin_client.post('/admin/api/bulk-update-applications',
+                                 json={'action': 'pending', 'filter': {'min_priority': 0}})
+    assert response.json['updated'] == 2
+    assert_counters_consistent(app)
+    with app.app_context():
+        counts = homealloc.get_status_counts()
+        assert counts['application']['allocated'] == 1
+        assert counts['application']['pending'] == 3
+        assert counts['house']['occupied'] == 1
+
+    stats = admin_client.get('/api/stats').json
+    assert stats['total_applications'] == 4
+    assert stats['pending_applications'] == 3
+    assert stats['available_houses'] == 2
+
+
+def test_reconcile_repairs_drift(app):
+    with app.app_context():
+        homealloc.db.session.query(homealloc.StatusCounter).filter_by(kind='house').delete()
+        homealloc.db.session.commit()
+        assert homealloc.get_status_counts()['house']['available'] == 0
+
+        homealloc.reconcile_counters()
+        assert counter_counts() == table_counts()
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from matching import match_score
+from suggestions import SuggestionIndex
+
+
+def random_index(rng, houses=60, applications=80):
+    house_rows = [(house_id, rng.randint(1, 6), rng.choice([0, 300, 450, 600, 875, 1200, 1525, 2000, 3000]))
+                  for house_id in range(1, houses + 1)]
+    app_rows = [(app_id, rng.randint(0, 100), rng.randint(1, 10)) for app_id in range(1, applications + 1)]
+    return house_rows, app_rows
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_top_houses_are_the_best_scores(seed):
+    rng = random.Random(seed)
+    houses, applications = random_index(rng)
+    index = SuggestionIndex(houses, applications)
+    family_size, k, min_score = rng.randint(1, 10), rng.randint(1, 15), rng.choice([0, 60, 80])
+
+    top = index.top_houses(family_size, k=k, min_score=min_score)
+
+    scores = sorted((match_score(family_size, bedrooms, size) for _, bedrooms, size in houses), reverse=True)
+    assert [score for _, score in top] == [score for score in scores if score >= min_score][:k]
+    by_id = {house_id: (bedrooms, size) for house_id, bedrooms, size in houses}
+    assert len({house_id for house_id, _ in top}) == len(top)
+    for house_id, score in top:
+        assert score == match_score(family_size, *by_id[house_id])
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_top_applicants_are_the_best_scores_in_waiting_order(seed):
+    rng = random.Random(seed)
+    houses, applications = random_index(rng)
+    index = SuggestionIndex(houses, applications)
+    _, bedrooms, size = rng.choice(houses)
+    k, min_score = rng.randint(1, 15), rng.choice([0, 60, 80])
+
+    top = index.top_applicants(bedrooms, size, k=k, min_score=min_score)
+
+    ranked = sorted(((-match_score(family_size, bedrooms, size), rank, app_id)
+                     for rank, (app_id, _, family_size) in enumerate(applications)))
+    expected = [(app_id, -negative) for negative, _, app_id in ranked if -negative >= min_score][:k]
+    assert top == expected
+
+
+def test_empty_index_suggests_nothing():
+    index = SuggestionIndex([], [])
+
+    assert index.top_houses(4) == []
+    assert index.top_applicants(2, 900) == []